@@ -0,0 +1,490 @@
+"""
+수집된 분기 재무정보(4분기 보정 후)에서 기업별 파생 지표를 전체 기업에 대해 한 번에 계산합니다.
+
+입력은 collect_quarterly_financials(corp_code 컬럼 포함)·TimeSeriesStore.frame·read_parquet_dataset·배치 결과 CSV와
+같은 형태(corp_code, 구분, 년도, 분기, 항목, thstrm_amount)의 DataFrame이며, 결과는 (고유번호, 구분, 년도, 분기)마다 한 행입니다.
+
+  - 항목별 분기 금액과 전분기 대비(_QoQ)/전년 동기 대비(_YoY) 증감률(%)
+  - flow/ytd 항목의 최근 4분기 합계(_TTM)와 그 전년 동기 대비 증감률(_TTM_YoY)
+  - 영업이익률·순이익률의 분기/TTM 값과 전분기·전년 동기 대비 변화(%p)
+
+모든 지표는 (기업, 구분, 분기 번호)를 정수 키로 묶어 직전 분기/전년 동기 값을 한 번에 찾는 방식으로 계산하므로
+중간 분기가 빠져 있어도 엉뚱한 분기와 비교하지 않습니다. 기업끼리는 독립적이라 workers를 주면 기업을 나눠 여러
+프로세스에서 계산합니다.
+
+ScreeningIndex는 계산한 지표를 SQLite에 보관해 "3분기 영업이익률 > 15이고 매출이 전년보다 늘어난 기업" 같은 조건 검색에
+바로 답합니다. DART_SCREENING_DB(batch --index)를 지정하면 collect_quarterly_financials가 수집한 기업의 지표를 갱신합니다.
+
+    python dart_analytics.py --store ts.sqlite3 --accounts 매출액,영업이익,당기순이익 --workers 4 -o metrics.csv
+    python dart_analytics.py --parquet dataset --latest --query "`영업이익률_TTM` > 10 and `매출액_YoY` > 20"
+    python dart_analytics.py --store ts.sqlite3 --index screen.sqlite3
+    python dart_analytics.py screen --index screen.sqlite3 "영업이익률>15" "매출액_YoY>0" -p 202409 --order 영업이익률
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import dart_api_test as dart
+
+PERIOD_KEYS = ['corp_code', '구분', '년도', '분기']
+INPUT_COLUMNS = PERIOD_KEYS + ['항목', 'thstrm_amount']
+
+# 증감률을 계산할 비교 시점 (접미사 -> 몇 분기 전)
+GROWTH_LAGS = {'QoQ': 1, 'YoY': 4}
+TTM_QUARTERS = 4
+
+# 이익률 (이름 -> (분자 항목, 분모 항목)), 두 항목이 모두 있을 때만 계산합니다
+MARGINS = {
+    '영업이익률': ('영업이익', '매출액'),
+    '순이익률': ('당기순이익', '매출액'),
+}
+
+# 분기 번호(년도 * 4 + 분기 - 1)와 (기업, 구분) 번호를 정수 하나로 묶을 때의 자릿수
+_GROUP_STRIDE = 100_000
+
+def _padded_codes(codes: pd.Series) -> np.ndarray:
+    # 행마다 zfill하지 않고 서로 다른 고유번호만 8자리로 맞춥니다
+    index, uniques = pd.factorize(codes)
+    return pd.Index(uniques).astype(str).str.zfill(8).to_numpy()[index]
+
+def quarterly_panel(df: pd.DataFrame, consolidated_first: bool = True,
+                    items: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    세로형 수집 결과를 (고유번호, 구분, 년도, 분기) x 항목 금액 표로 바꿉니다. 같은 칸에 값이 여럿이면 먼저 나온 값을 씁니다.
+    consolidated_first=True이면 연결 값이 하나라도 있는 기업은 연결만, 없는 기업은 별도만 남깁니다.
+    items를 주면 항목 컬럼을 그 목록(순서)으로 맞춥니다.
+    """
+    df = df.loc[:, INPUT_COLUMNS]
+    df = df.assign(corp_code=_padded_codes(df['corp_code']), 구분=df['구분'].astype(str),
+                   항목=df['항목'].astype(str), thstrm_amount=pd.to_numeric(df['thstrm_amount'], errors='coerce'))
+    df = df[df['thstrm_amount'].notna()]
+    if consolidated_first:
+        consolidated = df['구분'] == '연결'
+        df = df[consolidated | ~df['corp_code'].isin(df.loc[consolidated, 'corp_code'].unique())]
+
+    panel = (df.drop_duplicates(PERIOD_KEYS + ['항목'], keep='first')
+             .set_index(PERIOD_KEYS + ['항목'])['thstrm_amount'].astype('float64')
+             .unstack('항목'))
+    panel.columns.name = None
+    if items is not None:
+        panel = panel.reindex(columns=items)
+    return panel.sort_index().reset_index()
+
+def growth_rate(current: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    """
+    증감률(%) = (현재 - 이전) / |이전| x 100. 이전 값이 0이거나 어느 한쪽이 없으면 결측(NaN)입니다.
+    이전 값이 음수(적자)여도 개선되면 양수가 되도록 절댓값으로 나눕니다.
+    """
+    valid = ~np.isnan(current) & ~np.isnan(previous) & (previous != 0)
+    rate = np.full(len(current), np.nan)
+    rate[valid] = (current[valid] - previous[valid]) / np.abs(previous[valid]) * 100
+    return rate
+
+def _lagged(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    out = np.full(len(positions), np.nan)
+    found = positions >= 0
+    out[found] = values[positions[found]]
+    return out
+
+def _is_flow(item: str) -> bool:
+    return dart.ACCOUNT_SPECS.get(item, {}).get('kind', 'flow') in ('flow', 'ytd')
+
+def _incomplete_q4_keys(values: pd.DataFrame) -> set:
+    """
+    4분기 행이 있지만 같은 해 1~3분기가 모두 있지 않아 adjust_q4_values 보정이 불완전한 flow 항목의
+    (corp_code, 년도, 항목, 구분) 집합을 데이터에서 직접 구합니다.
+    """
+    flow = values[values['항목'].map(lambda item: dart.ACCOUNT_SPECS.get(item, {}).get('kind', 'flow') == 'flow')]
+    keys = ['corp_code', '년도', '항목', '구분']
+    quarters = flow[flow['분기'].isin([1, 2, 3])].groupby(keys)['분기'].nunique()
+    q4 = flow.loc[flow['분기'] == 4, keys].drop_duplicates()
+    counts = quarters.reindex(pd.MultiIndex.from_frame(q4)).fillna(0).to_numpy()
+    return {(code, int(year), item, fs) for (code, year, item, fs), count
+            in zip(q4.itertuples(index=False, name=None), counts) if count < 3}
+
+def _compute_metrics(df: pd.DataFrame, consolidated_first: bool = True,
+                     items: Optional[List[str]] = None) -> pd.DataFrame:
+    panel = quarterly_panel(df, consolidated_first, items)
+    items = [col for col in panel.columns if col not in PERIOD_KEYS]
+    if panel.empty:
+        return panel
+
+    group_id, _ = pd.factorize(pd.MultiIndex.from_frame(panel[['corp_code', '구분']]))
+    period_no = panel['년도'].to_numpy(dtype='int64') * 4 + panel['분기'].to_numpy(dtype='int64') - 1
+    keys = pd.Index(group_id.astype('int64') * _GROUP_STRIDE + period_no)
+    # 몇 분기 전 행의 위치 (없으면 -1)
+    lags = set(GROWTH_LAGS.values()) | set(range(1, TTM_QUARTERS))
+    lag_positions = {lag: keys.get_indexer(keys - lag) for lag in lags}
+
+    columns = {}
+    ttm = {}
+    for item in items:
+        values = panel[item].to_numpy(dtype='float64')
+        for suffix, lag in GROWTH_LAGS.items():
+            columns[f"{item}_{suffix}"] = growth_rate(values, _lagged(values, lag_positions[lag]))
+        if _is_flow(item):
+            # 4개 분기 중 하나라도 없으면 결측이 되도록 NaN을 그대로 더합니다
+            total = values.copy()
+            for lag in range(1, TTM_QUARTERS):
+                total += _lagged(values, lag_positions[lag])
+            ttm[item] = total
+            columns[f"{item}_TTM"] = total
+            columns[f"{item}_TTM_YoY"] = growth_rate(total, _lagged(total, lag_positions[4]))
+
+    for name, (numerator, denominator) in MARGINS.items():
+        if numerator not in panel.columns or denominator not in panel.columns:
+            continue
+        margin = dart.operating_margin(panel[denominator], panel[numerator])
+        columns[name] = margin
+        for suffix, lag in GROWTH_LAGS.items():
+            columns[f"{name}_{suffix}"] = margin - _lagged(margin, lag_positions[lag])
+        if numerator in ttm and denominator in ttm:
+            ttm_margin = dart.operating_margin(ttm[denominator], ttm[numerator])
+            columns[f"{name}_TTM"] = ttm_margin
+            columns[f"{name}_TTM_YoY"] = ttm_margin - _lagged(ttm_margin, lag_positions[4])
+
+    return pd.concat([panel, pd.DataFrame(columns, index=panel.index)], axis=1)
+
+def partition_by_corp(df: pd.DataFrame, parts: int) -> List[pd.DataFrame]:
+    """
+    고유번호 순으로 기업을 parts개 묶음으로 나눕니다 (한 기업의 행은 항상 같은 묶음, 묶음 순서대로 이으면 고유번호 순).
+    """
+    codes = _padded_codes(df['corp_code']).astype(str)
+    unique = np.unique(codes)
+    bounds = unique[np.linspace(0, len(unique), parts + 1, dtype='int64')[1:-1]]
+    chunk = np.searchsorted(bounds, codes, side='right')
+    return [df[chunk == i] for i in range(parts) if (chunk == i).any()]
+
+@dart.instrumented('derived_metrics')
+def derived_metrics(df: pd.DataFrame, workers: int = 1, consolidated_first: bool = True,
+                    corp_code: Optional[str] = None) -> pd.DataFrame:
+    """
+    수집 결과 전체의 파생 지표를 계산해 (고유번호, 구분, 년도, 분기) 순으로 정렬된 DataFrame으로 반환합니다.
+    workers가 2 이상이면 기업을 workers개 묶음으로 나눠 별도 프로세스에서 계산합니다 (결과는 같음).
+    corp_code 컬럼이 없는 한 기업의 수집 결과는 corp_code를 함께 넘깁니다.
+    """
+    if 'corp_code' not in df.columns:
+        if corp_code is None:
+            raise ValueError("corp_code 컬럼이 없으면 corp_code 인자가 필요합니다.")
+        df = df.assign(corp_code=str(corp_code).zfill(8))
+    df = df.loc[:, INPUT_COLUMNS]
+
+    parts = partition_by_corp(df, workers) if workers > 1 and not df.empty else [df]
+    if len(parts) == 1:
+        result = _compute_metrics(parts[0], consolidated_first)
+    else:
+        # 묶음마다 있는 항목이 달라도 같은 컬럼이 나오도록 전체 항목 목록을 함께 넘깁니다
+        items = sorted(df.loc[pd.to_numeric(df['thstrm_amount'], errors='coerce').notna(), '항목'].astype(str).unique())
+        with ProcessPoolExecutor(max_workers=len(parts)) as pool:
+            results = list(pool.map(_compute_metrics, parts, repeat(consolidated_first), repeat(items)))
+        result = pd.concat(results, ignore_index=True)
+    dart.metrics.incr('derived_metric_rows', len(result))
+    return result
+
+def latest_metrics(metrics_df: pd.DataFrame, year_month: Optional[int] = None) -> pd.DataFrame:
+    """
+    (고유번호, 구분)마다 가장 최근 분기(year_month를 주면 그 분기 이전 중 가장 최근) 행만 남깁니다.
+    """
+    if year_month is not None:
+        quarter, year, _ = dart.get_quarter_info(year_month)
+        period = metrics_df['년도'] * 10 + metrics_df['분기']
+        metrics_df = metrics_df[period <= year * 10 + quarter]
+    # derived_metrics 결과는 이미 (고유번호, 구분, 년도, 분기) 순이므로 그룹의 마지막 행이 최신입니다
+    return metrics_df.drop_duplicates(['corp_code', '구분'], keep='last').reset_index(drop=True)
+
+# 스크리닝 조건: "지표 연산자 숫자" (예: 영업이익률>15, 매출액_YoY >= 0)
+SCREENING_OPERATORS = ('>=', '<=', '!=', '=', '>', '<')
+_CONDITION_PATTERN = re.compile(r'^\s*(.+?)\s*(>=|<=|!=|=|>|<)\s*([-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)\s*$')
+
+def parse_condition(text: str) -> Tuple[str, str, float]:
+    """
+    "영업이익률>15" 형식의 조건을 (지표, 연산자, 값)으로 나눕니다.
+    """
+    match = _CONDITION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"조건 형식 오류: {text} (예: 영업이익률>15, 매출액_YoY>=0)")
+    return match.group(1), match.group(2), float(match.group(3))
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+class ScreeningIndex:
+    """
+    파생 지표를 (고유번호, 구분, 년도, 분기)마다 한 행으로 SQLite에 미리 계산해 두고 조건 검색에 답합니다.
+    분기 금액(quarterly_values)을 함께 보관해 새 보고기간이 들어오면(update) 그 기업의 지표만 다시 계산하며,
+    지표 컬럼은 처음 나올 때 추가합니다. 조건 검색은 (년도, 분기) 인덱스나 기업별 최신 분기(is_latest) 부분 인덱스로
+    해당 분기의 행만 읽습니다. 지표는 derived_metrics와 같이 기업마다 연결 우선으로 계산합니다.
+    """
+
+    KEY_COLUMNS = ('corp_code', '구분', '년도', '분기')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quarterly_values ("
+            " corp_code TEXT NOT NULL, 구분 TEXT NOT NULL, 년도 INTEGER NOT NULL, 분기 INTEGER NOT NULL,"
+            " 항목 TEXT NOT NULL, thstrm_amount REAL NOT NULL,"
+            " PRIMARY KEY (corp_code, 구분, 년도, 분기, 항목)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metrics ("
+            " corp_code TEXT NOT NULL, 구분 TEXT NOT NULL, 년도 INTEGER NOT NULL, 분기 INTEGER NOT NULL,"
+            " is_latest INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (corp_code, 구분, 년도, 분기))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS metrics_period ON metrics (년도, 분기)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS metrics_latest ON metrics (corp_code) WHERE is_latest = 1")
+        self._conn.commit()
+        self._columns = [row[1] for row in self._conn.execute("PRAGMA table_info(metrics)")
+                         if row[1] not in self.KEY_COLUMNS + ('is_latest', 'updated_at')]
+
+    @property
+    def columns(self) -> List[str]:
+        """
+        조건에 쓸 수 있는 지표 컬럼 목록입니다.
+        """
+        return list(self._columns)
+
+    def _write_metrics(self, metrics_df: pd.DataFrame) -> None:
+        if metrics_df.empty:
+            return
+        names = [col for col in metrics_df.columns if col not in self.KEY_COLUMNS]
+        for name in names:
+            if name not in self._columns:
+                self._conn.execute(f"ALTER TABLE metrics ADD COLUMN {_quote(name)} REAL")
+                self._columns.append(name)
+        # 결과가 (고유번호, 구분, 년도, 분기) 순이므로 그룹의 마지막 행이 최신 분기입니다
+        latest = (~metrics_df.duplicated(['corp_code', '구분'], keep='last')).astype(int)
+        values = metrics_df[names].astype(object).where(metrics_df[names].notna(), None)
+        frame = pd.concat([metrics_df[list(self.KEY_COLUMNS)].astype(object), latest.rename('is_latest'),
+                           pd.Series(time.time(), index=metrics_df.index, name='updated_at'), values], axis=1)
+        columns = ', '.join(_quote(col) for col in frame.columns)
+        self._conn.executemany(f"INSERT OR REPLACE INTO metrics ({columns}) VALUES ({', '.join('?' * frame.shape[1])})",
+                               frame.itertuples(index=False, name=None))
+
+    def _write_values(self, df: pd.DataFrame) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO quarterly_values VALUES (?, ?, ?, ?, ?, ?)",
+            zip(df['corp_code'], df['구분'], df['년도'].astype(int).tolist(), df['분기'].astype(int).tolist(),
+                df['항목'], df['thstrm_amount'].astype(float).tolist())
+        )
+
+    @staticmethod
+    def _values_frame(df: pd.DataFrame, corp_code: Optional[str] = None) -> Tuple[pd.DataFrame, int]:
+        has_corp_code = 'corp_code' in df.columns
+        if not has_corp_code:
+            df = df.assign(corp_code=corp_code)
+        values = df.loc[:, INPUT_COLUMNS]
+        values = values.assign(corp_code=_padded_codes(values['corp_code']), 구분=values['구분'].astype(str),
+                               항목=values['항목'].astype(str),
+                               thstrm_amount=pd.to_numeric(values['thstrm_amount'], errors='coerce'))
+        # 1~3분기가 모두 있지 않아 보정이 불완전한 4분기 값은 누적값이 섞여 있으므로 넣지 않습니다.
+        # attrs가 없는 입력(저장소/Parquet/CSV)도 같은 기준이 되도록 데이터에서 직접 다시 찾습니다
+        incomplete = _incomplete_q4_keys(values)
+        for entry in df.attrs.get('q4_incomplete', []):
+            code, (year, item, fs) = (entry[0], entry[1:4]) if has_corp_code else (corp_code, entry[:3])
+            incomplete.add((str(code).zfill(8), int(year), str(item), str(fs)))
+        excluded = 0
+        if incomplete:
+            keys = zip(values['corp_code'], values['년도'].astype(int), values['항목'], values['구분'])
+            keep = [quarter != 4 or key not in incomplete for quarter, key in zip(values['분기'].tolist(), keys)]
+            excluded = len(keep) - sum(keep)
+            values = values[keep]
+        return values[values['thstrm_amount'].notna()], excluded
+
+    def update(self, corp_code: str, df: pd.DataFrame) -> None:
+        """
+        한 기업의 수집 결과(collect_quarterly_financials 반환값)로 분기 금액을 갱신하고, 저장된 전체 기간으로
+        그 기업의 파생 지표를 다시 계산합니다.
+        """
+        corp_code = str(corp_code).zfill(8)
+        values, _ = self._values_frame(df, corp_code)
+        with self._lock:
+            self._write_values(values)
+            history = pd.DataFrame(self._conn.execute(
+                "SELECT corp_code, 구분, 년도, 분기, 항목, thstrm_amount FROM quarterly_values WHERE corp_code = ?",
+                (corp_code,)).fetchall(), columns=INPUT_COLUMNS)
+            self._conn.execute("DELETE FROM metrics WHERE corp_code = ?", (corp_code,))
+            self._write_metrics(derived_metrics(history))
+            self._conn.commit()
+        dart.metrics.incr('screening_index_updates')
+
+    def rebuild(self, collected: pd.DataFrame, metrics_df: Optional[pd.DataFrame] = None, workers: int = 1) -> None:
+        """
+        수집 결과 전체(여러 기업)로 인덱스를 새로 만듭니다. 이미 계산한 derived_metrics 결과가 있으면 metrics_df로 넘깁니다.
+        update()와 같은 지표가 되도록, 보정이 불완전한 4분기 값(데이터에서 다시 찾으므로 attrs가 없는 입력도 해당)이 있으면
+        metrics_df를 쓰지 않고 그 값을 뺀 분기 금액으로 다시 계산합니다.
+        """
+        values, excluded = self._values_frame(collected)
+        if metrics_df is None or excluded:
+            metrics_df = derived_metrics(values, workers=workers)
+        with self._lock:
+            self._conn.execute("DELETE FROM quarterly_values")
+            self._conn.execute("DELETE FROM metrics")
+            self._write_values(values)
+            self._write_metrics(metrics_df)
+            self._conn.commit()
+
+    def screen(self, conditions: Iterable, year_month: Optional[int] = None, order_by: Optional[str] = None,
+               ascending: bool = False, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        조건(문자열 "영업이익률>15" 또는 (지표, 연산자, 값))을 모두 만족하는 기업-분기 행을 반환합니다.
+        year_month를 주면 그 분기, 없으면 기업마다 가장 최근 분기를 대상으로 하며, 지표가 결측인 행은 조건을 만족하지 않습니다.
+        """
+        parsed = [parse_condition(c) if isinstance(c, str) else tuple(c) for c in conditions]
+        with self._lock:
+            known = set(self._columns)
+            unknown = [name for name, _, _ in parsed if name not in known]
+            if order_by and order_by not in known | set(self.KEY_COLUMNS):
+                unknown.append(order_by)
+            if unknown:
+                raise ValueError(f"알 수 없는 지표: {', '.join(unknown)} (사용 가능: {', '.join(self._columns)})")
+            bad = [op for _, op, _ in parsed if op not in SCREENING_OPERATORS]
+            if bad:
+                raise ValueError(f"알 수 없는 연산자: {', '.join(bad)} (사용 가능: {' '.join(SCREENING_OPERATORS)})")
+
+            where, params = [], []
+            if year_month is None:
+                where.append("is_latest = 1")
+            else:
+                quarter, year, _ = dart.get_quarter_info(year_month)
+                where += ["년도 = ?", "분기 = ?"]
+                params += [year, quarter]
+            for name, op, value in parsed:
+                where.append(f"{_quote(name)} {op} ?")
+                params.append(float(value))
+            columns = list(self.KEY_COLUMNS) + self._columns
+            # NULLS LAST(SQLite 3.30 이상) 대신 IS NULL로 결측을 뒤로 보냅니다
+            order = (f"{_quote(order_by)} IS NULL, {_quote(order_by)} {'ASC' if ascending else 'DESC'}, "
+                     if order_by else "")
+            query = (f"SELECT {', '.join(_quote(col) for col in columns)} FROM metrics WHERE {' AND '.join(where)}"
+                     f" ORDER BY {order}corp_code, 구분" + (f" LIMIT {int(limit)}" if limit else ""))
+            rows = self._conn.execute(query, params).fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def load_collected(store: Optional[str] = None, parquet_dir: Optional[str] = None, input_file: Optional[str] = None,
+                   accounts: Optional[Iterable[str]] = None, years: Optional[List[int]] = None) -> pd.DataFrame:
+    """
+    계정 시계열 저장소, Parquet 데이터셋, 배치 결과 파일(.csv/.jsonl) 중 하나에서 수집 결과를 읽습니다.
+    """
+    if store:
+        return dart.TimeSeriesStore(store).frame(accounts=accounts, years=years)
+    if parquet_dir:
+        return dart.read_parquet_dataset(parquet_dir, years=years)
+    if input_file.endswith('.jsonl'):
+        df = pd.read_json(input_file, lines=True, dtype={'corp_code': str})
+    else:
+        df = pd.read_csv(input_file, dtype={'corp_code': str}, encoding='utf-8-sig')
+    return df[df['년도'].isin(years)] if years else df
+
+def write_result(result: pd.DataFrame, output: Optional[str] = None) -> None:
+    """
+    결과를 CSV 파일로 저장하거나, output이 없으면 상위 행만 출력합니다.
+    """
+    if output:
+        result.to_csv(output, index=False, encoding='utf-8-sig')
+        print(f"💾 결과 저장 완료: {output} ({len(result)}행)")
+    else:
+        with pd.option_context('display.max_columns', None, 'display.width', 200):
+            print(result.head(20).to_string(index=False))
+
+def screen_main(argv: List[str]) -> None:
+    """
+    스크리닝 인덱스에서 조건을 모두 만족하는 기업을 찾습니다.
+    """
+    parser = argparse.ArgumentParser(prog="dart_analytics.py screen",
+                                     description="스크리닝 인덱스에서 조건을 모두 만족하는 기업을 찾습니다.")
+    parser.add_argument('conditions', nargs='*', help="조건 (예: 영업이익률>15 매출액_YoY>0)")
+    parser.add_argument('--index', default=dart.SCREENING_DB_FILE or None,
+                        help="스크리닝 인덱스(SQLite) 경로 (기본값: DART_SCREENING_DB)")
+    parser.add_argument('-p', '--period', help="대상 분기 (YYYYMM, 기본값: 기업마다 가장 최근 분기)")
+    parser.add_argument('--order', help="정렬할 지표 (기본값: 내림차순)")
+    parser.add_argument('--ascending', action='store_true', help="오름차순 정렬")
+    parser.add_argument('--limit', type=int, help="최대 결과 수")
+    parser.add_argument('--list', action='store_true', help="사용할 수 있는 지표 목록 출력")
+    parser.add_argument('-o', '--output', help="결과 CSV 파일 (없으면 상위 행만 출력)")
+    args = parser.parse_args(argv)
+    if not args.index:
+        parser.error("--index(또는 DART_SCREENING_DB)가 필요합니다.")
+    if not os.path.exists(args.index):
+        parser.error(f"스크리닝 인덱스가 없습니다: {args.index} (batch --index 또는 dart_analytics.py --index로 생성)")
+
+    index = ScreeningIndex(args.index)
+    if args.list:
+        print(", ".join(index.columns))
+        return
+    started = time.perf_counter()
+    try:
+        result = index.screen(args.conditions, int(args.period) if args.period else None,
+                              order_by=args.order, ascending=args.ascending, limit=args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"🔎 조건 {len(args.conditions)}개, {len(result)}건 ({(time.perf_counter() - started) * 1000:.1f}ms)")
+    write_result(result, args.output)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    if argv and argv[0] == 'screen':
+        screen_main(argv[1:])
+        return
+    parser = argparse.ArgumentParser(description="수집된 분기 재무정보로 기업별 파생 지표(YoY/QoQ, TTM, 이익률)를 계산합니다.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--store', help="계정 시계열 저장소(SQLite) 경로")
+    source.add_argument('--parquet', help="export_parquet으로 쌓은 Parquet 데이터셋 디렉터리")
+    source.add_argument('--input', help="batch 결과 파일 (.csv 또는 .jsonl)")
+    parser.add_argument('--accounts', help="저장소에서 읽을 항목 (쉼표 구분, 기본값: 매출액,영업이익)")
+    parser.add_argument('--years', help="읽을 연도 (쉼표 구분, TTM/YoY에는 전년도 자료도 필요)")
+    parser.add_argument('--workers', type=int, default=1, help="계산 프로세스 수 (기본값 1)")
+    parser.add_argument('--all-fs', action='store_true', help="연결/별도를 모두 계산 (기본값: 기업마다 연결 우선)")
+    parser.add_argument('--latest', action='store_true', help="기업마다 가장 최근 분기만 출력")
+    parser.add_argument('-p', '--period', help="--latest 기준 분기 (YYYYMM)")
+    parser.add_argument('--query', help="결과를 거를 pandas 조건식 (예: \"`영업이익률_TTM` > 10\")")
+    parser.add_argument('--index', help="계산 결과로 새로 만들 스크리닝 인덱스(SQLite) 경로")
+    parser.add_argument('-o', '--output', help="결과 CSV 파일 (없으면 상위 행만 출력)")
+    args = parser.parse_args(argv)
+
+    accounts = [name.strip() for name in args.accounts.split(',') if name.strip()] if args.accounts else None
+    years = [int(y) for y in args.years.split(',') if y.strip()] if args.years else None
+    try:
+        if accounts is not None:
+            dart.account_specs(accounts)
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    collected = load_collected(args.store, args.parquet, args.input, accounts, years)
+    loaded = time.perf_counter()
+    result = derived_metrics(collected, workers=max(1, args.workers), consolidated_first=not args.all_fs)
+    computed = time.perf_counter()
+    if args.index:
+        # 인덱스는 update와 같은 기준(연결 우선)으로 만들어야 이후 수집분과 섞이지 않습니다
+        ScreeningIndex(args.index).rebuild(collected, None if args.all_fs else result, workers=max(1, args.workers))
+        print(f"🗂️ 스크리닝 인덱스 생성: {args.index} ({time.perf_counter() - computed:.2f}초)")
+    if args.latest:
+        result = latest_metrics(result, int(args.period) if args.period else None)
+    if args.query:
+        result = result.query(args.query).reset_index(drop=True)
+
+    print(f"⏱️ 읽기 {loaded - started:.2f}초 ({len(collected)}행), 파생 지표 계산 {computed - loaded:.2f}초 "
+          f"({result['corp_code'].nunique() if not result.empty else 0}개 기업, 프로세스 {max(1, args.workers)}개)")
+    write_result(result, args.output)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,102 +1,1632 @@
-import requests
-import pandas as pd
+from __future__ import annotations
+
 import os
+import json
+import pickle
+import sys
+import time
+import threading
+import random
+import argparse
+import sqlite3
+import zlib
+import bisect
+import heapq
+import importlib
+import re
+import unicodedata
+from array import array
 import zipfile
-import io
-import xml.etree.ElementTree as ET
-from datetime import datetime
-from typing import Optional, Dict, List
+import tempfile
+from datetime import datetime, date, timedelta
+from typing import TYPE_CHECKING, Optional, Dict, List, Tuple, Iterable, Iterator
 import warnings
-from dotenv import load_dotenv
+import functools
+import hashlib
+import html
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from concurrent.futures import ThreadPoolExecutor, CancelledError, Future, as_completed
+
+if TYPE_CHECKING:
+    from dart_analytics import ScreeningIndex
+
+class _LazyModule:
+    """
+    처음 속성에 접근할 때 실제 모듈을 import하고 이 모듈의 전역 이름을 실제 모듈로 바꿉니다.
+    회사명 조회(lookup)처럼 pandas/requests가 필요 없는 실행 경로는 이 모듈들을 import하지 않아 시작 시간이 짧습니다.
+    타입 주석은 from __future__ import annotations로 문자열로만 남으므로 정의 시점에 import되지 않습니다.
+    """
+
+    def __init__(self, module_name: str, alias: str):
+        self._module_name = module_name
+        self._alias = alias
+
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self._module_name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+pd = _LazyModule('pandas', 'pd')
+np = _LazyModule('numpy', 'np')
+requests = _LazyModule('requests', 'requests')
+ET = _LazyModule('xml.etree.ElementTree', 'ET')
+
+def load_dotenv(*args, **kwargs) -> bool:
+    """
+    python-dotenv의 load_dotenv를 호출 시점에 import해 실행합니다 (데몬에 조회를 맡기는 경로에서는 import하지 않음).
+    """
+    from dotenv import load_dotenv as _load_dotenv
+    return _load_dotenv(*args, **kwargs)
+
+# ==========================================
+# 0. Open DART 요청 공통 (연결 풀, 재시도, 요청 한도 관리)
+# ==========================================
+
+# Open DART API 기본 주소 (로컬 대역 서버로 바꿀 때 환경 변수 DART_API_BASE 사용)
+DART_API_BASE = os.getenv("DART_API_BASE", "https://opendart.fss.or.kr/api").rstrip('/')
+
+# Open DART 요청 한도 (환경 변수로 변경 가능, 0이면 제한 없음)
+DART_DAILY_LIMIT = int(os.getenv("DART_DAILY_LIMIT", "20000"))
+DART_PER_MINUTE_LIMIT = int(os.getenv("DART_PER_MINUTE_LIMIT", "1000"))
+# 일일 사용량을 기록해 여러 프로세스가 함께 쓰는 SQLite 파일 (빈 문자열이면 프로세스 안에서만 셈)
+QUOTA_DB_FILE = os.getenv("DART_QUOTA_DB", "dart_quota.sqlite3")
+# 요청을 나눠 보낼 추가 API 키 (쉼표 구분). 요청마다 오늘 남은 한도가 가장 많은 키를 사용
+DART_API_KEYS = [key.strip() for key in os.getenv("DART_API_KEYS", "").split(',') if key.strip()]
+# 일일 한도 중 background(배치) 요청이 쓰지 않고 대화형 조회용으로 남겨 둘 요청 수
+INTERACTIVE_RESERVE = int(os.getenv("DART_INTERACTIVE_RESERVE", "0"))
+
+# 요청 우선순위: 대화형 조회가 배치/백그라운드 갱신보다 먼저 토큰을 얻습니다
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+
+# 재시도 설정: 최대 재시도 횟수, 지수 백오프 시작/최대 대기 시간(초)
+HTTP_MAX_RETRIES = int(os.getenv("DART_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = 0.5
+HTTP_BACKOFF_MAX = 30.0
+# 공유 세션의 호스트당 keep-alive 연결 수
+HTTP_POOL_SIZE = int(os.getenv("DART_HTTP_POOL_SIZE", "32"))
+
+# DART 응답 상태 코드
+DART_STATUS_OK = '000'
+DART_STATUS_NO_DATA = '013'
+DART_STATUS_RATE_LIMITED = '020'
+# 잠시 후 다시 시도하면 성공할 수 있는 상태 (020: 요청 제한 초과, 800: 시스템 점검, 900: 정의되지 않은 오류)
+DART_RETRYABLE_STATUSES = {DART_STATUS_RATE_LIMITED, '800', '900'}
+
+class DartApiError(Exception):
+    """
+    재시도 후에도 실패한 DART 요청(네트워크 오류, HTTP 오류, 인증키 오류 등)을 나타냅니다.
+    '데이터 없음'(013)과 구분하기 위해 사용하며, status에는 DART 상태 코드가 있으면 담깁니다.
+    """
+
+    def __init__(self, message: str, status: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+
+class DartQuotaExceeded(Exception):
+    """
+    일일 요청 한도를 모두 사용했을 때 발생합니다.
+    """
+
+# 실행 계측 결과를 기록할 파일 (.prom이면 Prometheus 텍스트, 그 외에는 JSON, 빈 값이면 기록 안 함)
+METRICS_FILE = os.getenv("DART_METRICS_FILE", "")
+
+class RunMetrics:
+    """
+    실행 중 단계별 소요 시간과 카운터(요청 수, 캐시 적중/실패, 다운로드 바이트, 재시도, 처리 행 수)를 모읍니다.
+    여러 스레드에서 동시에 기록할 수 있으며, 단계 시간은 스레드별 소요 시간의 합입니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self._counters: Dict[str, int] = {}
+            self._timers: Dict[str, List[float]] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            timer = self._timers.get(stage)
+            if timer is None:
+                timer = self._timers[stage] = [0.0, 0, 0.0]
+            timer[0] += seconds
+            timer[1] += 1
+            timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        """
+        지금까지의 계측 결과를 JSON으로 직렬화할 수 있는 dict로 반환합니다.
+        """
+        with self._lock:
+            return {
+                'started_at': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'elapsed_s': round(time.time() - self.started, 3),
+                'counters': dict(sorted(self._counters.items())),
+                'stages': {stage: {'seconds': round(total, 6), 'calls': calls, 'max_s': round(longest, 6)}
+                           for stage, (total, calls, longest) in sorted(self._timers.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        계측 결과를 Prometheus 텍스트 형식(node_exporter textfile 수집기 등)으로 반환합니다.
+        """
+        summary = self.summary()
+        lines = ['# HELP dart_run_elapsed_seconds 계측 시작 이후 경과 시간',
+                 '# TYPE dart_run_elapsed_seconds gauge',
+                 f"dart_run_elapsed_seconds {summary['elapsed_s']}"]
+        for name, value in summary['counters'].items():
+            lines.append(f"# TYPE dart_{name}_total counter")
+            lines.append(f"dart_{name}_total {value}")
+        for metric, field in (('dart_stage_seconds_total', 'seconds'), ('dart_stage_calls_total', 'calls'),
+                              ('dart_stage_max_seconds', 'max_s')):
+            lines.append(f"# TYPE {metric} {'gauge' if field == 'max_s' else 'counter'}")
+            for stage, values in summary['stages'].items():
+                lines.append(f'{metric}{{stage="{stage}"}} {values[field]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        계측 결과를 파일에 기록합니다 (.prom이면 Prometheus 텍스트, 그 외에는 JSON).
+        """
+        if path.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.summary(), ensure_ascii=False, indent=2)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_file, path)
+
+    def format_stages(self, limit: int = 6) -> str:
+        """
+        소요 시간이 큰 단계부터 한 줄 요약을 만듭니다 (예: "http 12.3s/380건, numeric_convert 1.2s/370건").
+        """
+        stages = sorted(self.summary()['stages'].items(), key=lambda item: item[1]['seconds'], reverse=True)
+        return ", ".join(f"{stage} {values['seconds']:.2f}s/{values['calls']}건" for stage, values in stages[:limit])
+
+metrics = RunMetrics()
+
+def instrumented(stage: str):
+    """
+    함수 실행 시간을 metrics의 stage 단계로 기록하는 데코레이터입니다.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+_request_context = threading.local()
+
+def current_priority() -> str:
+    """
+    현재 스레드에서 보내는 DART 요청의 우선순위 (기본값 interactive).
+    """
+    return getattr(_request_context, 'priority', PRIORITY_INTERACTIVE)
+
+@contextmanager
+def request_priority(priority: Optional[str]):
+    """
+    with 블록 안에서 현재 스레드가 보내는 요청의 우선순위를 바꿉니다 (None이면 그대로).
+    수집 함수는 호출한 스레드의 우선순위를 요청 스레드에도 그대로 적용합니다.
+    """
+    if priority is None:
+        yield
+        return
+    if priority not in (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND):
+        raise ValueError(f"알 수 없는 우선순위: {priority}")
+    previous = current_priority()
+    _request_context.priority = priority
+    try:
+        yield
+    finally:
+        _request_context.priority = previous
+
+def quota_key_id(api_key: Optional[str]) -> str:
+    """
+    사용량 기록에 쓰는 API 키 식별자 (키 원문은 파일에 남기지 않습니다).
+    """
+    return hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]
+
+class QuotaLedger:
+    """
+    API 키·날짜별 DART 요청 사용량을 SQLite에 기록합니다. 사용량 증가는 한도 검사와 함께 한 쓰기 트랜잭션
+    (BEGIN IMMEDIATE)으로 처리되므로 같은 파일을 쓰는 여러 프로세스가 동시에 요청해도 한도를 넘지 않습니다.
+    UPSERT/RETURNING을 쓰지 않으므로 오래된 SQLite(3.35 미만)에서도 동작합니다.
+    """
+
+    def __init__(self, path: str = QUOTA_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota_usage ("
+            " key_id TEXT NOT NULL, day TEXT NOT NULL, used INTEGER NOT NULL,"
+            " PRIMARY KEY (key_id, day))"
+        )
+
+    def reserve(self, key_id: str, day: str, limit: int) -> Tuple[bool, int]:
+        """
+        사용량이 limit 미만(0이면 제한 없음)일 때만 1 늘리고 (성공 여부, 현재 사용량)을 반환합니다.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("INSERT OR IGNORE INTO quota_usage (key_id, day, used) VALUES (?, ?, 0)",
+                                   (key_id, day))
+                updated = self._conn.execute(
+                    "UPDATE quota_usage SET used = used + 1 WHERE key_id = ? AND day = ? AND (? = 0 OR used < ?)",
+                    (key_id, day, limit, limit)).rowcount
+                used = self.used(key_id, day)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return updated == 1, used
+
+    def used(self, key_id: str, day: str) -> int:
+        row = self._conn.execute("SELECT used FROM quota_usage WHERE key_id = ? AND day = ?",
+                                 (key_id, day)).fetchone()
+        return row[0] if row else 0
+
+    def usage(self, day: str) -> Dict[str, int]:
+        return dict(self._conn.execute("SELECT key_id, used FROM quota_usage WHERE day = ?", (day,)).fetchall())
+
+class RateLimiter:
+    """
+    모든 DART 요청이 공유하는 요청 한도 관리자입니다.
+    API 키마다 분당 한도만큼 토큰이 일정한 속도로 채워지는 토큰 버킷을 두고, 일일 한도를 넘으면 DartQuotaExceeded를 발생시킵니다.
+    ledger_path를 주면 일일 사용량을 SQLite(QuotaLedger)에 기록해 같은 키를 쓰는 여러 프로세스가 한도를 나눠 씁니다.
+    background 요청은 interactive 요청이 토큰을 기다리는 동안 양보하며, 일일 한도 중 interactive_reserve건은 쓰지 않습니다.
+    keys를 주면 요청마다 그 중 오늘 남은 한도가 가장 많은 키를 골라 씁니다.
+    """
+
+    def __init__(self, per_minute: int = DART_PER_MINUTE_LIMIT, per_day: int = DART_DAILY_LIMIT,
+                 ledger_path: str = QUOTA_DB_FILE, keys: Optional[List[str]] = None,
+                 interactive_reserve: int = INTERACTIVE_RESERVE):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.ledger_path = ledger_path
+        self.keys = list(DART_API_KEYS if keys is None else keys)
+        self.interactive_reserve = interactive_reserve
+        self._ledger: Optional[QuotaLedger] = None
+        self._buckets: Dict[Optional[str], List[float]] = {}
+        self._day = datetime.now().date()
+        self._used: Dict[Optional[str], int] = {}
+        self._interactive_waiting = 0
+        self._cond = threading.Condition()
+
+    @property
+    def ledger(self) -> Optional[QuotaLedger]:
+        # 첫 요청 때 엽니다 (모듈을 불러오기만 해도 파일이 생기지 않도록)
+        if self._ledger is None and self.ledger_path:
+            self._ledger = QuotaLedger(self.ledger_path)
+        return self._ledger
+
+    def _roll_day(self) -> None:
+        today = datetime.now().date()
+        if today != self._day:
+            self._day, self._used = today, {}
+
+    def key_pool(self, api_key: Optional[str]) -> List[Optional[str]]:
+        return list(dict.fromkeys([api_key] + self.keys)) if self.keys else [api_key]
+
+    def usage_today(self, api_key: Optional[str] = None) -> Dict[Optional[str], int]:
+        """
+        요청에 쓸 수 있는 키별 오늘 사용량 (원장이 있으면 다른 프로세스의 사용량도 포함).
+        """
+        with self._cond:
+            self._roll_day()
+            pool = self.key_pool(api_key) if api_key else self.keys or list(self._used) or [None]
+            if self.ledger:
+                day = self._day.isoformat()
+                for key in pool:
+                    self._used[key] = self.ledger.used(quota_key_id(key), day)
+            return {key: self._used.get(key, 0) for key in pool}
+
+    @property
+    def remaining_today(self) -> Optional[int]:
+        if not self.per_day:
+            return None
+        return sum(max(0, self.per_day - used) for used in self.usage_today().values())
+
+    def acquire(self, api_key: Optional[str] = None, priority: Optional[str] = None) -> Optional[str]:
+        """
+        요청 1건에 해당하는 토큰을 얻을 때까지 기다리고, 이 요청에 쓸 API 키를 반환합니다.
+        """
+        background = (priority or current_priority()) == PRIORITY_BACKGROUND
+        limit = max(0, self.per_day - self.interactive_reserve) if background and self.per_day else self.per_day
+        pool = self.key_pool(api_key)
+        if not background:
+            with self._cond:
+                self._interactive_waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    # 토큰을 기다리던 background 요청도 깨어날 때마다 대기 중인 interactive 요청에 양보합니다
+                    while background and self._interactive_waiting:
+                        self._cond.wait()
+                    self._roll_day()
+                    key, wait = self._take_token(pool, limit, background)
+                if wait is None:
+                    return key
+                metrics.add_time('rate_limit_wait', wait)
+                time.sleep(wait)
+        finally:
+            if not background:
+                with self._cond:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    def _take_token(self, pool: List[Optional[str]], limit: int,
+                    background: bool) -> Tuple[Optional[str], Optional[float]]:
+        """
+        남은 한도가 많은 키부터 토큰이 있는 키를 골라 사용량을 기록하고 (선택한 키, None)을 반환합니다.
+        모든 키의 토큰이 비었으면 토큰이 찰 때까지의 (None, 대기 시간)을 반환합니다.
+        """
+        if not self.per_minute and not self.per_day and not self.ledger:
+            return pool[0], None
+        candidates = sorted((key for key in pool if not limit or self._used.get(key, 0) < limit),
+                            key=lambda key: self._used.get(key, 0))
+        wait = None
+        for key in candidates:
+            if self.per_minute:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(key, (float(self.per_minute), now))
+                tokens = min(float(self.per_minute), tokens + (now - updated) * self.per_minute / 60.0)
+                self._buckets[key] = [tokens, now]
+                if tokens < 1:
+                    needed = (1 - tokens) * 60.0 / self.per_minute
+                    wait = needed if wait is None else min(wait, needed)
+                    continue
+            if self.ledger:
+                ok, used = self.ledger.reserve(quota_key_id(key), self._day.isoformat(), limit)
+                self._used[key] = used
+                if not ok:
+                    continue
+            else:
+                self._used[key] = self._used.get(key, 0) + 1
+            if self.per_minute:
+                self._buckets[key][0] -= 1
+            return key, None
+        if wait is not None:
+            return None, wait
+        if background and self.interactive_reserve:
+            raise DartQuotaExceeded(f"일일 요청 한도({self.per_day}건) 중 배치용 한도를 모두 사용했습니다 "
+                                    f"(대화형 조회용 {self.interactive_reserve}건 남김).")
+        raise DartQuotaExceeded(f"일일 요청 한도({self.per_day}건)를 모두 사용했습니다.")
+
+class RequestCoalescer:
+    """
+    같은 키의 요청이 진행 중이면 새로 보내지 않고 그 결과(또는 예외)를 함께 받게 합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[tuple, Future] = {}
+
+    def run(self, key: tuple, fn):
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            metrics.incr('coalesced_requests')
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._pending[key]
+
+rate_limiter = RateLimiter()
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """
+    모든 DART 호출이 공유하는 keep-alive 세션을 반환합니다 (요청마다 TCP/TLS 연결을 새로 맺지 않음).
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            from requests.adapters import HTTPAdapter
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+def backoff_delay(attempt: int) -> float:
+    """
+    attempt번째 재시도 전 대기 시간(초): 지수 백오프에 지터를 더해 동시 재시도가 몰리지 않게 합니다.
+    """
+    cap = min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt))
+    return cap / 2 + random.uniform(0, cap / 2)
+
+def dart_get(url: str, params: dict, timeout: float = 10, **kwargs) -> requests.Response:
+    """
+    요청 한도를 확인한 뒤 공유 세션으로 DART API에 GET 요청을 보냅니다. 모든 DART 호출은 이 함수를 거칩니다.
+    네트워크 오류(연결·시간 초과·본문 끊김/디코딩 실패), 429, 5xx 응답은 백오프 후 재시도하며, 끝내 실패하면
+    DartApiError를 발생시킵니다. 그 밖의 requests 예외도 DartApiError로 바꿔 발생시킵니다.
+    """
+    session = get_http_session()
+    error = None
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        if attempt:
+            metrics.incr('http_retries')
+            delay = backoff_delay(attempt - 1)
+            metrics.add_time('backoff_wait', delay)
+            time.sleep(delay)
+        api_key = rate_limiter.acquire(params.get('crtfc_key'))
+        if api_key != params.get('crtfc_key'):
+            params = {**params, 'crtfc_key': api_key}
+        metrics.incr('http_requests')
+        try:
+            with metrics.timer('http'):
+                response = session.get(url, params=params, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError) as e:
+            # 연결 실패·시간 초과·응답 본문이 중간에 끊기거나 깨진 경우는 다시 시도하면 성공할 수 있습니다
+            error = DartApiError(f"네트워크 오류: {e}")
+            metrics.incr('http_errors')
+            continue
+        except requests.RequestException as e:
+            # 잘못된 URL·요청 인자 등 다시 시도해도 같은 결과인 오류는 바로 DartApiError로 바꿔 수집 오류로 남깁니다
+            metrics.incr('http_errors')
+            raise DartApiError(f"요청 오류: {e}") from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            error = DartApiError(f"HTTP {response.status_code} 응답")
+            metrics.incr('http_errors')
+            continue
+        if response.status_code >= 400:
+            metrics.incr('http_errors')
+            raise DartApiError(f"HTTP {response.status_code} 응답")
+        # 스트리밍 응답은 본문을 읽는 쪽에서 바이트 수를 기록합니다
+        if not kwargs.get('stream'):
+            metrics.incr('bytes_downloaded', len(response.content))
+        return response
+    raise error
+
+def dart_get_json(url: str, params: dict, timeout: float = 10) -> dict:
+    """
+    DART JSON API를 호출하고 상태 코드를 구분하여 처리합니다.
+    정상(000)과 데이터 없음(013)은 응답을 그대로 반환하고, 요청 제한(020)·점검(800) 등은 백오프 후 재시도합니다.
+    재시도 후에도 020이면 DartQuotaExceeded를, 그 밖의 오류 상태는 DartApiError를 발생시킵니다.
+    """
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        if attempt:
+            metrics.incr('dart_status_retries')
+            delay = backoff_delay(attempt - 1)
+            metrics.add_time('backoff_wait', delay)
+            time.sleep(delay)
+        response = dart_get(url, params, timeout=timeout)
+        try:
+            with metrics.timer('json_decode'):
+                data = response.json()
+        except (ValueError, requests.RequestException):
+            raise DartApiError("JSON이 아닌 응답을 받았습니다")
+
+        status = data.get('status')
+        metrics.incr(f"status_{status}")
+        if status in (DART_STATUS_OK, DART_STATUS_NO_DATA):
+            return data
+        if status not in DART_RETRYABLE_STATUSES:
+            raise DartApiError(f"DART 오류 {status}: {data.get('message', '')}", status)
+
+    if status == DART_STATUS_RATE_LIMITED:
+        raise DartQuotaExceeded(f"DART 요청 제한 초과(020): {data.get('message', '')}")
+    raise DartApiError(f"DART 오류 {status}: {data.get('message', '')}", status)
 
 # ==========================================
 # 1. DART 고유번호(Corp Code) 관리 함수
 # ==========================================
 
-def get_company_codes(api_key: str, cache_file: str = "company_codes_cache.json") -> Optional[Dict[str, str]]:
+# 고유번호 인덱스 스냅샷 형식 버전 (레코드 구조가 바뀌면 올려서 스냅샷을 재생성)
+CORP_INDEX_SNAPSHOT_VERSION = 4
+
+# 인덱스 레코드 필드 순서: (고유번호, 회사명, 종목코드, 최종변경일자)
+CORP_RECORD_FIELDS = ('corp_code', 'corp_name', 'stock_code', 'modify_date')
+
+# corpCode.xml 항목 중 캐시 파일에 보관하는 필드
+CORP_XML_FIELDS = ('corp_code', 'corp_name', 'corp_eng_name', 'stock_code', 'modify_date')
+
+def corp_record(row: dict) -> Optional[Tuple[str, str, str, str]]:
     """
-    Open DART에서 고유번호(8자리)를 받아와 캐싱하고, 회사명:고유번호 딕셔너리를 반환합니다.
+    캐시/XML 항목(dict)을 인덱스 레코드 튜플로 변환합니다. 고유번호나 회사명이 없으면 None을 반환합니다.
+    """
+    code = str(row.get('corp_code') or '').strip()
+    name = str(row.get('corp_name') or '').strip()
+    if not code or not name:
+        return None
+    return (
+        code.zfill(8),
+        name,
+        str(row.get('stock_code') or '').strip(),
+        str(row.get('modify_date') or '').strip(),
+    )
+
+# 회사명 앞뒤의 법인 형태 표기: (주)/㈜ 등 괄호 약칭은 위치와 관계없이, '주식회사' 등은 이름 앞뒤에 있을 때 제거
+_KOREAN_LEGAL_FORMS = ('주식회사', '유한회사', '유한책임회사', '합자회사', '합명회사', '사단법인', '재단법인')
+_KOREAN_LEGAL_FORM_PATTERN = re.compile(
+    r"\((?:주|유|사|재|합|자)\)"
+    rf"|^(?:{'|'.join(_KOREAN_LEGAL_FORMS)})\s*|\s*(?:{'|'.join(_KOREAN_LEGAL_FORMS)})$"
+)
+# 영문명 끝의 법인 형태 표기 (예: 'SAMSUNG ELECTRONICS CO,.LTD', 'NAVER Corporation')
+_ENGLISH_LEGAL_FORM_PATTERN = re.compile(
+    r"(?<![a-z0-9])(?:co|ltd|limited|inc|incorporated|corp|corporation|company|plc|llc)[\s.,]*$", re.IGNORECASE
+)
+# 비교 키에서 지우는 공백과 구두점
+_NAME_PUNCTUATION_PATTERN = re.compile(r"[\s.,·・'\"()\[\]\-_/]+")
+
+def strip_legal_form(name: str) -> str:
+    """
+    회사명을 NFKC로 정규화해(전각 -> 반각, ㈜ -> (주)) 한글·영문 법인 형태 표기를 떼어 냅니다.
+    대소문자와 이름 안의 공백은 그대로 두므로 부분 일치 검색어로도 쓸 수 있습니다.
+    """
+    text = unicodedata.normalize('NFKC', name).strip()
+    text = _KOREAN_LEGAL_FORM_PATTERN.sub('', text).strip()
+    while True:
+        stripped = _ENGLISH_LEGAL_FORM_PATTERN.sub('', text).rstrip(' .,&')
+        if stripped == text or not stripped:
+            return text
+        text = stripped
+
+def normalize_corp_name(name: str) -> str:
+    """
+    회사명·영문명을 비교용 키로 바꿉니다: 법인 형태 표기 제거, 전각/반각 통일, 대소문자 무시, 공백·구두점 제거.
+    '(주)삼성전자', '삼성전자 주식회사', '삼성전자'는 모두 같은 키가 됩니다. 표기를 지우면 빈 문자열이 되는 이름은
+    법인 형태 표기를 남긴 키를 사용합니다.
+    """
+    key = _NAME_PUNCTUATION_PATTERN.sub('', strip_legal_form(name).casefold())
+    return key or _NAME_PUNCTUATION_PATTERN.sub('', unicodedata.normalize('NFKC', name).casefold())
+
+def corp_alias_keys(record: Tuple[str, str, str, str], eng_name: Optional[str] = None) -> set:
+    """
+    레코드 하나가 별칭 색인에 들어가는 키(정규화한 회사명, 영문명이 있으면 정규화한 영문명) 집합입니다.
+    """
+    name = record[1]
+    key = normalize_corp_name(name)
+    # 정규화해도 그대로인 이름은 레코드의 문자열 객체를 키로 써서 스냅샷에 한 번만 저장되게 합니다
+    keys = {name if key == name else key}
+    if eng_name:
+        keys.add(normalize_corp_name(eng_name))
+    return keys
+
+def build_alias_index(records: List[Tuple[str, str, str, str]],
+                      eng_names: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, tuple], Dict[str, tuple]]:
     """
-    if os.path.exists(cache_file):
+    정규화한 회사명·영문명 -> 레코드 번호들, 종목코드 -> 레코드 번호들의 다중값 색인을 만듭니다.
+    같은 이름의 법인이 여러 개여도 모두 남으며, 검색 시 해시 조회 한 번으로 후보를 찾습니다.
+    """
+    eng_names = eng_names or {}
+    aliases: Dict[str, list] = {}
+    stock_codes: Dict[str, list] = {}
+    for i, record in enumerate(records):
+        for key in corp_alias_keys(record, eng_names.get(record[0])):
+            aliases.setdefault(key, []).append(i)
+        stock_code = record[2]
+        if stock_code:
+            stock_codes.setdefault(stock_code, []).append(i)
+    return ({key: tuple(ids) for key, ids in aliases.items()},
+            {key: tuple(ids) for key, ids in stock_codes.items()})
+
+class CorpCodeIndex:
+    """
+    고유번호 캐시(JSON)를 한 번만 읽어 메모리에 유지하는 인덱스입니다.
+    캐시 파일의 mtime/크기가 바뀌면 다시 로드하며, 빠른 재시작을 위해 pickle 스냅샷(레코드, 회사명 순서,
+    n-gram 색인, 별칭 색인)을 캐시 파일 옆에 저장합니다. 레코드 번호는 apply_delta로 갱신해도 바뀌지 않으며,
+    삭제된 기업의 자리는 None으로 비워 둡니다.
+    """
+
+    def __init__(self, cache_file: str = "company_codes_cache.json"):
+        self.cache_file = cache_file
+        self.snapshot_file = os.path.splitext(cache_file)[0] + ".idx.pkl"
+        self.records: List[Optional[Tuple[str, str, str, str]]] = []
+        self.codes: Dict[str, str] = {}
+        # 회사명 순으로 정렬한 회사명과 그 레코드 번호 (접두 검색용)
+        self.names: List[str] = []
+        self.order: List[int] = []
+        self.grams: Dict[str, array] = {}
+        # 정규화한 회사명·영문명 / 종목코드 -> 레코드 번호들, 고유번호 -> 레코드 번호
+        self.aliases: Dict[str, tuple] = {}
+        self.stock_codes: Dict[str, tuple] = {}
+        self.by_code: Dict[str, int] = {}
+        self.eng_names: Dict[str, str] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _source_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.cache_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def is_stale(self) -> bool:
+        """
+        캐시 파일이 마지막 로드 이후 변경(또는 삭제)되었는지 확인합니다.
+        """
+        return self._signature is None or self._signature != self._source_signature()
+
+    def _read_snapshot(self, signature: Tuple[int, int]) -> Optional[dict]:
         try:
-            cache_df = pd.read_json(cache_file)
-            if not cache_df.empty:
-                cache_df['corp_code'] = cache_df['corp_code'].astype(str).str.zfill(8)
-                print(f"📁 캐시 파일 로드 완료: {len(cache_df)}개 기업")
-                return cache_df.set_index('corp_name')['corp_code'].to_dict()
+            with open(self.snapshot_file, 'rb') as f:
+                snapshot = pickle.load(f)
+        except Exception:
+            return None
+
+        if (snapshot.get('version') != CORP_INDEX_SNAPSHOT_VERSION
+                or tuple(snapshot.get('source_signature', ())) != signature):
+            return None
+        return snapshot
+
+    def _write_snapshot(self, signature: Tuple[int, int], records: List[Optional[Tuple[str, str, str, str]]],
+                        grams: Dict[str, array], aliases: Tuple[Dict[str, tuple], Dict[str, tuple]],
+                        order: List[int], eng_names: Dict[str, str]) -> None:
+        snapshot = {
+            'version': CORP_INDEX_SNAPSHOT_VERSION,
+            'source_signature': signature,
+            'records': records,
+            'order': order,
+            'grams': grams,
+            'aliases': aliases[0],
+            'stock_codes': aliases[1],
+            'eng_names': eng_names,
+        }
+        tmp_file = self.snapshot_file + ".tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.snapshot_file)
+        except OSError as e:
+            print(f"⚠️ 고유번호 스냅샷 저장 실패: {e}")
+
+    def _read_cache_json(self) -> Tuple[List[Tuple[str, str, str, str]], Dict[str, str]]:
+        """
+        캐시 JSON에서 회사명 순으로 정렬한 레코드와 고유번호 -> 영문명 딕셔너리를 읽습니다.
+        """
+        with open(self.cache_file, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+
+        records = []
+        eng_names = {}
+        for row in rows:
+            record = corp_record(row)
+            if record is None:
+                continue
+            records.append(record)
+            if row.get('corp_eng_name'):
+                eng_names[record[0]] = str(row['corp_eng_name']).strip()
+        # 회사명 순으로 정렬 (동일 회사명은 파일 순서 유지)
+        records.sort(key=lambda r: r[1])
+        return records, eng_names
+
+    def _install(self, records: List[Optional[Tuple[str, str, str, str]]], grams: Dict[str, array],
+                 aliases: Tuple[Dict[str, tuple], Dict[str, tuple]], signature: Tuple[int, int],
+                 order: Optional[List[int]] = None, eng_names: Optional[Dict[str, str]] = None) -> None:
+        # order가 없으면 records가 이미 회사명 순으로 정렬된 전체 빌드 결과입니다
+        order = list(range(len(records))) if order is None else order
+        self.records = records
+        self.order = order
+        self.names = [records[i][1] for i in order]
+        self.grams = grams
+        self.aliases, self.stock_codes = aliases
+        self.by_code = {records[i][0]: i for i in order}
+        self.eng_names = eng_names or {}
+        # 회사명:고유번호 딕셔너리 (이전 버전 호환용). 동일 회사명이 여러 개이면 회사명 순으로 마지막 항목만 남으므로
+        # 검색은 같은 이름의 법인을 모두 보관하는 별칭 색인(aliases)을 사용합니다
+        self.codes = {records[i][1]: records[i][0] for i in order}
+        self._signature = signature
+
+    @instrumented('corp_index_load')
+    def load(self) -> bool:
+        """
+        캐시 파일을 로드합니다. 스냅샷이 최신이면 JSON 파싱 없이 스냅샷을 사용합니다.
+        """
+        with self._lock:
+            signature = self._source_signature()
+            if signature is None:
+                return False
+
+            snapshot = self._read_snapshot(signature)
+            if snapshot is not None:
+                records, grams = snapshot['records'], snapshot['grams']
+                aliases = (snapshot['aliases'], snapshot['stock_codes'])
+                order, eng_names = snapshot['order'], snapshot['eng_names']
+            else:
+                records, eng_names = self._read_cache_json()
+                grams = build_name_grams([r[1] for r in records])
+                aliases = build_alias_index(records, eng_names)
+                order = list(range(len(records)))
+                if records:
+                    self._write_snapshot(signature, records, grams, aliases, order, eng_names)
+
+            self._install(records, grams, aliases, signature, order, eng_names)
+            return True
+
+    @instrumented('corp_index_build')
+    def replace_records(self, records: List[Tuple[str, str, str, str]], source_file: Optional[str] = None,
+                        eng_names: Optional[Dict[str, str]] = None) -> None:
+        """
+        방금 기록한 캐시 파일의 레코드로 인덱스와 스냅샷을 바로 갱신합니다 (캐시 JSON을 다시 읽지 않음).
+        source_file을 주면 곧 캐시 파일 자리로 옮겨질 그 파일의 mtime/크기를 기준으로 스냅샷을 만듭니다.
+        eng_names(고유번호 -> 영문명)를 주면 영문명도 별칭 색인에 넣습니다.
+        """
+        with self._lock:
+            records = sorted(records, key=lambda r: r[1])
+            eng_names = dict(eng_names or {})
+            grams = build_name_grams([r[1] for r in records])
+            aliases = build_alias_index(records, eng_names)
+            order = list(range(len(records)))
+            signature = self._target_signature(source_file)
+            if signature is not None:
+                self._write_snapshot(signature, records, grams, aliases, order, eng_names)
+            self._install(records, grams, aliases, signature, order, eng_names)
+
+    def _target_signature(self, source_file: Optional[str]) -> Optional[Tuple[int, int]]:
+        if source_file is None:
+            return self._source_signature()
+        st = os.stat(source_file)
+        return (st.st_mtime_ns, st.st_size)
+
+    @instrumented('corp_index_delta')
+    def apply_delta(self, added: List[Tuple[str, str, str, str]], changed: List[Tuple[str, str, str, str]],
+                    removed: List[str], source_file: Optional[str] = None,
+                    eng_names: Optional[Dict[str, str]] = None) -> None:
+        """
+        신규·변경 레코드와 삭제된 고유번호만 인덱스와 스냅샷에 반영합니다 (replace_records처럼 전체를 다시 만들지 않음).
+        영향을 받는 n-gram·별칭·종목코드 색인 항목만 고치고 회사명 순서는 병합으로 맞추며, 기존 레코드 번호는
+        그대로 둡니다. 고친 색인은 복사본에 만든 뒤 한 번에 바꿔 끼우므로 갱신 중에도 기존 색인으로 검색할 수 있습니다.
+        source_file/eng_names는 replace_records와 같습니다.
+        """
+        eng_names = eng_names or {}
+        with self._lock:
+            records = list(self.records)
+            by_code = dict(self.by_code)
+            known_eng = dict(self.eng_names)
+            free = [i for i, record in enumerate(records) if record is None]
+
+            # 레코드 번호 -> (이전 레코드, 이전 영문명, 새 레코드, 새 영문명). 신규는 이전이, 삭제는 새 레코드가 없습니다
+            updates: Dict[int, tuple] = {}
+            for code in removed:
+                i = by_code.pop(code, None)
+                if i is not None:
+                    updates[i] = (records[i], known_eng.pop(code, None), None, None)
+                    records[i] = None
+                    free.append(i)
+            for record in list(changed) + list(added):
+                code = record[0]
+                i = by_code.get(code)
+                if i is None:
+                    # 신규 기업은 삭제로 빈 자리를 먼저 채웁니다
+                    i = free.pop() if free else len(records)
+                    if i == len(records):
+                        records.append(None)
+                    by_code[code] = i
+                # 같은 갱신에서 비운 자리를 채우면 색인에서 뺄 이전 레코드를 그대로 둡니다
+                old, old_eng = updates[i][:2] if i in updates else (records[i], known_eng.get(code))
+                updates[i] = (old, old_eng, record, eng_names.get(code))
+                records[i] = record
+                if eng_names.get(code):
+                    known_eng[code] = eng_names[code]
+                else:
+                    known_eng.pop(code, None)
+
+            # 색인 키별로 뺄 번호와 더할 번호를 모은 뒤 해당 항목만 다시 만듭니다
+            gram_changes: Dict[str, Tuple[set, list]] = {}
+            alias_changes: Dict[str, Tuple[set, list]] = {}
+            stock_changes: Dict[str, Tuple[set, list]] = {}
+
+            def diff(changes, i, old_keys, new_keys):
+                for key in old_keys - new_keys:
+                    changes.setdefault(key, (set(), []))[0].add(i)
+                for key in new_keys - old_keys:
+                    changes.setdefault(key, (set(), []))[1].append(i)
+
+            def gram_keys(record):
+                return name_grams(record[1]) | set(record[1]) if record else set()
+
+            moved = set()
+            for i, (old, old_eng, new, new_eng) in updates.items():
+                if old is None or new is None or old[1] != new[1]:
+                    moved.add(i)
+                    diff(gram_changes, i, gram_keys(old), gram_keys(new))
+                diff(alias_changes, i, corp_alias_keys(old, old_eng) if old else set(),
+                     corp_alias_keys(new, new_eng) if new else set())
+                diff(stock_changes, i, {old[2]} - {''} if old else set(), {new[2]} - {''} if new else set())
+
+            grams = dict(self.grams)
+            for gram, (drop, add) in gram_changes.items():
+                posting = array('I', [j for j in grams.get(gram, ()) if j not in drop] if drop else grams.get(gram, ()))
+                posting.extend(add)
+                if posting:
+                    grams[gram] = posting
+                else:
+                    grams.pop(gram, None)
+            aliases, stock_codes = dict(self.aliases), dict(self.stock_codes)
+            for postings, changes in ((aliases, alias_changes), (stock_codes, stock_changes)):
+                for key, (drop, add) in changes.items():
+                    ids = tuple(j for j in postings.get(key, ()) if j not in drop) + tuple(add)
+                    if ids:
+                        postings[key] = ids
+                    else:
+                        postings.pop(key, None)
+
+            # 이름이 바뀌거나 빠진 레코드만 회사명 순서에서 빼고 새 이름 자리에 끼워 넣습니다 (같은 이름은 기존 항목 뒤)
+            names, order = list(self.names), list(self.order)
+            for i in sorted(moved):
+                old = updates[i][0]
+                if old is not None:
+                    lo = bisect.bisect_left(names, old[1])
+                    pos = order.index(i, lo, bisect.bisect_right(names, old[1], lo))
+                    del names[pos], order[pos]
+            for i in sorted(moved):
+                if records[i] is not None:
+                    pos = bisect.bisect_right(names, records[i][1])
+                    names.insert(pos, records[i][1])
+                    order.insert(pos, i)
+
+            codes = dict(self.codes)
+            for old, _, new, _ in updates.values():
+                for name in {record[1] for record in (old, new) if record is not None}:
+                    lo = bisect.bisect_left(names, name)
+                    hi = bisect.bisect_right(names, name, lo)
+                    if hi > lo:
+                        codes[name] = records[order[hi - 1]][0]
+                    else:
+                        codes.pop(name, None)
+
+            signature = self._target_signature(source_file)
+            if signature is not None:
+                self._write_snapshot(signature, records, grams, (aliases, stock_codes), order, known_eng)
+            self.records, self.names, self.order, self.grams = records, names, order, grams
+            self.aliases, self.stock_codes, self.by_code = aliases, stock_codes, by_code
+            self.eng_names, self.codes, self._signature = known_eng, codes, signature
+
+    def _prefix_range(self, prefix: str) -> range:
+        lo = bisect.bisect_left(self.names, prefix)
+        hi = bisect.bisect_left(self.names, prefix + '\U0010ffff', lo)
+        return range(lo, hi)
+
+    def _substring_ids(self, query: str) -> List[int]:
+        grams = name_grams(query) if len(query) > 1 else {query}
+        postings = []
+        for gram in grams:
+            posting = self.grams.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        # 바이그램이 모두 포함되어도 연속 부분 문자열이 아닐 수 있으므로 최종 확인
+        records = self.records
+        return [i for i in candidates if query in records[i][1]]
+
+    def search(self, query: str, limit: Optional[int] = 10) -> List[Tuple[str, str, str, str]]:
+        """
+        회사명 부분 일치 후보를 순위대로 반환합니다.
+        정확 일치 -> 접두 일치 -> 부분 일치 순이며, 같은 순위 안에서는 상장사(종목코드 보유)가 먼저 옵니다.
+        """
+        query = query.strip()
+        if not query:
+            return []
+
+        records, order = self.records, self.order
+        prefix_ids = {order[pos] for pos in self._prefix_range(query)}
+        ranked = []
+        for i in prefix_ids:
+            rank = 0 if records[i][1] == query else 1
+            ranked.append((rank, i))
+        for i in self._substring_ids(query):
+            if i not in prefix_ids:
+                ranked.append((2, i))
+
+        sort_key = lambda x: (x[0], not records[x[1]][2], len(records[x[1]][1]), records[x[1]][1])
+        if limit is None:
+            ranked.sort(key=sort_key)
+        else:
+            ranked = heapq.nsmallest(limit, ranked, key=sort_key)
+        return [records[i] for _, i in ranked]
+
+    def resolve(self, query: str) -> List[Tuple[str, str, str, str]]:
+        """
+        고유번호(8자리), 종목코드(6자리), 정규화한 회사명·영문명으로 해시 조회만 해서 일치하는 법인을 모두 반환합니다.
+        회사명이 검색어와 그대로 같은 법인 -> 상장사 -> 회사명 순이며, 일치하는 법인이 없으면 빈 목록입니다.
+        """
+        text = unicodedata.normalize('NFKC', query).strip()
+        if not text:
+            return []
+        ids = []
+        if len(text) == 8 and text.isdigit() and text in self.by_code:
+            ids.append(self.by_code[text])
+        if len(text) == 6 and text.isalnum():
+            ids.extend(self.stock_codes.get(text.upper(), ()))
+        ids.extend(self.aliases.get(normalize_corp_name(text), ()))
+
+        records = self.records
+        ordered = sorted(set(ids), key=lambda i: (records[i][1] != text, not records[i][2], records[i][1]))
+        return [records[i] for i in ordered]
+
+def name_grams(name: str) -> set:
+    """
+    회사명의 바이그램(연속 두 글자) 집합을 반환합니다. 한 글자 이름은 해당 글자를 그대로 사용합니다.
+    """
+    if len(name) < 2:
+        return {name} if name else set()
+    return {name[i:i + 2] for i in range(len(name) - 1)}
+
+def build_name_grams(names: List[str]) -> Dict[str, array]:
+    """
+    회사명 목록으로 n-gram 역색인(글자/바이그램 -> 레코드 번호 배열)을 만듭니다.
+    한 글자 입력(타자 중 첫 글자)도 처리할 수 있도록 유니그램도 함께 색인합니다.
+    """
+    grams: Dict[str, array] = {}
+    for i, name in enumerate(names):
+        for gram in name_grams(name) | set(name):
+            posting = grams.get(gram)
+            if posting is None:
+                posting = grams[gram] = array('I')
+            posting.append(i)
+    return grams
+
+_corp_indexes: Dict[str, CorpCodeIndex] = {}
+_corp_indexes_lock = threading.Lock()
+
+def get_corp_index(cache_file: str = "company_codes_cache.json", verbose: bool = True) -> CorpCodeIndex:
+    """
+    캐시 파일별로 하나의 CorpCodeIndex를 재사용합니다.
+    파일이 변경된 경우에만 다시 로드하므로 반복 검색 시 파싱 비용이 들지 않습니다.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    key = os.path.abspath(cache_file)
+    with _corp_indexes_lock:
+        index = _corp_indexes.get(key)
+        if index is None:
+            index = CorpCodeIndex(cache_file)
+            _corp_indexes[key] = index
+
+    if index.is_stale():
+        try:
+            if index.load() and index.records:
+                log(f"📁 캐시 파일 로드 완료: {len(index)}개 기업")
         except Exception as e:
-            print(f"⚠️ 캐시 파일 손상 (재다운로드 진행): {e}")
+            log(f"⚠️ 캐시 파일 손상 (재다운로드 진행): {e}")
+            index.records, index.codes, index.names, index.grams, index._signature = [], {}, [], {}, None
+            index.aliases, index.stock_codes, index.by_code, index.order, index.eng_names = {}, {}, {}, [], {}
+    return index
 
-    url = "https://opendart.fss.or.kr/api/corpCode.xml"
+def iter_corp_code_xml(xml_file) -> Iterator[Dict[str, str]]:
+    """
+    corpCode.xml을 iterparse로 한 항목(<list>)씩 읽어 dict로 반환합니다.
+    읽은 요소는 바로 비워 파일 크기와 관계없이 메모리 사용량을 일정하게 유지합니다.
+    """
+    context = ET.iterparse(xml_file, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == 'list':
+            yield {field: (elem.findtext(field) or '').strip() for field in CORP_XML_FIELDS}
+            root.clear()
+
+@instrumented('corp_parse')
+def write_corp_cache(cache_file: str, entries: Iterable[Dict[str, str]],
+                     eng_names: Optional[Dict[str, str]] = None) -> List[Tuple[str, str, str, str]]:
+    """
+    고유번호 항목을 캐시 JSON 파일에 한 건씩 바로 기록하고, 인덱스 레코드 목록을 반환합니다.
+    임시 파일에 쓴 뒤 교체하므로 도중에 실패해도 기존 캐시는 그대로 남습니다.
+    eng_names 딕셔너리를 주면 고유번호 -> 영문명을 채웁니다 (별칭 색인용).
+    """
+    tmp_file = cache_file + ".tmp"
+    records = []
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for entry in entries:
+                record = corp_record(entry)
+                if record is None:
+                    continue
+                f.write(',\n' if records else '\n')
+                f.write(json.dumps(entry, ensure_ascii=False))
+                records.append(record)
+                if eng_names is not None and entry.get('corp_eng_name'):
+                    eng_names[record[0]] = entry['corp_eng_name']
+            f.write('\n]')
+        if records:
+            os.replace(tmp_file, cache_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return records
+
+@contextmanager
+def open_corp_code_stream(api_key: str) -> Iterator[Optional[Iterator[Dict[str, str]]]]:
+    """
+    corpCode.xml 압축 파일을 임시 파일로 스트리밍 다운로드하고, 압축 멤버를 순차적으로 읽는
+    항목 이터레이터를 제공합니다. DART가 zip 대신 오류 응답을 보내면 None을 제공합니다.
+    """
+    url = f"{DART_API_BASE}/corpCode.xml"
     params = {'crtfc_key': api_key}
 
-    try:
-        print("⬇️ DART에서 최신 기업 고유번호를 다운로드 중...")
-        response = requests.get(url, params=params)
-
-        if response.status_code == 200:
-            with zipfile.ZipFile(io.BytesIO(response.content)) as zip_file:
-                xml_filename = zip_file.namelist()[0]
-                with zip_file.open(xml_filename) as f:
-                    tree = ET.parse(f)
-                    root = tree.getroot()
-
-                    data_list = []
-                    for corp in root.findall('.//list'):
-                        code = corp.findtext('corp_code', '').strip()
-                        name = corp.findtext('corp_name', '').strip()
-                        if code and name:
-                            data_list.append({'corp_name': name, 'corp_code': code})
-
-            if data_list:
-                df = pd.DataFrame(data_list)
-                df['corp_code'] = df['corp_code'].astype(str)
-                df.to_json(cache_file, orient='records', force_ascii=False)
-                print(f"✅ 고유번호 다운로드 및 캐싱 완료 ({len(df)}개)")
-                return df.set_index('corp_name')['corp_code'].to_dict()
-        
-        print("❌ 고유번호 다운로드 실패 (API 응답 오류)")
-        return None
+    response = dart_get(url, params=params, timeout=60, stream=True)
+    with response, tempfile.TemporaryFile() as tmp:
+        with metrics.timer('corp_download'):
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                tmp.write(chunk)
+                metrics.incr('bytes_downloaded', len(chunk))
+        tmp.seek(0)
+
+        # 오류 시에는 zip 대신 상태 코드가 담긴 XML/JSON이 옵니다
+        if tmp.read(2) != b'PK':
+            tmp.seek(0)
+            print(f"❌ 고유번호 다운로드 실패 (API 응답 오류): {tmp.read(300).decode('utf-8', 'replace').strip()}")
+            yield None
+            return
+        tmp.seek(0)
+
+        with zipfile.ZipFile(tmp) as zip_file:
+            xml_filename = zip_file.namelist()[0]
+            with zip_file.open(xml_filename) as f:
+                yield iter_corp_code_xml(f)
+
+def download_corp_codes(api_key: str, cache_file: str = "company_codes_cache.json",
+                        eng_names: Optional[Dict[str, str]] = None) -> Optional[List[Tuple[str, str, str, str]]]:
+    """
+    corpCode.xml을 스트리밍으로 내려받아 캐시 파일에 바로 기록합니다.
+    성공하면 인덱스 레코드 목록을, 실패하면 None을 반환합니다 (eng_names는 write_corp_cache와 같음).
+    """
+    with open_corp_code_stream(api_key) as entries:
+        if entries is None:
+            return None
+        records = write_corp_cache(cache_file, entries, eng_names)
+    if records:
+        mark_corp_codes_checked(cache_file)
+    return records or None
 
-    except Exception as e:
-        print(f"❌ 오류 발생: {e}")
+# 고유번호 캐시를 최신으로 간주하는 기간(초)
+CORP_CODES_MAX_AGE = int(os.getenv("DART_CORP_CODES_MAX_AGE", str(24 * 3600)))
+
+def _corp_codes_marker(cache_file: str) -> str:
+    return os.path.splitext(cache_file)[0] + ".refreshed"
+
+def mark_corp_codes_checked(cache_file: str, summary: Optional[Dict[str, int]] = None) -> None:
+    """
+    DART 원본과 캐시를 마지막으로 대조한 시각(표시 파일의 mtime)과 결과를 기록합니다.
+    """
+    with open(_corp_codes_marker(cache_file), 'w', encoding='utf-8') as f:
+        json.dump({'checked_at': datetime.now().isoformat(timespec='seconds'), **(summary or {})}, f)
+
+def corp_codes_age(cache_file: str = "company_codes_cache.json") -> Optional[float]:
+    """
+    고유번호 캐시를 마지막으로 내려받거나 대조한 뒤 지난 시간(초)을 반환합니다. 캐시가 없으면 None입니다.
+    파일 stat만 사용하므로 조회 경로에서 매번 호출해도 부담이 없습니다.
+    """
+    mtimes = []
+    for path in (cache_file, _corp_codes_marker(cache_file)):
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except OSError:
+            if path == cache_file:
+                return None
+    return max(0.0, time.time() - max(mtimes))
+
+def is_corp_index_fresh(cache_file: str = "company_codes_cache.json", max_age: float = CORP_CODES_MAX_AGE) -> bool:
+    """
+    고유번호 캐시가 max_age초 이내에 DART 원본과 대조되었는지 확인합니다.
+    """
+    age = corp_codes_age(cache_file)
+    return age is not None and age <= max_age
+
+def refresh_corp_codes(api_key: str, cache_file: str = "company_codes_cache.json") -> Optional[Dict[str, int]]:
+    """
+    최신 corpCode.xml을 기존 캐시와 고유번호별로 색인하는 모든 필드(회사명, 영문명, 종목코드, 최종변경일자)를 대조합니다.
+    신규·변경·삭제된 기업이 있으면 받은 파일로 캐시 JSON을 바꾸고, 인덱스와 스냅샷에는 그 기업들만 반영합니다
+    (CorpCodeIndex.apply_delta). 하나도 없으면 받은 파일을 버리고 대조 시각만 기록합니다.
+    """
+    old_index = get_corp_index(cache_file)
+    # 영문명도 별칭 색인에 들어가므로 레코드와 함께 비교합니다
+    old = {record[0]: (record, old_index.eng_names.get(record[0])) for record in old_index.records if record is not None}
+
+    new_file = cache_file + ".new"
+    eng_names = {}
+    with open_corp_code_stream(api_key) as entries:
+        if entries is None:
+            return None
+        records = write_corp_cache(new_file, entries, eng_names)
+    if not records:
         return None
 
-def search_company_code(api_key: str, company_name: str) -> Optional[str]:
+    new = {record[0]: record for record in records}
+    added = [record for code, record in new.items() if code not in old]
+    changed = [record for code, record in new.items() if code in old and old[code] != (record, eng_names.get(code))]
+    removed = [code for code in old if code not in new]
+    summary = {'added': len(added), 'changed': len(changed), 'removed': len(removed)}
+    summary['unchanged'] = len(new) - summary['added'] - summary['changed']
+
+    if not (added or changed or removed):
+        os.remove(new_file)
+    else:
+        # os.replace는 mtime을 유지하므로 교체 전에 새 파일 기준으로 스냅샷을 만들어 둡니다
+        with _corp_indexes_lock:
+            old_index.apply_delta(added, changed, removed, source_file=new_file, eng_names=eng_names)
+            os.replace(new_file, cache_file)
+    mark_corp_codes_checked(cache_file, summary)
+
+    print(f"🔄 고유번호 갱신 완료: 신규 {summary['added']} / 변경 {summary['changed']} / "
+          f"삭제 {summary['removed']} / 유지 {summary['unchanged']}")
+    return summary
+
+_corp_refresh_threads: Dict[str, threading.Thread] = {}
+
+def refresh_corp_codes_in_background(api_key: str, cache_file: str = "company_codes_cache.json",
+                                     max_age: float = CORP_CODES_MAX_AGE) -> Optional[threading.Thread]:
     """
-    회사명으로 고유번호를 검색합니다 (정확 일치 -> 부분 일치 순).
+    캐시가 max_age보다 오래되었으면 데몬 스레드에서 refresh_corp_codes를 실행하고 그 스레드를 반환합니다.
+    캐시가 아직 없거나(최초 다운로드는 get_company_codes가 담당) 이미 최신이거나 같은 캐시의 갱신이 진행 중이면
+    None을 반환합니다. 검색은 갱신을 기다리지 않습니다.
     """
-    codes = get_company_codes(api_key)
-    if not codes:
+    age = corp_codes_age(cache_file)
+    if age is None or age <= max_age:
         return None
 
-    if company_name in codes:
-        code = codes[company_name]
-        print(f"🔍 '{company_name}' 검색 성공 (정확 일치) -> Code: {code}")
-        return str(code).zfill(8)
-
-    candidates = [name for name in codes.keys() if company_name in name]
-    if len(candidates) == 1:
-        matched_name = candidates[0]
-        code = codes[matched_name]
-        print(f"🔍 '{company_name}' 검색 성공 ('{matched_name}' 부분 일치) -> Code: {code}")
-        return str(code).zfill(8)
-    elif len(candidates) > 1:
-        print(f"⚠️ '{company_name}' 검색 결과가 너무 많습니다: {candidates[:5]} ...")
+    key = os.path.abspath(cache_file)
+    with _corp_indexes_lock:
+        running = _corp_refresh_threads.get(key)
+        if running is not None and running.is_alive():
+            return None
+
+        def run():
+            try:
+                refresh_corp_codes(api_key, cache_file)
+            except Exception as e:
+                print(f"⚠️ 고유번호 백그라운드 갱신 실패: {e}")
+
+        thread = threading.Thread(target=run, name="corp-code-refresh", daemon=True)
+        _corp_refresh_threads[key] = thread
+        thread.start()
+    return thread
+
+def get_company_codes(api_key: str, cache_file: str = "company_codes_cache.json",
+                      verbose: bool = True) -> Optional[Dict[str, str]]:
+    """
+    Open DART에서 고유번호(8자리)를 받아와 캐싱하고, 회사명:고유번호 딕셔너리를 반환합니다.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    index = get_corp_index(cache_file, verbose)
+    if index.records:
+        return index.codes
+
+    try:
+        log("⬇️ DART에서 최신 기업 고유번호를 다운로드 중...")
+        eng_names = {}
+        records = download_corp_codes(api_key, cache_file, eng_names)
+        if not records:
+            log("❌ 고유번호 다운로드 실패 (API 응답 오류)")
+            return None
+
+        index.replace_records(records, eng_names=eng_names)
+        log(f"✅ 고유번호 다운로드 및 캐싱 완료 ({len(records)}개)")
+        return index.codes
+
+    except Exception as e:
+        log(f"❌ 오류 발생: {e}")
         return None
+
+def search_company_candidates(api_key: str, company_name: str, limit: Optional[int] = 10,
+                              verbose: bool = True) -> List[Tuple[str, str, str, str]]:
+    """
+    회사명 검색 후보를 순위대로 반환합니다 (정확 일치 -> 접두 일치 -> 부분 일치, 상장사 우선).
+    각 후보는 (고유번호, 회사명, 종목코드, 최종변경일자) 튜플입니다.
+    """
+    if not get_company_codes(api_key, verbose=verbose):
+        return []
+    return get_corp_index(verbose=verbose).search(company_name, limit)
+
+def pick_corp_record(records: List[Tuple[str, str, str, str]]) -> Optional[Tuple[str, str, str, str]]:
+    """
+    같은 수준으로 일치한 법인 중 하나를 고릅니다. 법인이 하나뿐이거나 여럿 중 상장사가 하나뿐이면 그 법인을,
+    그 외(상장사가 여럿이거나 모두 비상장)에는 None을 반환합니다.
+    """
+    if len(records) == 1:
+        return records[0]
+    listed = [record for record in records if record[2]]
+    return listed[0] if len(listed) == 1 else None
+
+def match_company(api_key: str, company_name: str, limit: int = 5, verbose: bool = True) -> Dict[str, object]:
+    """
+    회사명으로 고유번호를 찾고 결과를 출력 없이 딕셔너리로 반환합니다.
+    먼저 별칭 색인(고유번호, 종목코드, 법인 형태·공백·전각을 정규화한 회사명과 영문명)을 해시 조회하고,
+    일치하는 법인이 없을 때만 부분 일치 검색을 합니다. 같은 이름의 법인이 여럿이면 상장사가 하나뿐일 때 그 법인을 고릅니다.
+    match는 'exact'(회사명 그대로 일치), 'alias'(별칭 일치), 'partial', 'ambiguous', 'not_found',
+    'unavailable'(고유번호 목록을 받지 못함) 중 하나이며, candidates에는 상위 limit개 후보가
+    (고유번호, 회사명, 종목코드, 최종변경일자) 튜플로, total에는 후보 법인 수가 담깁니다.
+    """
+    result = {'query': company_name, 'match': 'unavailable', 'corp_code': None, 'corp_name': None,
+              'candidates': [], 'total': 0}
+    if not get_company_codes(api_key, verbose=verbose):
+        return result
+    index = get_corp_index(verbose=verbose)
+
+    matched = index.resolve(company_name)
+    if matched:
+        query = unicodedata.normalize('NFKC', company_name).strip()
+        exact = [record for record in matched if record[1] == query]
+        chosen = pick_corp_record(exact or matched)
+        result['total'] = len(matched)
+        if chosen is None:
+            result.update(match='ambiguous', candidates=matched[:limit])
+        else:
+            others = [record for record in matched if record is not chosen]
+            result.update(match='exact' if exact else 'alias', corp_code=chosen[0], corp_name=chosen[1],
+                          candidates=([chosen] + others)[:limit])
+        return result
+
+    ranked = index.search(strip_legal_form(company_name) or company_name, limit=None)
+    names = list(dict.fromkeys(name for _, name, _, _ in ranked))
+    result['candidates'] = ranked[:limit]
+    result['total'] = len(ranked)
+    chosen = pick_corp_record(ranked) if len(names) == 1 else None
+    if chosen is not None:
+        result.update(match='partial', corp_code=chosen[0], corp_name=chosen[1])
     else:
+        result['match'] = 'ambiguous' if ranked else 'not_found'
+    return result
+
+def search_company_code(api_key: str, company_name: str) -> Optional[str]:
+    """
+    회사명(또는 종목코드·영문명)으로 고유번호를 검색합니다 (정확/별칭 일치 -> 부분 일치 순).
+    """
+    result = match_company(api_key, company_name)
+    if result['match'] == 'exact':
+        print(f"🔍 '{company_name}' 검색 성공 (정확 일치) -> Code: {result['corp_code']}")
+    elif result['match'] == 'alias':
+        print(f"🔍 '{company_name}' 검색 성공 ('{result['corp_name']}' 별칭 일치) -> Code: {result['corp_code']}")
+    elif result['match'] == 'partial':
+        print(f"🔍 '{company_name}' 검색 성공 ('{result['corp_name']}' 부분 일치) -> Code: {result['corp_code']}")
+    elif result['match'] == 'ambiguous':
+        print(f"⚠️ '{company_name}' 검색 결과가 너무 많습니다 ({result['total']}건). 상위 후보:")
+        for code, name, stock_code, _ in result['candidates']:
+            listed = f", 종목코드 {stock_code}" if stock_code else ""
+            print(f"   - {name} ({code}{listed})")
+    elif result['match'] == 'not_found':
         print(f"❌ '{company_name}' 회사를 찾을 수 없습니다.")
-        return None
+    return result['corp_code']
 
 # ==========================================
 # 2. 재무제표 데이터 수집 함수
 # ==========================================
 
-def get_financial_data(api_key: str, corp_code: str, year: int, report_type: str, fs_div: str) -> Optional[pd.DataFrame]:
+# 보고서코드 -> (보고기간 종료 월, 일, 법정 제출기한 일수)
+REPORT_PERIODS = {
+    '11013': (3, 31, 45),    # 1분기보고서
+    '11012': (6, 30, 45),    # 반기보고서
+    '11014': (9, 30, 45),    # 3분기보고서
+    '11011': (12, 31, 90),   # 사업보고서
+}
+
+# 응답 캐시 경로 (빈 문자열이면 캐시 사용 안 함)
+RESPONSE_CACHE_FILE = os.getenv("DART_RESPONSE_CACHE", "dart_response_cache.sqlite3")
+# 제출기한 이후 이 기간이 지나면 해당 보고기간은 확정된 것으로 보고 응답을 만료 없이 보관
+FINAL_PERIOD_GRACE = timedelta(days=30)
+# 아직 확정되지 않은 보고기간의 응답 / '데이터 없음'(013) 응답 보관 기간 (초)
+OPEN_PERIOD_TTL = 6 * 3600
+NO_DATA_TTL_OPEN = 6 * 3600
+NO_DATA_TTL_FINAL = 30 * 24 * 3600
+
+def is_period_final(year: int, report_code: str, today: Optional[date] = None) -> bool:
     """
-    특정 조건(년도, 보고서타입, 구분)의 재무제표 데이터를 가져옵니다.
+    보고기간 종료일 + 제출기한 + 유예기간이 지나 공시 내용이 더 이상 바뀌지 않는다고 볼 수 있는지 확인합니다.
+    """
+    month, day, deadline_days = REPORT_PERIODS[report_code]
+    final_date = date(int(year), month, day) + timedelta(days=deadline_days) + FINAL_PERIOD_GRACE
+    return (today or datetime.now().date()) > final_date
+
+def response_cache_ttl(year: int, report_code: str, status: str) -> Optional[float]:
+    """
+    응답 보관 기간(초)을 반환합니다. None이면 만료 없이 보관합니다.
+    """
+    final = is_period_final(year, report_code)
+    if status == '013':
+        return NO_DATA_TTL_FINAL if final else NO_DATA_TTL_OPEN
+    return None if final else OPEN_PERIOD_TTL
+
+class ResponseCache:
+    """
+    fnlttSinglAcntAll 응답을 (고유번호, 사업연도, 보고서코드, 구분) 단위로 SQLite에 압축 저장하는 캐시입니다.
+    정상(000) 응답과 '데이터 없음'(013) 응답만 저장하며, 만료 시각은 response_cache_ttl 규칙을 따릅니다.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " corp_code TEXT NOT NULL, bsns_year INTEGER NOT NULL, reprt_code TEXT NOT NULL, fs_div TEXT NOT NULL,"
+            " status TEXT NOT NULL, payload BLOB, fetched_at REAL NOT NULL, expires_at REAL,"
+            " PRIMARY KEY (corp_code, bsns_year, reprt_code, fs_div))"
+        )
+        self._conn.commit()
+
+    def get(self, corp_code: str, year: int, report_code: str, fs_div: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM responses"
+                " WHERE corp_code = ? AND bsns_year = ? AND reprt_code = ? AND fs_div = ?",
+                (corp_code, int(year), report_code, fs_div)
+            ).fetchone()
+        if row is None:
+            return None
+        payload, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return None
+        return json.loads(zlib.decompress(payload))
+
+    def put(self, corp_code: str, year: int, report_code: str, fs_div: str, data: dict) -> None:
+        status = data.get('status')
+        if status not in ('000', '013'):
+            return
+        ttl = response_cache_ttl(year, report_code, status)
+        now = time.time()
+        payload = zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (corp_code, int(year), report_code, fs_div, status, payload, now,
+                 None if ttl is None else now + ttl)
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """
+        만료된 응답을 삭제하고 삭제된 건수를 반환합니다.
+        """
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?",
+                                     (time.time(),))
+            self._conn.commit()
+            return cur.rowcount
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    프로세스 전체가 공유하는 응답 캐시를 반환합니다 (RESPONSE_CACHE_FILE이 비어 있으면 None).
+    처음 열 때 만료된 응답을 정리해 파일이 계속 커지지 않게 합니다.
     """
-    url = "https://opendart.fss.or.kr/api/fnlttSinglAcntAll.json"
+    global _response_cache
+    if not RESPONSE_CACHE_FILE:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            try:
+                _response_cache = ResponseCache(RESPONSE_CACHE_FILE)
+                _response_cache.purge_expired()
+            except sqlite3.Error as e:
+                print(f"⚠️ 응답 캐시를 열 수 없어 캐시 없이 진행합니다: {e}")
+                return None
+        return _response_cache
+
+# 계정 시계열 저장소 경로 (빈 문자열이면 사용 안 함)
+TIMESERIES_DB_FILE = os.getenv("DART_TIMESERIES_DB", "")
+
+def _filter_to_json(wanted: Dict[str, Optional[set]]) -> str:
+    return json.dumps({account_id: sorted(sj_divs) if sj_divs is not None else None
+                       for account_id, sj_divs in sorted(wanted.items())})
+
+def _filter_covers(stored: Dict[str, Optional[list]], wanted: Dict[str, Optional[set]]) -> bool:
+    for account_id, sj_divs in wanted.items():
+        if account_id not in stored:
+            return False
+        covered = stored[account_id]
+        if covered is not None and (sj_divs is None or not sj_divs <= set(covered)):
+            return False
+    return True
+
+class TimeSeriesStore:
+    """
+    보고서 단위로 수집한 계정 금액(공시 원본값)을 (고유번호, 사업연도, 분기, 구분, account_id) 단위로 SQLite에 보관합니다.
+    보고서마다 어떤 계정 집합으로 확인했는지도 기록해, 계정을 추가하거나 기간을 늘렸을 때 아직 확인하지 않은
+    (보고서, 계정) 칸만 다시 요청하게 합니다. 보관 기간은 응답 캐시와 같은 규칙(response_cache_ttl)을 따릅니다.
+    """
+
+    def __init__(self, path: str = TIMESERIES_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            " corp_code TEXT NOT NULL, year INTEGER NOT NULL, quarter INTEGER NOT NULL, fs_div TEXT NOT NULL,"
+            " status TEXT NOT NULL, accounts TEXT NOT NULL, fetched_at REAL NOT NULL, expires_at REAL,"
+            " PRIMARY KEY (corp_code, year, quarter, fs_div))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS observations ("
+            " corp_code TEXT NOT NULL, year INTEGER NOT NULL, quarter INTEGER NOT NULL, fs_div TEXT NOT NULL,"
+            " account_id TEXT NOT NULL, sj_div TEXT NOT NULL, account_nm TEXT, amount NUMERIC,"
+            " PRIMARY KEY (corp_code, year, quarter, fs_div, account_id, sj_div))"
+        )
+        self._conn.commit()
+
+    def lookup(self, corp_code: str, units: List[Tuple[int, int, str]],
+               wanted: Dict[str, Optional[set]]) -> Dict[Tuple[int, int, str], Optional[List[dict]]]:
+        """
+        (사업연도, 분기, 구분코드) 단위 중 만료되지 않았고 wanted 계정을 모두 확인한 단위의 행을 반환합니다.
+        값이 None이면 '데이터 없음'으로 확인된 단위이며, 결과에 없는 단위는 다시 요청해야 합니다.
+        """
+        now = time.time()
+        with self._lock:
+            unit_rows = self._conn.execute(
+                "SELECT year, quarter, fs_div, status, accounts, expires_at FROM units WHERE corp_code = ?",
+                (corp_code,)
+            ).fetchall()
+            observations = self._conn.execute(
+                "SELECT year, quarter, fs_div, account_id, sj_div, account_nm, amount FROM observations"
+                " WHERE corp_code = ? ORDER BY rowid", (corp_code,)
+            ).fetchall()
+
+        requested = set(units)
+        found: Dict[Tuple[int, int, str], Optional[List[dict]]] = {}
+        for year, quarter, fs_div, status, accounts, expires_at in unit_rows:
+            unit = (year, quarter, fs_div)
+            if unit not in requested or (expires_at is not None and expires_at < now):
+                continue
+            if not _filter_covers(json.loads(accounts), wanted):
+                continue
+            found[unit] = [] if status == DART_STATUS_OK else None
+
+        for year, quarter, fs_div, account_id, sj_div, account_nm, amount in observations:
+            rows = found.get((year, quarter, fs_div))
+            if rows is not None:
+                rows.append({'account_id': account_id, 'sj_div': sj_div, 'account_nm': account_nm,
+                             'thstrm_amount': amount})
+        return {unit: (filter_account_rows(rows, wanted) if rows is not None else None)
+                for unit, rows in found.items()}
+
+    def save(self, corp_code: str, year: int, quarter: int, fs_div: str, rows: Optional[List[dict]],
+             wanted: Dict[str, Optional[set]]) -> None:
+        """
+        한 보고서 단위의 확인 결과를 기록합니다. rows가 None이면 '데이터 없음'(013)으로 기록합니다.
+        """
+        report_code = QUARTER_REPORTS[quarter][1]
+        status = DART_STATUS_OK if rows is not None else DART_STATUS_NO_DATA
+        ttl = response_cache_ttl(year, report_code, status)
+        now = time.time()
+        values = [(corp_code, int(year), quarter, fs_div, row.get('account_id'), row.get('sj_div') or '',
+                   row.get('account_nm'), parse_amount(row.get('thstrm_amount'))) for row in rows or []]
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM observations WHERE corp_code = ? AND year = ? AND quarter = ? AND fs_div = ?",
+                (corp_code, int(year), quarter, fs_div)
+            )
+            self._conn.executemany("INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (corp_code, int(year), quarter, fs_div, status, _filter_to_json(wanted), now,
+                 None if ttl is None else now + ttl)
+            )
+            self._conn.commit()
+
+    def frame(self, corp_codes: Optional[List[str]] = None, accounts: Optional[Iterable[str]] = None,
+              years: Optional[List[int]] = None) -> pd.DataFrame:
+        """
+        저장소에 쌓인 값만으로 collect_quarterly_financials와 같은 형태(고유번호 컬럼 포함)의 DataFrame을 만듭니다.
+        여러 기업·여러 해를 한 번에 읽어 4분기 보정/누적 환산을 적용합니다.
+        보정이 불완전한 4분기 항목은 collect_quarterly_financials처럼 attrs['q4_incomplete']에 남깁니다.
+        """
+        query = ("SELECT corp_code, year, quarter, fs_div, account_id, sj_div, account_nm, amount"
+                 " FROM observations WHERE 1 = 1")
+        params: list = []
+        if corp_codes:
+            codes = [str(code).zfill(8) for code in corp_codes]
+            query += f" AND corp_code IN ({','.join('?' * len(codes))})"
+            params += codes
+        if years:
+            query += f" AND year IN ({','.join('?' * len(years))})"
+            params += [int(y) for y in years]
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY corp_code, year, quarter, fs_div, rowid", params).fetchall()
+
+        fs_names = {'CFS': '연결', 'OFS': '별도'}
+        combined = pd.DataFrame(rows, columns=['corp_code', '년도', '분기', 'fs_div', 'account_id', 'sj_div',
+                                               'account_nm', 'thstrm_amount'])
+        combined['보고서명'] = combined['분기'].map({q: report[0] for q, report in QUARTER_REPORTS.items()})
+        combined['구분'] = combined['fs_div'].map(fs_names)
+        filtered, q4_incomplete = build_key_account_frame(combined, log=lambda *args, **kwargs: None, accounts=accounts)
+        filtered = filtered.reset_index(drop=True)
+        filtered.attrs['q4_incomplete'] = list(q4_incomplete.itertuples(index=False, name=None))
+        return filtered
+
+_timeseries_store: Optional[TimeSeriesStore] = None
+_timeseries_store_lock = threading.Lock()
+
+def get_timeseries_store() -> Optional[TimeSeriesStore]:
+    """
+    프로세스 전체가 공유하는 계정 시계열 저장소를 반환합니다 (TIMESERIES_DB_FILE이 비어 있으면 None).
+    """
+    global _timeseries_store
+    if not TIMESERIES_DB_FILE:
+        return None
+    with _timeseries_store_lock:
+        if _timeseries_store is None or _timeseries_store.path != TIMESERIES_DB_FILE:
+            try:
+                _timeseries_store = TimeSeriesStore(TIMESERIES_DB_FILE)
+            except sqlite3.Error as e:
+                print(f"⚠️ 계정 시계열 저장소를 열 수 없어 저장소 없이 진행합니다: {e}")
+                return None
+        return _timeseries_store
+
+# 파생 지표 스크리닝 인덱스(SQLite) 경로 (비어 있으면 사용하지 않음)
+SCREENING_DB_FILE = os.getenv("DART_SCREENING_DB", "")
+
+_screening_index = None
+_screening_index_lock = threading.Lock()
+
+def get_screening_index() -> Optional[ScreeningIndex]:
+    """
+    프로세스 전체가 공유하는 스크리닝 인덱스(dart_analytics.ScreeningIndex)를 반환합니다 (SCREENING_DB_FILE이 비어 있으면 None).
+    """
+    global _screening_index
+    if not SCREENING_DB_FILE:
+        return None
+    with _screening_index_lock:
+        if _screening_index is None or _screening_index.path != SCREENING_DB_FILE:
+            from dart_analytics import ScreeningIndex
+            try:
+                _screening_index = ScreeningIndex(SCREENING_DB_FILE)
+            except sqlite3.Error as e:
+                print(f"⚠️ 스크리닝 인덱스를 열 수 없어 인덱스 갱신 없이 진행합니다: {e}")
+                return None
+        return _screening_index
+
+_statement_requests = RequestCoalescer()
+
+def fetch_financial_statement(api_key: str, corp_code: str, year: int, report_type: str, fs_div: str) -> Optional[List[dict]]:
+    """
+    특정 조건(년도, 보고서타입, 구분)의 재무제표 원본 행 목록을 가져옵니다 (응답 캐시 우선).
+    데이터가 없으면(013) None을 반환하고, 요청이 실패하면 DartApiError를, 한도를 넘으면 DartQuotaExceeded를 발생시킵니다.
+    """
+    url = f"{DART_API_BASE}/fnlttSinglAcntAll.json"
     params = {
         'crtfc_key': api_key,
         'corp_code': str(corp_code).zfill(8),
@@ -104,22 +1634,150 @@ def get_financial_data(api_key: str, corp_code: str, year: int, report_type: str
         'reprt_code': report_type,
         'fs_div': fs_div
     }
-    
+
+    cache = get_response_cache()
+    data = None
+    if cache:
+        with metrics.timer('cache_read'):
+            data = cache.get(params['corp_code'], year, report_type, fs_div)
+        metrics.incr('cache_misses' if data is None else 'cache_hits')
+
+    def request() -> dict:
+        response = dart_get_json(url, params, timeout=10)
+        if cache:
+            with metrics.timer('cache_write'):
+                cache.put(params['corp_code'], year, report_type, fs_div, response)
+        return response
+
+    if data is None:
+        # 같은 (기업, 연도, 보고서, 구분)을 다른 스레드가 요청 중이면 그 응답을 함께 씁니다
+        data = _statement_requests.run((params['corp_code'], str(year), report_type, fs_div), request)
+
+    if data['status'] == DART_STATUS_OK and data.get('list'):
+        return data['list']
+    return None
+
+@instrumented('numeric_convert')
+def statement_to_frame(rows: List[dict]) -> pd.DataFrame:
+    """
+    재무제표 원본 행 목록을 DataFrame으로 만들고 금액 컬럼을 숫자로 변환합니다.
+    """
+    metrics.incr('rows_parsed', len(rows))
+    df = pd.DataFrame(rows)
+    numeric_cols = ['thstrm_amount', 'frmtrm_amount', 'bfefrmtrm_amount']
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce')
+    return df
+
+def get_financial_data(api_key: str, corp_code: str, year: int, report_type: str, fs_div: str) -> Optional[pd.DataFrame]:
+    """
+    특정 조건(년도, 보고서타입, 구분)의 재무제표 데이터를 가져옵니다.
+    요청이 실패하면 경고를 출력하고 None을 반환합니다 (한도 초과는 DartQuotaExceeded로 전달).
+    """
     try:
-        res = requests.get(url, params=params, timeout=10)
-        data = res.json()
-        
-        if data['status'] == '000' and data.get('list'):
-            df = pd.DataFrame(data['list'])
-            numeric_cols = ['thstrm_amount', 'frmtrm_amount', 'bfefrmtrm_amount']
-            for col in numeric_cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col].str.replace(',', ''), errors='coerce')
-            return df
-        else:
-            return None
-    except Exception:
+        rows = fetch_financial_statement(api_key, corp_code, year, report_type, fs_div)
+    except DartApiError as e:
+        print(f"⚠️ {str(corp_code).zfill(8)} {year}년 {report_type} ({fs_div}) 요청 실패: {e}")
+        return None
+    return statement_to_frame(rows) if rows else None
+
+def parse_amount(value) -> Optional[float]:
+    """
+    DART 금액 문자열('1,234,567', '-5,000')을 정수로 변환합니다. 비어 있거나 숫자가 아니면 None을 반환합니다.
+    pd.to_numeric(str.replace(',', ''), errors='coerce')와 같은 값을 DataFrame 없이 구합니다.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    text = value.replace(',', '').strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        number = float(text)
+    except ValueError:
         return None
+    return None if number != number else number
+
+# 주요 계정 행의 컬럼 순서 (build_key_account_frame 입력과 동일)
+KEY_ACCOUNT_COLUMNS = ('보고서명', '구분', 'account_id', 'account_nm', 'thstrm_amount', '년도')
+
+class KeyAccountRows:
+    """
+    주요 계정 행을 컬럼별 리스트로 모으는 가벼운 누적기입니다.
+    응답마다 DataFrame을 만들어 이어 붙이는 대신, 수집이 끝난 뒤 to_frame()으로 한 번만 DataFrame을 만듭니다.
+    """
+
+    __slots__ = ('report_names', 'fs_names', 'account_ids', 'account_nms', 'amounts', 'years')
+
+    def __init__(self):
+        self.report_names: List[str] = []
+        self.fs_names: List[str] = []
+        self.account_ids: List[str] = []
+        self.account_nms: List[str] = []
+        self.amounts: List[Optional[float]] = []
+        self.years: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def extend(self, rows: List[dict], report_name: str, fs_name: str, year: int) -> None:
+        for row in rows:
+            self.report_names.append(report_name)
+            self.fs_names.append(fs_name)
+            self.account_ids.append(row.get('account_id'))
+            self.account_nms.append(row.get('account_nm'))
+            self.amounts.append(parse_amount(row.get('thstrm_amount')))
+            self.years.append(year)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        모은 행으로 DataFrame을 만듭니다. 금액은 모두 정수이면 int64, 빈 값이나 소수가 있으면 float64입니다.
+        """
+        amounts = self.amounts
+        integral = all(type(amount) is int for amount in amounts)
+        return pd.DataFrame({
+            '보고서명': self.report_names,
+            '구분': self.fs_names,
+            'account_id': self.account_ids,
+            'account_nm': self.account_nms,
+            'thstrm_amount': pd.Series(amounts, dtype='int64' if integral else 'float64'),
+            '년도': pd.Series(self.years, dtype='int64'),
+        }, columns=list(KEY_ACCOUNT_COLUMNS))
+
+def filter_account_rows(rows: List[dict], wanted: Dict[str, Optional[set]]) -> List[dict]:
+    """
+    원본 행 중 account_filter 결과(account_id -> 허용 sj_div 집합 또는 None)에 맞는 행만 남깁니다.
+    """
+    kept = []
+    for row in rows:
+        sj_divs = wanted.get(row.get('account_id'), False)
+        if sj_divs is None or (sj_divs is not False and row.get('sj_div') in sj_divs):
+            kept.append(row)
+    return kept
+
+def fetch_key_account_rows(api_key: str, corp_code: str, year: int, report_type: str, fs_div: str,
+                           account_ids=None) -> Optional[List[dict]]:
+    """
+    fetch_financial_statement 결과에서 account_ids에 해당하는 원본 행만 남겨 반환합니다.
+    account_ids는 account_id 목록이나 account_filter 결과이며, 기본값은 KEY_ACCOUNTS입니다.
+    데이터가 없으면(013) None을, 보고서는 있으나 해당 계정이 없으면 빈 목록을 반환합니다.
+    """
+    rows = fetch_financial_statement(api_key, corp_code, year, report_type, fs_div)
+    if not rows:
+        return None
+    if account_ids is None:
+        wanted = dict.fromkeys(KEY_ACCOUNTS)
+    elif isinstance(account_ids, dict):
+        wanted = account_ids
+    else:
+        wanted = dict.fromkeys(account_ids)
+    with metrics.timer('row_filter'):
+        metrics.incr('rows_parsed', len(rows))
+        return filter_account_rows(rows, wanted)
 
 def get_quarter_info(year_month: int) -> tuple:
     """
@@ -149,67 +1807,227 @@ def get_quarter_info(year_month: int) -> tuple:
 
     return quarter, quarter_end_year, quarter_end_month
 
-def adjust_q4_values(df: pd.DataFrame, year_month: int = None) -> pd.DataFrame:
+@instrumented('q4_adjust')
+def adjust_q4_values(df: pd.DataFrame, year_month: int = None, return_incomplete: bool = False):
     """
     DART API에서 가져온 4분기 누적값을 실제 4분기 값으로 조정합니다.
     4분기를 포함하고 있는 모든 해에 대해 Q4 값을 조정합니다.
+    (corp_code,) 년도, 항목, 구분별 1~3분기 합계를 한 번의 groupby로 구해 4분기 행에서 일괄 차감합니다.
+    return_incomplete=True이면 1~3분기 중 빠진 분기가 있어 정확히 조정되지 않은 4분기 행을 함께 반환합니다.
     """
+    keys = [col for col in ('corp_code',) if col in df.columns] + ['년도', '항목', '구분']
+
+    def result(incomplete: Optional[pd.DataFrame] = None):
+        if not return_incomplete:
+            return df
+        if incomplete is None:
+            incomplete = pd.DataFrame(columns=keys + ['확보분기수'])
+        return df, incomplete
+
     if df.empty or '분기' not in df.columns:
+        return result()
+
+    q4_mask = (df['분기'] == 4).to_numpy()
+    if not q4_mask.any():
+        return result()
+
+    # 해당 해의 Q1+Q2+Q3 합계와 확보된 분기 수를 (년도, 항목, 구분) 단위로 한 번에 계산
+    q1_q3_data = df[df['분기'].isin([1, 2, 3])]
+    grouped = q1_q3_data.groupby(keys, sort=False)
+    q1_q2_q3_sum = grouped['thstrm_amount'].sum()
+    quarter_count = grouped['분기'].nunique()
+
+    q4_keys = pd.MultiIndex.from_frame(df.loc[q4_mask, keys]) if len(keys) > 1 else pd.Index(df.loc[q4_mask, keys[0]])
+    # 1~3분기 데이터가 없는 조합은 0을 차감 (기존 동작과 동일하게 값이 그대로 유지됨)
+    q4_sum = q1_q2_q3_sum.reindex(q4_keys).fillna(0)
+    q4_count = quarter_count.reindex(q4_keys).fillna(0).astype(int).to_numpy()
+
+    amounts = df['thstrm_amount']
+    if pd.api.types.is_integer_dtype(amounts.dtype):
+        q4_sum = q4_sum.astype(amounts.dtype)
+    df.loc[q4_mask, 'thstrm_amount'] = amounts[q4_mask].to_numpy() - q4_sum.to_numpy()
+
+    incomplete = df.loc[q4_mask, keys][q4_count < 3].copy()
+    incomplete['확보분기수'] = q4_count[q4_count < 3]
+    return result(incomplete.reset_index(drop=True))
+
+# 추출할 주요 계정 (account_id -> 항목명)
+KEY_ACCOUNTS = {
+    'ifrs-full_Revenue': '매출액',
+    'dart_OperatingIncomeLoss': '영업이익'
+}
+
+# 선택해서 수집할 수 있는 계정 (항목명 -> 설정)
+#   ids: 우선순위 순 account_id 목록 (IFRS/dart_ 표준계정, 한 보고서에 여러 개가 있으면 앞의 것을 사용)
+#   kind: flow(분기 금액, 사업보고서는 연간 누적 -> 4분기 보정), ytd(모든 보고서가 연초부터 누적 -> 분기 금액으로 환산),
+#         stock(재무상태표 시점 잔액, 보정 없음)
+#   sj_div: 특정 재무제표(BS/IS/CIS/CF/SCE)의 행만 사용할 때 지정 (같은 account_id가 여러 표에 나오는 계정)
+ACCOUNT_SPECS = {
+    '매출액': {'ids': ['ifrs-full_Revenue', 'ifrs_Revenue'], 'kind': 'flow'},
+    '영업이익': {'ids': ['dart_OperatingIncomeLoss', 'ifrs-full_ProfitLossFromOperatingActivities'], 'kind': 'flow'},
+    '당기순이익': {'ids': ['ifrs-full_ProfitLoss', 'ifrs_ProfitLoss'], 'kind': 'flow', 'sj_div': ['IS', 'CIS']},
+    '지배주주순이익': {'ids': ['ifrs-full_ProfitLossAttributableToOwnersOfParent'], 'kind': 'flow',
+                 'sj_div': ['IS', 'CIS']},
+    '자산총계': {'ids': ['ifrs-full_Assets', 'ifrs_Assets'], 'kind': 'stock'},
+    '부채총계': {'ids': ['ifrs-full_Liabilities', 'ifrs_Liabilities'], 'kind': 'stock'},
+    '자본총계': {'ids': ['ifrs-full_Equity', 'ifrs_Equity'], 'kind': 'stock', 'sj_div': ['BS']},
+    '현금및현금성자산': {'ids': ['ifrs-full_CashAndCashEquivalents'], 'kind': 'stock', 'sj_div': ['BS']},
+    '영업활동현금흐름': {'ids': ['ifrs-full_CashFlowsFromUsedInOperatingActivities',
+                          'ifrs_CashFlowsFromUsedInOperatingActivities'], 'kind': 'ytd'},
+    '투자활동현금흐름': {'ids': ['ifrs-full_CashFlowsFromUsedInInvestingActivities'], 'kind': 'ytd'},
+    '재무활동현금흐름': {'ids': ['ifrs-full_CashFlowsFromUsedInFinancingActivities'], 'kind': 'ytd'},
+}
+ACCOUNT_KINDS = ('flow', 'ytd', 'stock')
+
+# 계정 설정 파일(JSON, ACCOUNT_SPECS와 같은 형식)과 기본 수집 항목(쉼표 구분, 비어 있으면 매출액/영업이익)
+ACCOUNTS_FILE = os.getenv("DART_ACCOUNTS_FILE", "")
+DEFAULT_ACCOUNTS = [name.strip() for name in os.getenv("DART_ACCOUNTS", "").split(',') if name.strip()] or None
+
+def load_account_specs(path: str) -> None:
+    """
+    계정 설정 파일의 항목을 ACCOUNT_SPECS에 추가(같은 이름은 교체)합니다.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    for name, spec in specs.items():
+        ids = spec.get('ids')
+        if not ids or spec.get('kind', 'flow') not in ACCOUNT_KINDS:
+            raise ValueError(f"계정 설정 오류: {name} (ids 목록과 kind {ACCOUNT_KINDS} 중 하나가 필요합니다)")
+        ACCOUNT_SPECS[name] = {'ids': list(ids), 'kind': spec.get('kind', 'flow'),
+                               **({'sj_div': list(spec['sj_div'])} if spec.get('sj_div') else {})}
+
+if ACCOUNTS_FILE:
+    load_account_specs(ACCOUNTS_FILE)
+
+def account_specs(accounts: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+    """
+    수집할 항목명 목록을 계정 설정으로 변환합니다. None이면 기존 주요 계정(KEY_ACCOUNTS)을 사용합니다.
+    """
+    if accounts is None:
+        return {name: {'ids': [account_id], 'kind': 'flow'} for account_id, name in KEY_ACCOUNTS.items()}
+    unknown = [name for name in accounts if name not in ACCOUNT_SPECS]
+    if unknown:
+        raise ValueError(f"알 수 없는 계정: {', '.join(unknown)} (사용 가능: {', '.join(ACCOUNT_SPECS)})")
+    return {name: ACCOUNT_SPECS[name] for name in dict.fromkeys(accounts)}
+
+def account_filter(specs: Iterable[dict]) -> Dict[str, Optional[set]]:
+    """
+    계정 설정 목록에서 account_id -> 허용 재무제표구분(sj_div) 집합(None이면 모두 허용)을 만듭니다.
+    """
+    allowed: Dict[str, Optional[set]] = {}
+    for spec in specs:
+        sj_divs = set(spec['sj_div']) if spec.get('sj_div') else None
+        for account_id in spec['ids']:
+            if account_id in allowed and (allowed[account_id] is None or sj_divs is None):
+                allowed[account_id] = None
+            elif account_id in allowed:
+                allowed[account_id] = allowed[account_id] | sj_divs
+            else:
+                allowed[account_id] = sj_divs
+    return allowed
+
+def ytd_to_quarterly(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    연초부터의 누적 금액(현금흐름표 등)을 분기 금액으로 환산합니다 (N분기 = N분기 누적 - (N-1)분기 누적).
+    직전 분기 누적값이 없으면 환산할 수 없으므로 결측값으로 둡니다.
+    """
+    if df.empty:
         return df
+    keys = [col for col in ('corp_code',) if col in df.columns] + ['년도', '항목', '구분']
+    ordered = df.sort_values(keys + ['분기'], kind='stable')
+    grouped = ordered.groupby(keys, sort=False)
+    prev_amount = grouped['thstrm_amount'].shift(1)
+    prev_quarter = grouped['분기'].shift(1)
+
+    amounts = ordered['thstrm_amount'].astype('float64')
+    quarterly = amounts.where(ordered['분기'] == 1,
+                              (amounts - prev_amount).where(prev_quarter == ordered['분기'] - 1))
+    df = df.copy()
+    df['thstrm_amount'] = quarterly.reindex(df.index)
+    return df
 
-    # 4분기 데이터만 필터링
-    q4_data = df[df['분기'] == 4].copy()
+def build_key_account_frame(combined: pd.DataFrame, year_month: int = None, log=print,
+                            accounts: Optional[Iterable[str]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    수집된 재무제표 행에서 주요 계정만 남기고 항목/분기 컬럼을 붙인 뒤 4분기 값을 보정합니다.
+    accounts로 수집 항목(ACCOUNT_SPECS의 이름)을 고를 수 있으며, 계정 종류(kind)에 따라
+    flow는 4분기 보정, ytd는 분기 금액 환산을 적용하고 stock은 그대로 둡니다.
+    (보정된 DataFrame, 보정이 불완전한 4분기 행) 튜플을 반환합니다.
+    """
+    specs = account_specs(accounts)
+    id_names = {account_id: name for name, spec in specs.items() for account_id in spec['ids']}
+
+    columns = ['보고서명', '구분', 'account_id', 'account_nm', 'thstrm_amount', '년도']
+    if 'corp_code' in combined.columns:
+        columns.insert(0, 'corp_code')
+    filtered = combined[columns].copy()
+
+    key_items = list(id_names)
+    mask = filtered['account_id'].isin(key_items)
+    # 원본 재무제표 행이면 계정별로 허용된 재무제표(sj_div)의 행만 사용합니다
+    if 'sj_div' in combined.columns:
+        for account_id, sj_divs in account_filter(specs.values()).items():
+            if sj_divs is not None:
+                mask &= (filtered['account_id'] != account_id) | combined['sj_div'].isin(list(sj_divs))
+    filtered = filtered[mask]
+
+    filtered['항목'] = filtered['account_id'].map(id_names)
+
+    # 한 항목에 account_id가 여러 개이면 보고서마다 우선순위가 가장 높은 것만 남깁니다
+    if any(len(spec['ids']) > 1 for spec in specs.values()):
+        priority = filtered['account_id'].map(
+            {account_id: i for spec in specs.values() for i, account_id in enumerate(spec['ids'])})
+        unit_keys = [col for col in ('corp_code',) if col in columns] + ['년도', '보고서명', '구분', '항목']
+        best = priority.groupby([filtered[col] for col in unit_keys]).transform('min')
+        filtered = filtered[priority == best]
 
-    if q4_data.empty:
-        return df
+    # 보고서명 기준으로 분기 컬럼 추가
+    quarter_map = {
+        '1분기보고서': 1,
+        '반기보고서': 2,
+        '3분기보고서': 3,
+        '사업보고서': 4
+    }
+    filtered['분기'] = filtered['보고서명'].map(quarter_map)
 
-    # 모든 해에 대해 Q4 값 조정 적용
-    for year in q4_data['년도'].unique():
-        # 해당 해의 Q1+Q2+Q3 데이터 합계 계산
-        q1_q3_data = df[(df['년도'] == year) & df['분기'].isin([1, 2, 3])]
+    # print("조정전", filtered)
 
-        if q1_q3_data.empty:
-            continue
+    kinds = filtered['항목'].map({name: spec.get('kind', 'flow') for name, spec in specs.items()})
+    if (kinds == 'flow').all():
+        # Q4 값 조정 적용
+        filtered, q4_incomplete = adjust_q4_values(filtered, year_month, return_incomplete=True)
+    else:
+        flow, q4_incomplete = adjust_q4_values(filtered[kinds == 'flow'].copy(), year_month, return_incomplete=True)
+        parts = [flow, ytd_to_quarterly(filtered[kinds == 'ytd']), filtered[kinds == 'stock']]
+        filtered = pd.concat([part for part in parts if not part.empty] or [filtered.iloc[:0]]).sort_index()
+    metrics.incr('key_account_rows', len(filtered))
+    for _, row in q4_incomplete.iterrows():
+        log(f"  ⚠️ {row['년도']}년 4분기 {row['항목']}({row['구분']}) 보정 불완전 - 1~3분기 중 {row['확보분기수']}개만 존재")
 
-        # 항목별로 Q1+Q2+Q3 합계 계산 (구분 컬럼 포함)
-        q1_q2_q3_sum = {}
-        for item in q1_q3_data['항목'].unique():
-            for fs_div in q1_q3_data['구분'].unique():
-                item_sum = q1_q3_data[(q1_q3_data['항목'] == item) & (q1_q3_data['구분'] == fs_div)]['thstrm_amount'].sum()
-                q1_q2_q3_sum[(year, item, fs_div)] = item_sum
+    # print("조정후", filtered)
 
-        # 해당 해의 Q4 값 조정
-        year_q4_data = df[(df['년도'] == year) & (df['분기'] == 4)]
-        for idx, row in year_q4_data.iterrows():
-            item = row['항목']
-            fs_div = row['구분']
+    return filtered, q4_incomplete
 
-            if (year, item, fs_div) in q1_q2_q3_sum:
-                adjusted_value = row['thstrm_amount'] - q1_q2_q3_sum[(year, item, fs_div)]
-                df.at[idx, 'thstrm_amount'] = adjusted_value
+# 분기 -> (보고서명, 보고서코드)
+QUARTER_REPORTS = {
+    1: ('1분기보고서', '11013'),
+    2: ('반기보고서', '11012'),
+    3: ('3분기보고서', '11014'),
+    4: ('사업보고서', '11011'),
+}
 
-    return df
+# 동시 수집 시 기본 작업자 수 (환경 변수 DART_MAX_WORKERS로 변경 가능)
+DEFAULT_FETCH_WORKERS = int(os.getenv("DART_MAX_WORKERS", "8"))
 
-def collect_quarterly_financials(api_key: str, corp_code: str, year: int, year_month: int = None) -> pd.DataFrame:
+def build_collection_plan(year: int, year_month: int = None) -> List[Tuple[int, Optional[int], str, str, str, str]]:
     """
-    특정 년도의 모든 분기(사업보고서, 1분기, 반기, 3분기) 재무제표를 수집하여 정리합니다.
-    year_month가 제공되면 해당 분기부터 직전 4분기 데이터를 수집합니다.
+    수집할 요청 목록을 (년도, 분기, 보고서명, 보고서코드, 구분명, 구분코드) 튜플로 만듭니다.
+    year_month가 없으면 분기는 None이며, 목록 순서가 곧 출력(로그/데이터) 순서입니다.
     """
-    corp_code = str(corp_code).zfill(8)
-
-    report_types = [
-        ('사업보고서', '11011'),
-        ('1분기보고서', '11013'),
-        ('반기보고서', '11012'),
-        ('3분기보고서', '11014')
-    ]
-
     fs_divs = [('연결', 'CFS'), ('별도', 'OFS')]
-
-    all_data = []
+    plan = []
 
     if year_month is not None:
-        # YYYYMM 형식 처리
         quarter, quarter_end_year, quarter_end_month = get_quarter_info(year_month)
 
         # 입력한 해(YYYY 또는 YYYYMM 의 YYYY)기준으로 [YYYY-4] 년 1분기부터 불러오기
@@ -220,13 +2038,12 @@ def collect_quarterly_financials(api_key: str, corp_code: str, year: int, year_m
         if quarter_end_month == 12:
             end_quarter = 4
 
-        # 모든 분기 목록 생성
-        quarters_to_collect = []
         current_year = start_year
         current_quarter = start_quarter
-
         while True:
-            quarters_to_collect.append((current_year, current_quarter))
+            report_name, report_code = QUARTER_REPORTS[current_quarter]
+            for fs_name, fs_code in fs_divs:
+                plan.append((current_year, current_quarter, report_name, report_code, fs_name, fs_code))
 
             if current_year == end_year and current_quarter == end_quarter:
                 break
@@ -235,292 +2052,1302 @@ def collect_quarterly_financials(api_key: str, corp_code: str, year: int, year_m
             if current_quarter > 4:
                 current_quarter = 1
                 current_year += 1
-
-        print(f"\n🔄 [{year_month} 기준] {corp_code} 재무데이터 수집 시작...")
-        print(f"   대상 분기: {quarters_to_collect}")
-
-        for target_year, target_quarter in quarters_to_collect:
-            if target_quarter == 1:
-                report_name = '1분기보고서'
-                report_code = '11013'
-            elif target_quarter == 2:
-                report_name = '반기보고서'
-                report_code = '11012'
-            elif target_quarter == 3:
-                report_name = '3분기보고서'
-                report_code = '11014'
-            else:  # target_quarter == 4
-                report_name = '사업보고서'
-                report_code = '11011'
-
-            for fs_name, fs_code in fs_divs:
-                df = get_financial_data(api_key, corp_code, target_year, report_code, fs_code)
-
-                if df is not None:
-                    df['보고서명'] = report_name
-                    df['구분'] = fs_name
-                    df['년도'] = target_year
-                    df['분기'] = target_quarter
-                    all_data.append(df)
-                    print(f"  ✅ {target_year}년 {report_name} ({fs_name})")
-                else:
-                    print(f"  ❌ {target_year}년 {report_name} ({fs_name}) - 데이터 없음")
     else:
-        # 기존 연도 처리
-        print(f"\n🔄 [{year}년] {corp_code} 재무데이터 수집 시작...")
-
+        report_types = [QUARTER_REPORTS[4], QUARTER_REPORTS[1], QUARTER_REPORTS[2], QUARTER_REPORTS[3]]
         for report_name, report_code in report_types:
             for fs_name, fs_code in fs_divs:
-                df = get_financial_data(api_key, corp_code, year, report_code, fs_code)
-
-                if df is not None:
-                    df['보고서명'] = report_name
-                    df['구분'] = fs_name
-                    df['년도'] = year
-                    all_data.append(df)
-                    print(f"  ✅ {report_name} ({fs_name})")
-                else:
-                    print(f"  ❌ {report_name} ({fs_name}) - 데이터 없음")
+                plan.append((year, None, report_name, report_code, fs_name, fs_code))
+
+    return plan
 
-    if not all_data:
-        return pd.DataFrame()
+@dataclass
+class CollectOptions:
+    """
+    collect_quarterly_financials의 실행 옵션입니다.
+    max_workers개의 스레드로 요청을 동시에 보내며(기본값 DEFAULT_FETCH_WORKERS, 1이면 순차 실행), executor를 넘기면
+    새 스레드 풀 대신 공유 풀을 사용합니다. verbose=False이면 진행 로그를 출력하지 않습니다.
+    accounts로 수집 항목(ACCOUNT_SPECS의 이름)을 고를 수 있습니다(기본값: 매출액, 영업이익).
+    incremental=True(저장소 필요)이면 확정된 보고기간만 저장소 값을 쓰고 새 보고기간과 아직 확정되지 않은 보고기간은
+    다시 요청합니다. 이때 previous(같은 기업의 이전 수집 결과)를 넘기면 새로 요청한 보고서가 없는 연도는 이전 결과를
+    그대로 쓰고, 영향을 받은 연도만 4분기 보정을 다시 계산합니다.
+    cancel_event가 설정되면 아직 보내지 않은 요청을 건너뛰고 CancelledError를 발생시킵니다.
+    journal(BatchJournal)을 넘기면 보고서마다 결과를 작업 기록에 남기고, 이미 기록된 보고서(데이터/데이터 없음)는
+    다시 요청하지 않습니다. 요청 실패로 기록된 보고서만 다시 요청합니다.
+    """
+    max_workers: Optional[int] = None
+    executor: Optional[ThreadPoolExecutor] = None
+    verbose: bool = True
+    accounts: Optional[Iterable[str]] = None
+    incremental: bool = False
+    previous: Optional[pd.DataFrame] = None
+    cancel_event: Optional[threading.Event] = None
+    journal: Optional["BatchJournal"] = None
+
+class ReportSources:
+    """
+    한 기업의 보고서 단위(년도, 분기, 구분코드)를 계정 시계열 저장소 → 작업 기록(journal) → 네트워크 요청 순서로 찾습니다.
+    저장소와 작업 기록은 생성할 때 한 번에 조회해 stored에 두고, fetch는 stored에 없는 보고서만 요청한 뒤
+    결과를 저장소와 작업 기록에 남깁니다.
+    """
 
-    combined = pd.concat(all_data, ignore_index=True)
-    filtered = combined[['보고서명', '구분', 'account_id', 'account_nm', 'thstrm_amount', '년도']].copy()
+    def __init__(self, api_key: str, corp_code: str, units: Iterable[Tuple[int, int, str]],
+                 options: CollectOptions):
+        self.api_key = api_key
+        self.corp_code = corp_code
+        self.cancel_event = options.cancel_event
+        self.journal = options.journal
+        # 요청은 스레드 풀에서 보내므로 호출한 스레드의 우선순위를 미리 읽어 둡니다
+        self.priority = current_priority()
+        self.wanted = account_filter(account_specs(options.accounts).values())
+        self.store = get_timeseries_store()
+        if options.incremental and not self.store:
+            raise ValueError("증분 수집에는 계정 시계열 저장소(DART_TIMESERIES_DB)가 필요합니다.")
+        # 저장소에는 설정된 모든 계정을 함께 기록해 두어 나중에 항목을 늘려도 다시 요청하지 않게 합니다
+        self.fetch_filter = self.wanted
+        if self.store:
+            self.fetch_filter = account_filter(list(ACCOUNT_SPECS.values())
+                                               + list(account_specs(options.accounts).values()))
+
+        units = list(units)
+        stored = self.store.lookup(corp_code, units, self.wanted) if self.store else {}
+        if options.incremental:
+            # 확정된 보고기간만 저장소 값을 그대로 쓰고, 아직 확정되지 않은 보고기간은 다시 요청합니다
+            stored = {unit: rows for unit, rows in stored.items()
+                      if is_period_final(unit[0], QUARTER_REPORTS[unit[1]][1])}
+        if self.store:
+            metrics.incr('store_hits', len(stored))
+        if self.journal:
+            journaled = self.journal.lookup(corp_code, [unit for unit in units if unit not in stored])
+            metrics.incr('journal_hits', len(journaled))
+            stored = {**stored, **journaled}
+        self.stored: Dict[Tuple[int, int, str], Optional[List[dict]]] = stored
+
+    def fetch(self, unit: Tuple[int, int, str], report_code: str):
+        """
+        보고서 하나의 주요 계정 행을 반환합니다. 공시가 없으면 None, 취소되었으면 None, 재시도 후에도 요청이
+        실패하면 그 DartApiError를 (발생시키지 않고) 반환합니다.
+        """
+        if unit in self.stored:
+            return self.stored[unit]
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return None
+        target_year, _, fs_code = unit
+        try:
+            with request_priority(self.priority):
+                rows = fetch_key_account_rows(self.api_key, self.corp_code, target_year, report_code, fs_code,
+                                              self.fetch_filter)
+        except DartApiError as e:
+            if self.journal:
+                self.journal.record(self.corp_code, unit, None, error=str(e))
+            return e
+        if self.store:
+            self.store.save(self.corp_code, *unit, rows, self.fetch_filter)
+            if rows is not None:
+                rows = filter_account_rows(rows, self.wanted)
+        if self.journal:
+            self.journal.record(self.corp_code, unit, rows)
+        return rows
+
+def collect_quarterly_financials(api_key: str, corp_code: str, year: int, year_month: int = None,
+                                 options: Optional[CollectOptions] = None, **overrides) -> pd.DataFrame:
+    """
+    특정 년도의 모든 분기(사업보고서, 1분기, 반기, 3분기) 재무제표를 수집하여 정리합니다.
+    year_month가 제공되면 해당 분기부터 직전 4분기 데이터를 수집합니다.
+    실행 옵션은 options(CollectOptions)로 넘기거나 같은 이름의 키워드 인자(verbose=False 등)로 넘기며,
+    둘 다 주면 키워드 인자가 우선합니다. 로그와 결과 순서는 동시에 요청해도 요청 순서를 따릅니다.
+    재시도 후에도 실패한 요청은 결과의 attrs['fetch_errors']에 (년도, 보고서명, 구분, 오류) 목록으로 남습니다.
+    1~3분기가 모두 있지 않아 4분기 보정이 불완전한 항목은 attrs['q4_incomplete']에 (년도, 항목, 구분, 확보분기수) 목록으로 남습니다.
+    계정 시계열 저장소(TIMESERIES_DB_FILE)가 설정되어 있으면 이미 확인한 보고서는 저장소에서 읽고 빠진 보고서만
+    요청합니다(ReportSources). 스크리닝 인덱스(SCREENING_DB_FILE)가 설정되어 있으면 결과로 이 기업의 파생 지표를 갱신합니다.
+    """
+    options = replace(options or CollectOptions(), **overrides)
+    corp_code = str(corp_code).zfill(8)
+    max_workers = options.max_workers if options.max_workers is not None else DEFAULT_FETCH_WORKERS
+    accounts, incremental, cancel_event = options.accounts, options.incremental, options.cancel_event
+    log = print if options.verbose else (lambda *args, **kwargs: None)
+
+    plan = build_collection_plan(year, year_month)
+    report_quarters = {report_code: quarter for quarter, (_, report_code) in QUARTER_REPORTS.items()}
+    units = [(task[0], report_quarters[task[3]], task[5]) for task in plan]
+    sources = ReportSources(api_key, corp_code, units, options)
+    stored = sources.stored
+
+    # 새로 요청하는 보고서가 있는 연도만 다시 보정하고, 나머지 연도는 이전 결과를 재사용합니다
+    affected_years = {unit[0] for unit in units if unit not in stored}
+    reused = None
+    previous = options.previous
+    if incremental and previous is not None and not previous.empty:
+        reused = reusable_previous_rows(previous, {task[0] for task in plan} - affected_years,
+                                        account_specs(accounts))
+    collected = KeyAccountRows()
+    filed = False
+    fetch_errors = []
 
-    key_items = ['ifrs-full_Revenue', 'dart_OperatingIncomeLoss']
-    filtered = filtered[filtered['account_id'].isin(key_items)]
+    if year_month is not None:
+        quarters_to_collect = list(dict.fromkeys((task[0], task[1]) for task in plan))
+        log(f"\n🔄 [{year_month} 기준] {corp_code} 재무데이터 수집 시작...")
+        log(f"   대상 분기: {quarters_to_collect}")
+    else:
+        log(f"\n🔄 [{year}년] {corp_code} 재무데이터 수집 시작...")
+    if incremental:
+        log(f"   증분 수집: {len(plan) - len(stored)}건 요청, 확정 보고서 {len(stored)}건은 저장소 사용"
+            f"{f' (보정 재계산: {sorted(affected_years)}년)' if reused is not None else ''}")
 
-    item_map = {
-        'ifrs-full_Revenue': '매출액',
-        'dart_OperatingIncomeLoss': '영업이익'
-    }
-    filtered['항목'] = filtered['account_id'].map(item_map)
+    executor = options.executor
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(plan))))
 
-    # 보고서명 기준으로 분기 컬럼 추가
-    quarter_map = {
-        '1분기보고서': 1,
-        '반기보고서': 2,
-        '3분기보고서': 3,
-        '사업보고서': 4
-    }
-    filtered['분기'] = filtered['보고서명'].map(quarter_map)
+    try:
+        # map은 제출 순서대로 결과를 돌려주므로 로그 순서가 순차 실행과 동일합니다
+        for task, rows in zip(plan, executor.map(sources.fetch, units, [task[3] for task in plan])):
+            target_year, _, report_name, _, fs_name, _ = task
+            label = f"{target_year}년 {report_name}" if year_month is not None else report_name
+
+            if isinstance(rows, DartApiError):
+                fetch_errors.append((target_year, report_name, fs_name, str(rows)))
+                log(f"  ⚠️ {label} ({fs_name}) - 요청 실패: {rows}")
+            elif rows is not None:
+                if reused is None or target_year in affected_years:
+                    collected.extend(rows, report_name, fs_name, target_year)
+                filed = True
+                log(f"  ✅ {label} ({fs_name})")
+            else:
+                log(f"  ❌ {label} ({fs_name}) - 데이터 없음")
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    if cancel_event is not None and cancel_event.is_set():
+        raise CancelledError(f"{corp_code} 재무데이터 수집이 취소되었습니다.")
+    if not filed:
+        empty = pd.DataFrame()
+        empty.attrs['fetch_errors'] = fetch_errors
+        return empty
+
+    # 응답별 DataFrame 생성과 concat 없이, 주요 계정 행만으로 DataFrame을 한 번 만듭니다
+    filtered, q4_incomplete = build_key_account_frame(collected.to_frame(), year_month, log, accounts)
+    if reused is not None and not reused.empty:
+        # 재사용한 연도의 보정 불완전 항목도 다시 남깁니다 (값은 이미 보정되었으므로 확보 분기 수만 사용)
+        kinds = reused['항목'].map({name: spec.get('kind', 'flow') for name, spec in account_specs(accounts).items()})
+        _, reused_incomplete = adjust_q4_values(reused[kinds == 'flow'].copy(), return_incomplete=True)
+        q4_incomplete = pd.concat([reused_incomplete, q4_incomplete], ignore_index=True)
+        q4_incomplete = q4_incomplete.sort_values('년도', kind='stable')
+    if reused is not None and filtered.empty:
+        filtered = reused
+    elif reused is not None and not reused.empty:
+        # 연도별로 한쪽 결과만 있으므로 연도 기준 안정 정렬로 수집 순서를 유지합니다
+        filtered = pd.concat([reused, filtered], ignore_index=True)
+        filtered = filtered.sort_values('년도', kind='stable').reset_index(drop=True)
+
+    # 요청 실패(재시도 후에도 실패)한 항목은 '데이터 없음'과 구분할 수 있도록 attrs에 남깁니다
+    filtered.attrs['fetch_errors'] = fetch_errors
+    filtered.attrs['q4_incomplete'] = list(q4_incomplete.itertuples(index=False, name=None))
+    index = get_screening_index()
+    if index and not filtered.empty:
+        index.update(corp_code, filtered)
+    return filtered
 
-    # print("조정전", filtered)
+def reusable_previous_rows(previous: pd.DataFrame, years: Iterable[int],
+                           specs: Dict[str, dict]) -> Optional[pd.DataFrame]:
+    """
+    이전 수집 결과(collect_quarterly_financials 결과나 Parquet 데이터셋에서 읽은 한 기업의 행)에서 years의 행만
+    현재 결과와 같은 컬럼/타입으로 꺼냅니다. 이전 결과에 요청한 항목이 하나라도 없으면 재사용할 수 없으므로 None을 반환합니다.
+    """
+    columns = ['보고서명', '구분', 'account_id', 'account_nm', 'thstrm_amount', '년도', '항목', '분기']
+    if not set(columns) <= set(previous.columns) or not set(specs) <= set(previous['항목'].astype(str)):
+        return None
+    rows = previous.loc[previous['년도'].astype('int64').isin(list(years)), columns].copy()
+    for col in ('보고서명', '구분', 'account_id', 'account_nm', '항목'):
+        rows[col] = rows[col].astype(str)
+    rows['년도'] = rows['년도'].astype('int64')
+    rows['분기'] = rows['분기'].astype('int64')
+    rows = rows[rows['항목'].isin(list(specs))]
+    # Parquet에서 읽은 정수(Int64) 금액은 결측이 없으면 int64로 되돌립니다
+    amounts = rows['thstrm_amount']
+    rows['thstrm_amount'] = amounts.astype('int64') if amounts.notna().all() else amounts.astype('float64')
+    return rows.reset_index(drop=True)
+
+# 다중회사 주요계정 API의 계정명 -> 전체 재무제표 API와 같은 account_id
+MULTI_ACCOUNT_IDS = {
+    '매출액': 'ifrs-full_Revenue',
+    '영업이익': 'dart_OperatingIncomeLoss'
+}
+# 다중회사 주요계정 API 한 번에 조회할 수 있는 최대 기업 수
+MULTI_ACCOUNT_CHUNK = 100
+
+def fetch_multi_key_accounts(api_key: str, corp_codes: List[str], year: int, report_type: str) -> Dict[Tuple[str, str], List[dict]]:
+    """
+    다중회사 주요계정 API(fnlttMultiAcnt)로 여러 기업의 주요 계정을 최대 100개 기업씩 묶어 가져옵니다.
+    반환값은 (고유번호, 구분코드) -> 주요 계정 행 목록이며, 각 행에는 전체 재무제표와 같은 account_id가 붙습니다.
+    """
+    url = f"{DART_API_BASE}/fnlttMultiAcnt.json"
+    result: Dict[Tuple[str, str], List[dict]] = {}
+
+    for i in range(0, len(corp_codes), MULTI_ACCOUNT_CHUNK):
+        params = {
+            'crtfc_key': api_key,
+            'corp_code': ','.join(corp_codes[i:i + MULTI_ACCOUNT_CHUNK]),
+            'bsns_year': str(year),
+            'reprt_code': report_type
+        }
+        data = dart_get_json(url, params, timeout=30)
+        for row in data.get('list') or []:
+            account_id = MULTI_ACCOUNT_IDS.get(str(row.get('account_nm', '')).strip())
+            if account_id is None:
+                continue
+            key = (str(row.get('corp_code', '')).zfill(8), row.get('fs_div', ''))
+            result.setdefault(key, []).append(dict(row, account_id=account_id))
+    return result
+
+def collect_key_accounts_multi(api_key: str, corp_codes: List[str], year: int, year_month: int = None,
+                               max_workers: Optional[int] = None,
+                               executor: Optional[ThreadPoolExecutor] = None,
+                               verbose: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    여러 기업의 주요 계정(매출액, 영업이익)을 다중회사 주요계정 API로 보고서별로 한 번에 수집합니다.
+    주요 계정이 빠진 (기업, 보고서, 구분)만 전체 재무제표 API로 다시 요청합니다.
+    반환값은 고유번호 -> collect_quarterly_financials와 같은 형태의 DataFrame입니다.
+    """
+    corp_codes = list(dict.fromkeys(str(code).zfill(8) for code in corp_codes))
+    if max_workers is None:
+        max_workers = DEFAULT_FETCH_WORKERS
+    log = print if verbose else (lambda *args, **kwargs: None)
+    priority = current_priority()
 
-    # Q4 값 조정 적용
-    filtered = adjust_q4_values(filtered, year_month)
+    plan = build_collection_plan(year, year_month)
+    periods = list(dict.fromkeys((task[0], task[3]) for task in plan))
+    log(f"\n🔄 [주요계정 일괄] {len(corp_codes)}개 기업 × {len(periods)}개 보고서 수집 시작...")
 
-    # print("조정후", filtered)
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(periods))))
 
-    return filtered
+    def fetch_period(period):
+        try:
+            with request_priority(priority):
+                return fetch_multi_key_accounts(api_key, corp_codes, period[0], period[1])
+        except DartApiError as e:
+            return e
 
-def format_display_table(df: pd.DataFrame, corp_code: str, year_month: int = None) -> str:
+    def fetch_fallback(unit):
+        corp_code, task = unit
+        try:
+            with request_priority(priority):
+                return fetch_key_account_rows(api_key, corp_code, task[0], task[3], task[5]) or None
+        except DartApiError as e:
+            return e
+
+    try:
+        multi_results = dict(zip(periods, executor.map(fetch_period, periods)))
+        for period, result in multi_results.items():
+            if isinstance(result, DartApiError):
+                log(f"  ⚠️ {period[0]}년 {period[1]} 주요계정 요청 실패 (전체 재무제표로 대체): {result}")
+
+        # 주요 계정이 모두 있는 단위는 그대로 쓰고, 빠진 단위만 전체 재무제표로 대체합니다.
+        # 해당 보고서에 기업의 행이 하나도 없으면 미제출로 보되, 어느 보고서에도 없는 기업은
+        # 주요계정 API 대상이 아닐 수 있으므로 모든 단위를 대체합니다.
+        covered = {key for result in multi_results.values() if not isinstance(result, DartApiError)
+                   for key in result}
+        covered_corps = {corp_code for corp_code, _ in covered}
+        unit_rows: Dict[Tuple[str, int], object] = {}
+        fallback_units = []
+        for corp_code in corp_codes:
+            for i, task in enumerate(plan):
+                result = multi_results[(task[0], task[3])]
+                if isinstance(result, DartApiError) or corp_code not in covered_corps:
+                    fallback_units.append((corp_code, i))
+                    continue
+                rows = result.get((corp_code, task[5]), [])
+                filed = any((corp_code, fs_code) in result for fs_code in ('CFS', 'OFS'))
+                if not filed or set(KEY_ACCOUNTS) <= {row['account_id'] for row in rows}:
+                    unit_rows[(corp_code, i)] = rows
+                else:
+                    fallback_units.append((corp_code, i))
+
+        log(f"  ✅ 주요계정 요청 {len(periods) * -(-len(corp_codes) // MULTI_ACCOUNT_CHUNK)}건, "
+            f"전체 재무제표 대체 요청 {len(fallback_units)}건")
+        fallback_results = executor.map(fetch_fallback, [(corp_code, plan[i]) for corp_code, i in fallback_units])
+        unit_rows.update(zip(fallback_units, fallback_results))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    frames = {}
+    for corp_code in corp_codes:
+        # 단위별 DataFrame을 만들지 않고 행을 모아 기업당 한 번만 DataFrame을 만듭니다
+        collected = KeyAccountRows()
+        fetch_errors = []
+        for i, task in enumerate(plan):
+            target_year, _, report_name, _, fs_name, _ = task
+            rows = unit_rows[(corp_code, i)]
+            if isinstance(rows, DartApiError):
+                fetch_errors.append((target_year, report_name, fs_name, str(rows)))
+            elif rows:
+                collected.extend(rows, report_name, fs_name, target_year)
+
+        if len(collected):
+            filtered, q4_incomplete = build_key_account_frame(collected.to_frame(),
+                                                              year_month, log=lambda *args, **kwargs: None)
+            filtered.attrs['q4_incomplete'] = list(q4_incomplete.itertuples(index=False, name=None))
+        else:
+            filtered = pd.DataFrame()
+        filtered.attrs['fetch_errors'] = fetch_errors
+        frames[corp_code] = filtered
+
+    index = get_screening_index()
+    if index:
+        for corp_code, filtered in frames.items():
+            if not filtered.empty:
+                index.update(corp_code, filtered)
+    return frames
+
+# 요약 테이블 출력 형식과 보고서 표시 순서/기준월
+TABLE_FORMATS = ('text', 'csv', 'markdown', 'html')
+TABLE_TITLE = "📋 [재무 정보 요약 테이블]"
+REPORT_ORDER = ['사업보고서', '1분기보고서', '반기보고서', '3분기보고서']
+REPORT_MONTHS = {'사업보고서': 12, '1분기보고서': 3, '반기보고서': 6, '3분기보고서': 9}
+
+def _float_array(values) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype='float64', na_value=np.nan)
+    return np.asarray(values, dtype='float64')
+
+def format_amounts(values) -> np.ndarray:
+    """
+    금액 컬럼 전체를 천 단위 구분 문자열 배열로 바꿉니다 (결측은 '-', 소수점 이하는 버림).
+    """
+    values = _float_array(values)
+    out = np.full(len(values), '-', dtype=object)
+    mask = ~np.isnan(values)
+    out[mask] = [f"{value:,}" for value in values[mask].astype('int64').tolist()]
+    return out
+
+def format_margins(values) -> np.ndarray:
+    """
+    이익률 컬럼 전체를 소수점 둘째 자리 문자열 배열로 바꿉니다 (결측은 '-').
+    """
+    values = _float_array(values)
+    out = np.full(len(values), '-', dtype=object)
+    mask = ~np.isnan(values)
+    out[mask] = [f"{value:.2f}" for value in values[mask].tolist()]
+    return out
+
+def operating_margin(revenue, operating_income) -> np.ndarray:
+    """
+    영업이익률(%)을 한 번에 계산합니다. 매출액이 0이거나 어느 한쪽이 없으면 결측(NaN)입니다.
+    """
+    revenue = _float_array(revenue)
+    operating_income = _float_array(operating_income)
+    valid = ~np.isnan(revenue) & ~np.isnan(operating_income) & (revenue != 0)
+    margin = np.full(len(revenue), np.nan)
+    margin[valid] = (operating_income[valid] / revenue[valid]) * 100
+    return margin
+
+def quarterly_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    분기별 수집 결과를 기간별 매출액/영업이익/영업이익률 숫자 표로 한 번에 계산합니다.
+    corp_code 컬럼이 있으면 기업별로 나누며(기업은 처음 나온 순서, 기간은 과거부터), 같은 칸에 값이 여럿이면
+    (연결/별도 등) 먼저 나온 값을 씁니다.
+    """
+    # (기업, 년도, 분기)를 정수 하나로 묶어 정렬/첫 값 선택을 numpy 연산으로 처리합니다
+    period = df['년도'].to_numpy(dtype='int64') * 10 + df['분기'].to_numpy(dtype='int64')
+    corps = None
+    if 'corp_code' in df.columns:
+        corp_index, corps = pd.factorize(df['corp_code'])
+        period = corp_index.astype('int64') * 1_000_000 + period
+    periods = np.unique(period)
+
+    amounts = pd.to_numeric(df['thstrm_amount'], errors='coerce').to_numpy(dtype='float64')
+    items = df['항목'].astype(str).to_numpy()
+    valid = ~np.isnan(amounts)
+    table = pd.DataFrame({'년도': periods % 1_000_000 // 10, '분기': periods % 10})
+    if corps is not None:
+        table.insert(0, 'corp_code', np.asarray(corps)[periods // 1_000_000])
+    for item in ('매출액', '영업이익'):
+        mask = valid & (items == item)
+        found, first = np.unique(period[mask], return_index=True)
+        column = np.full(len(periods), np.nan)
+        column[np.searchsorted(periods, found)] = amounts[mask][first]
+        table[item] = column
+    table['영업이익률'] = operating_margin(table['매출액'], table['영업이익'])
+    return table
+
+def annual_summary(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Tuple[str, str]]]:
+    """
+    분기 정보가 없는 (보고서별) 수집 결과를 항목 x 보고서 숫자 표로 계산합니다. 연결 값이 있으면 연결을 우선합니다.
+    corp_code 컬럼이 있으면 quarterly_summary처럼 기업별로 나누어 (고유번호, 항목) 인덱스로 반환합니다 (기업은 처음 나온 순서).
+    보고서 컬럼 순서와 표시 이름(가장 최근 연도의 연월 YYYYMM)을 과거 -> 최신 순으로 함께 반환합니다.
+    """
+    keys = ['corp_code', '항목'] if 'corp_code' in df.columns else ['항목']
+    df = df.assign(**{key: df[key].astype(str) for key in keys})
+    pivot = (df.loc[df['thstrm_amount'].notna()]
+             .groupby(keys + ['보고서명'], observed=True, sort=False)['thstrm_amount'].first()
+             .unstack('보고서명').reindex(columns=REPORT_ORDER))
+    if len(keys) == 1:
+        pivot = pivot.sort_index()
+    else:
+        # 기업은 처음 나온 순서, 기업 안의 항목은 이름 순
+        order = {code: i for i, code in enumerate(pd.unique(df['corp_code']))}
+        pivot = pivot.iloc[sorted(range(len(pivot)), key=lambda i: (order[pivot.index[i][0]], pivot.index[i][1]))]
+
+    if '구분' in df.columns:
+        # 연결 행이 있는 칸은 그 보고서의 첫 연결 값으로 바꿉니다
+        cfs = df.loc[df['구분'] == '연결'].drop_duplicates(keys + ['보고서명'], keep='first')
+        cfs = cfs[cfs['보고서명'].astype(str).isin(REPORT_ORDER)]
+        for row in cfs[keys + ['보고서명', 'thstrm_amount']].itertuples(index=False):
+            key = row[0] if len(keys) == 1 else tuple(row[:len(keys)])
+            if key in pivot.index:
+                pivot.loc[key, str(row[len(keys)])] = row[-1]
+
+    latest_years = df.groupby(df['보고서명'].astype(str))['년도'].max()
+    columns = [(report, f"{latest_years[report]}{REPORT_MONTHS[report]:02d}" if report in latest_years.index else report)
+               for report in REPORT_ORDER]
+    # 연월(YYYYMM) 기준으로 과거 -> 최신 순 정렬 (자료가 없는 보고서는 뒤로)
+    columns.sort(key=lambda column: int(column[1]) if column[1].isdigit() else float('inf'))
+    return pivot, columns
+
+def _text_row(parts: List[str]) -> str:
+    last = len(parts) - 1
+    return " | ".join(f"{part:<12}" if i == 0 else f"{part:>12}" if i == last else f"{part:>10}"
+                      for i, part in enumerate(parts))
+
+def render_table(header: List[str], rows: List[List[str]], fmt: str = 'text',
+                 footer: Optional[List[List[str]]] = None) -> str:
+    """
+    서식이 적용된 셀 목록을 text(콘솔 고정폭), markdown, html 표로 출력합니다.
+    footer 행은 text에서는 구분선 아래, html에서는 tfoot에 들어갑니다.
+    """
+    footer = footer or []
+    if fmt == 'text':
+        lines = [" " * 25 + TABLE_TITLE, "=" * 80, _text_row(header), "-" * 80]
+        lines.extend(_text_row(row) for row in rows)
+        if footer:
+            lines.append("-" * 80)
+            lines.extend(_text_row(row) for row in footer)
+        lines.append("=" * 80)
+        return "\n".join(lines)
+    if fmt == 'markdown':
+        cell = lambda value: str(value).replace('|', '\\|')
+        lines = ["| " + " | ".join(cell(col) for col in header) + " |",
+                 "|" + "|".join([" --- "] + [" ---: "] * (len(header) - 1)) + "|"]
+        lines.extend("| " + " | ".join(cell(value) for value in row) + " |" for row in rows + footer)
+        return "\n".join(lines)
+    if fmt == 'html':
+        def tr(values, tag):
+            return "<tr>" + "".join(f"<{tag}>{html.escape(str(value))}</{tag}>" for value in values) + "</tr>"
+        parts = ['<table class="dart-summary">', "<thead>" + tr(header, 'th') + "</thead>",
+                 "<tbody>" + "".join(tr(row, 'td') for row in rows) + "</tbody>"]
+        if footer:
+            parts.append("<tfoot>" + "".join(tr(row, 'td') for row in footer) + "</tfoot>")
+        parts.append("</table>")
+        return "\n".join(parts)
+    raise ValueError(f"지원하지 않는 표 형식입니다: {fmt} (사용 가능: {', '.join(TABLE_FORMATS)})")
+
+@instrumented('render')
+def format_display_table(df: pd.DataFrame, corp_code: str, year_month: int = None, fmt: str = 'text') -> str:
     """
     수집된 데이터를 보기 좋게 정리된 테이블 형식으로 변환합니다.
+    피벗과 이익률은 한 번에 계산하고 컬럼 단위로 서식을 적용합니다. fmt는 text(기본값), csv(숫자 그대로),
+    markdown, html 중 하나이며, df에 corp_code 컬럼으로 여러 기업이 섞여 있으면 고유번호 컬럼을 붙여 한 표로 출력합니다.
     """
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"지원하지 않는 표 형식입니다: {fmt} (사용 가능: {', '.join(TABLE_FORMATS)})")
     if df.empty:
         return "데이터가 없습니다."
 
     # 분기 정보가 있으면 분기별로 표시
     if '분기' in df.columns:
-        # 분기별 피벗 테이블 생성 (transpose 버전)
-        pivot_df = df.pivot_table(
-            index=['년도', '분기'],
-            columns='항목',
-            values='thstrm_amount',
-            aggfunc='first'
-        )
+        multi = 'corp_code' in df.columns and df['corp_code'].nunique() > 1
+        summary = quarterly_summary(df if multi or 'corp_code' not in df.columns else df.drop(columns='corp_code'))
+        if fmt == 'csv':
+            # 금액은 정수, 이익률은 표와 같은 소수점 둘째 자리로 내보냅니다
+            for col in ('매출액', '영업이익'):
+                summary[col] = summary[col].astype('float64').round().astype('Int64')
+            summary['영업이익률'] = summary['영업이익률'].round(2)
+            return summary.to_csv(index=False)
+
+        periods = summary['년도'].astype(str) + "년 " + summary['분기'].astype(str) + "분기"
+        columns = [periods.tolist(), format_amounts(summary['매출액']), format_amounts(summary['영업이익']),
+                   format_margins(summary['영업이익률']), ['원'] * len(summary)]
+        header = ['기간', '매출액', '영업이익', '영업이익률', '단위']
+        if multi:
+            columns.insert(0, summary['corp_code'].astype(str).tolist())
+            header.insert(0, '고유번호')
+        rows = [list(row) for row in zip(*columns)]
+        return render_table(header, rows, fmt)
+
+    # 분기 정보가 없으면 항목 x 보고서 표로 표시 (여러 기업이면 기업마다 항목 행과 영업이익률 행)
+    multi = 'corp_code' in df.columns and df['corp_code'].nunique() > 1
+    pivot, report_columns = annual_summary(df if multi or 'corp_code' not in df.columns else df.drop(columns='corp_code'))
+    reports = [report for report, _ in report_columns]
+    names = [name for _, name in report_columns]
+    groups = ([(code, pivot.xs(code, level='corp_code')) for code in pd.unique(pivot.index.get_level_values(0))]
+              if multi else [(None, pivot)])
+
+    def margin_of(table: pd.DataFrame) -> pd.Series:
+        if {'매출액', '영업이익'} <= set(table.index):
+            return pd.Series(operating_margin(table.loc['매출액'], table.loc['영업이익']), index=table.columns)
+        return pd.Series(np.nan, index=table.columns)
+
+    if fmt == 'csv':
+        parts = []
+        for code, table in groups:
+            part = table[reports].astype('float64').round().astype('Int64').astype(object)
+            part.loc['영업이익률'] = margin_of(table)[reports].round(2).tolist()
+            part.columns = names
+            part = part.rename_axis('항목').reset_index()
+            if multi:
+                part.insert(0, 'corp_code', code)
+            parts.append(part)
+        return pd.concat(parts, ignore_index=True).to_csv(index=False)
+
+    rows, footer = [], []
+    for code, table in groups:
+        prefix = [str(code)] if multi else []
+        formatted = [format_amounts(table[report]) for report in reports]
+        rows.extend(prefix + [item] + [column[i] for column in formatted] + ["원"] for i, item in enumerate(table.index))
+        margin_row = prefix + ['영업이익률'] + list(format_margins(margin_of(table)[reports])) + ["%"]
+        # 한 기업이면 기존처럼 영업이익률을 footer로, 여러 기업이면 기업별 행으로 둡니다
+        (rows if multi else footer).append(margin_row)
+    header = (['고유번호'] if multi else []) + ['항목'] + names + ['단위']
+    return render_table(header, rows, fmt, footer)
+
+def format_display_tables(frames: Dict[str, pd.DataFrame], year_month: int = None, fmt: str = 'text') -> str:
+    """
+    여러 기업의 수집 결과(고유번호 -> DataFrame)를 고유번호 컬럼이 붙은 하나의 표로 출력합니다.
+    """
+    collected = [df.assign(corp_code=str(code).zfill(8)) for code, df in frames.items() if not df.empty]
+    if not collected:
+        return "데이터가 없습니다."
+    return format_display_table(pd.concat(collected, ignore_index=True), None, year_month, fmt)
 
-        # 분기 순서대로 정렬 (과거 분기부터 최신 순)
-        unique_years_quarters = sorted(df[['년도', '분기']].drop_duplicates().values.tolist(),
-                                     key=lambda x: (x[0], x[1]), reverse=False)
+def table_format_for(path: str) -> str:
+    """
+    출력 파일 확장자로 표 형식을 고릅니다 (.csv, .md, .html/.htm, 그 외에는 text).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    return {'.csv': 'csv', '.md': 'markdown', '.html': 'html', '.htm': 'html'}.get(ext, 'text')
 
-        # 헤더 및 테이블 생성
-        lines = []
-        lines.append(" " * 25 + "📋 [재무 정보 요약 테이블]")
-        lines.append("=" * 80)
+# Parquet 데이터셋 경로 (설정 시 대화형 조회 결과도 데이터셋에 추가) / 엑셀 저장 여부
+PARQUET_DATASET_DIR = os.getenv("DART_PARQUET_DIR", "")
+SAVE_EXCEL = os.getenv("DART_SAVE_EXCEL", "1") != "0"
 
-        # 헤더 생성 (동적 컬럼 수)
-        header_parts = ['기간']
-        for item in ['매출액', '영업이익', '영업이익률']:
-            header_parts.append(item)
-        header_parts.append('단위')
-
-        header = " | ".join([f"{header_parts[0]:<12}" if i == 0 else
-                             f"{col:>12}" if i == len(header_parts)-1 else
-                             f"{col:>10}" for i, col in enumerate(header_parts)])
-        lines.append(header)
-        lines.append("-" * 80)
-
-        # 데이터 행 생성
-        for year, quarter in unique_years_quarters:
-            period_name = f"{year}년 {quarter}분기"
-            row_parts = [f"{period_name:<12}"]
-
-            # 매출액
-            rev = pivot_df.loc[(year, quarter), '매출액'] if (year, quarter) in pivot_df.index and '매출액' in pivot_df.columns else None
-            if pd.isna(rev) or rev is None:
-                row_parts.append("-")
-            elif rev == 0:
-                row_parts.append("0")
-            else:
-                row_parts.append(f"{int(rev):,}")
-
-            # 영업이익
-            op = pivot_df.loc[(year, quarter), '영업이익'] if (year, quarter) in pivot_df.index and '영업이익' in pivot_df.columns else None
-            if pd.isna(op) or op is None:
-                row_parts.append("-")
-            elif op == 0:
-                row_parts.append("0")
-            else:
-                row_parts.append(f"{int(op):,}")
+# Parquet 저장 시 범주형으로 저장할 컬럼
+PARQUET_CATEGORY_COLS = ['보고서명', '구분', '항목']
 
-            # 영업이익률 계산
-            if pd.notna(rev) and pd.notna(op) and rev != 0:
-                margin = (op / rev) * 100
-                row_parts.append(f"{margin:.2f}")
-            else:
-                row_parts.append("-")
+def to_parquet_frame(df: pd.DataFrame, corp_code: str) -> pd.DataFrame:
+    """
+    수집 결과를 분석용 타입으로 변환합니다: 금액은 int64(결측 허용), 보고서명/구분/항목은 범주형.
+    """
+    out = df.copy()
+    # fetch_errors 등 수집 메타데이터는 Parquet 스키마에 담지 않습니다
+    out.attrs = {}
+    if 'corp_code' not in out.columns:
+        out.insert(0, 'corp_code', str(corp_code).zfill(8))
+    out['thstrm_amount'] = pd.to_numeric(out['thstrm_amount'], errors='coerce').round().astype('Int64')
+    out['년도'] = out['년도'].astype('int64')
+    out['분기'] = out['분기'].astype('int64')
+    for col in PARQUET_CATEGORY_COLS:
+        if col in out.columns:
+            out[col] = out[col].astype('category')
+    return out
+
+_parquet_lock = threading.Lock()
+
+@instrumented('parquet_export')
+def export_parquet(df: pd.DataFrame, corp_code: str, dataset_dir: str) -> bool:
+    """
+    수집 결과를 년도/분기로 파티션된 Parquet 데이터셋(dataset_dir)에 추가합니다 (pyarrow 필요).
+    파티션마다 기업별 파일({고유번호}-0.parquet)을 쓰므로 같은 기업을 다시 수집하면 해당 파일만 교체됩니다.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("⚠️ Parquet 저장에는 pyarrow가 필요합니다: pip install pyarrow")
+        return False
 
-            row_parts.append("원")
-            row_str = " | ".join([f"{row_parts[0]:<12}" if i == 0 else
-                                 f"{val:>12}" if i == len(row_parts)-1 else
-                                 f"{val:>10}" for i, val in enumerate(row_parts)])
-            lines.append(row_str)
+    if df.empty:
+        return False
 
-        lines.append("=" * 80)
+    corp_code = str(corp_code).zfill(8)
+    table = pa.Table.from_pandas(to_parquet_frame(df, corp_code), preserve_index=False)
+    with _parquet_lock:
+        pq.write_to_dataset(table, root_path=dataset_dir, partition_cols=['년도', '분기'],
+                            basename_template=f"{corp_code}-{{i}}.parquet",
+                            existing_data_behavior='overwrite_or_ignore')
+    return True
+
+def read_parquet_dataset(dataset_dir: str, corp_codes: Optional[List[str]] = None,
+                         years: Optional[List[int]] = None) -> pd.DataFrame:
+    """
+    export_parquet으로 쌓은 데이터셋을 읽습니다. 기업/연도 조건은 파티션·행 그룹 필터로 전달되어 필요한 파일만 읽습니다.
+    """
+    filters = []
+    if corp_codes:
+        filters.append(('corp_code', 'in', [str(code).zfill(8) for code in corp_codes]))
+    if years:
+        filters.append(('년도', 'in', [int(y) for y in years]))
+    df = pd.read_parquet(dataset_dir, engine='pyarrow', filters=filters or None)
+    # 파티션 컬럼은 범주형으로 읽히므로 정수로 되돌립니다
+    for col in ('년도', '분기'):
+        df[col] = df[col].astype('int64')
+    return df
 
-        return "\n".join(lines)
+# ==========================================
+# 3. 배치 수집 (관심종목 일괄 처리)
+# ==========================================
+
+def parse_period_input(year_input: str) -> Optional[Tuple[int, int]]:
+    """
+    조회 기간 입력(빈 값, YYYY, YYYYMM)을 (대상 연도, YYYYMM)으로 변환합니다.
+    형식이 맞지 않으면 None을, 숫자가 아니면 ValueError를 발생시킵니다.
+    """
+    if not year_input:
+        return 2024, 202412  # 기본값을 202412로 설정
+    elif len(year_input) == 4:  # 4자리 연도
+        return int(year_input), int(year_input) * 100 + 12  # YYYY를 YYYY12로 변환
+    elif len(year_input) == 6:  # 6자리 YYYYMM
+        year_month = int(year_input)
+        return year_month // 100, year_month
+    return None
+
+def read_batch_targets(targets: List[str], target_file: Optional[str] = None) -> List[str]:
+    """
+    명령행 인자와 파일(한 줄에 하나, '#' 이후는 주석)에서 회사명/고유번호 목록을 읽습니다.
+    중복은 처음 나온 순서대로 한 번만 남깁니다.
+    """
+    items = [t.strip() for t in targets]
+    if target_file:
+        with open(target_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                items.append(line.split('#', 1)[0].strip())
+    return list(dict.fromkeys(item for item in items if item))
+
+def resolve_corp_code(api_key: str, target: str) -> Optional[str]:
+    """
+    8자리 숫자는 고유번호로 그대로 사용하고, 그 외에는 회사명으로 검색합니다.
+    """
+    if len(target) == 8 and target.isdigit():
+        return target
+    return search_company_code(api_key, target)
 
+def resolve_target(api_key: str, target: str) -> Dict[str, object]:
+    """
+    resolve_corp_code와 같은 규칙으로 회사를 찾되 출력 없이 match_company 결과를 반환합니다 (배치 작업자용).
+    8자리 숫자는 고유번호로 그대로 사용합니다.
+    """
+    if len(target) == 8 and target.isdigit():
+        return {'query': target, 'match': 'exact', 'corp_code': target, 'corp_name': None,
+                'candidates': [], 'total': 1}
+    return match_company(api_key, target, verbose=False)
+
+def lookup_company(api_key: Optional[str], query: str, limit: int = 5) -> Dict[str, object]:
+    """
+    비대화형 조회(dart_cli.py lookup, 조회 데몬)용 회사명 검색입니다. 출력 없이 match_company 결과를
+    JSON으로 보낼 수 있는 딕셔너리로 반환하며, 후보는 corp_code/corp_name/stock_code/modify_date 딕셔너리입니다.
+    고유번호 색인만 사용하므로 pandas를 import하지 않습니다 (캐시 파일이 있으면 API 키 없이도 동작).
+    """
+    query = query.strip()
+    result = match_company(api_key or "", query, limit, verbose=False)
+    if result['match'] == 'unavailable' and len(query) == 8 and query.isdigit():
+        result.update(match='exact', corp_code=query, total=1)
+    result['candidates'] = [dict(zip(CORP_RECORD_FIELDS, record)) for record in result['candidates']]
+    return result
+
+def fetch_company(api_key: str, target: str, period: str = "", fmt: str = 'text',
+                  accounts: Optional[Iterable[str]] = None) -> Dict[str, object]:
+    """
+    비대화형 수집(dart_cli.py fetch, 조회 데몬)용으로 회사 검색과 분기 재무제표 수집을 로그 없이 실행합니다.
+    fmt가 TABLE_FORMATS 중 하나이면 table에 요약 표 문자열을, 'json'이면 records에 수집 행을 담습니다.
+    회사를 하나로 정하지 못하면 search 결과만 담아 반환하며, 기간 형식이 잘못되면 ValueError를 발생시킵니다.
+    """
+    if fmt != 'json' and fmt not in TABLE_FORMATS:
+        raise ValueError(f"알 수 없는 출력 형식: {fmt} (사용 가능: {', '.join(TABLE_FORMATS + ('json',))})")
+    parsed = parse_period_input(period.strip())
+    if parsed is None:
+        raise ValueError("기간은 4자리 연도 또는 6자리 YYYYMM 형식으로 입력해주세요.")
+    target_year, year_month = parsed
+    accounts = list(accounts) if accounts else DEFAULT_ACCOUNTS
+
+    found = lookup_company(api_key, target)
+    result = {'search': found, 'corp_code': found['corp_code'], 'year': target_year, 'year_month': year_month,
+              'table': None, 'records': None, 'fetch_errors': [], 'empty': True}
+    if found['corp_code'] is None:
+        return result
+
+    df = collect_quarterly_financials(api_key, found['corp_code'], target_year, year_month,
+                                      verbose=False, accounts=accounts)
+    result['fetch_errors'] = [list(error) for error in df.attrs.get('fetch_errors', [])]
+    result['empty'] = df.empty
+    if df.empty:
+        return result
+    if fmt == 'json':
+        result['records'] = json.loads(df.to_json(orient='records', force_ascii=False))
     else:
-        # 기존 연도별 표시 (변경 없음)
-        pivot_df = df.pivot_table(
-            index='항목',
-            columns='보고서명',
-            values='thstrm_amount',
-            aggfunc='first'
+        result['table'] = format_display_table(df, found['corp_code'], year_month, fmt)
+    return result
+
+# 배치 작업 기록(SQLite) 경로 (빈 문자열이면 기록하지 않음)
+BATCH_JOURNAL_FILE = os.getenv("DART_BATCH_JOURNAL", "")
+
+# 다시 실행할 때 건너뛰는 기업 상태 (일부 실패/실패한 기업은 실패한 보고서만 다시 요청)
+JOURNAL_DONE_STATUSES = ('ok', 'empty', 'not_found')
+
+def batch_job_id(targets: List[str], params: dict) -> str:
+    """
+    대상 목록과 수집 조건이 같으면 같은 작업 ID를 만들어, 같은 명령을 다시 실행하면 이어서 진행되게 합니다.
+    """
+    payload = json.dumps({'targets': targets, **params}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+class BatchJournal:
+    """
+    배치 작업(job_id) 하나의 진행 상황을 SQLite에 기록합니다.
+    보고서 단위(고유번호, 사업연도, 분기, 구분)로 결과(data/no_data/error)와 주요 계정 행을, 기업 단위로 최종 상태와
+    결과 DataFrame을 남겨 중단된 작업을 다시 실행하면 끝난 기업은 요청 없이 결과를 다시 쓰고 실패한 보고서만 다시 요청합니다.
+    """
+
+    def __init__(self, path: str, job_id: str, params: Optional[dict] = None):
+        self.path = path
+        self.job_id = job_id
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, params TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS units ("
+            " job_id TEXT NOT NULL, corp_code TEXT NOT NULL, year INTEGER NOT NULL, quarter INTEGER NOT NULL,"
+            " fs_div TEXT NOT NULL, outcome TEXT NOT NULL, rows BLOB, error TEXT, attempts INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL, PRIMARY KEY (job_id, corp_code, year, quarter, fs_div))"
         )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS companies ("
+            " job_id TEXT NOT NULL, target TEXT NOT NULL, corp_code TEXT, status TEXT NOT NULL,"
+            " rows INTEGER NOT NULL, errors INTEGER NOT NULL, frame BLOB, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (job_id, target))"
+        )
+        now = time.time()
+        self._conn.execute("INSERT OR IGNORE INTO jobs VALUES (?, ?, ?, ?)",
+                           (job_id, json.dumps(params or {}, ensure_ascii=False), now, now))
+        self._conn.commit()
+
+    def reset(self) -> None:
+        """
+        이 작업의 기록을 모두 지우고 처음부터 다시 시작합니다.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM units WHERE job_id = ?", (self.job_id,))
+            self._conn.execute("DELETE FROM companies WHERE job_id = ?", (self.job_id,))
+            self._conn.commit()
+
+    def lookup(self, corp_code: str, units: List[Tuple[int, int, str]]) -> Dict[Tuple[int, int, str], Optional[List[dict]]]:
+        """
+        units 중 이미 결과가 확인된 단위의 주요 계정 행을 반환합니다 (None이면 '데이터 없음'). 실패로 기록된 단위는 빠집니다.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT year, quarter, fs_div, outcome, rows FROM units"
+                " WHERE job_id = ? AND corp_code = ? AND outcome != 'error'", (self.job_id, corp_code)
+            ).fetchall()
+        requested = set(units)
+        return {(year, quarter, fs_div): (json.loads(zlib.decompress(blob)) if outcome == 'data' else None)
+                for year, quarter, fs_div, outcome, blob in rows if (year, quarter, fs_div) in requested}
+
+    def record(self, corp_code: str, unit: Tuple[int, int, str], rows: Optional[List[dict]],
+               error: Optional[str] = None) -> None:
+        """
+        한 보고서 단위의 결과를 기록합니다. error가 있으면 실패로, rows가 None이면 '데이터 없음'으로 기록합니다.
+        """
+        outcome = 'error' if error else 'no_data' if rows is None else 'data'
+        blob = zlib.compress(json.dumps(rows, ensure_ascii=False).encode('utf-8')) if outcome == 'data' else None
+        year, quarter, fs_div = unit
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO units VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)"
+                " ON CONFLICT (job_id, corp_code, year, quarter, fs_div) DO UPDATE SET"
+                " outcome = excluded.outcome, rows = excluded.rows, error = excluded.error,"
+                " attempts = attempts + 1, updated_at = excluded.updated_at",
+                (self.job_id, corp_code, int(year), quarter, fs_div, outcome, blob, error, time.time())
+            )
+            self._conn.commit()
+
+    def finish_company(self, target: str, corp_code: Optional[str], status: str,
+                       df: Optional[pd.DataFrame] = None) -> None:
+        """
+        기업 하나의 처리 결과(ok/partial/empty/failed/not_found)와 결과 DataFrame을 기록합니다.
+        """
+        rows = 0 if df is None else len(df)
+        errors = 0 if df is None else len(df.attrs.get('fetch_errors', []))
+        frame = zlib.compress(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)) if rows else None
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (self.job_id, target, corp_code, status, rows, errors, frame, now))
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE job_id = ?", (now, self.job_id))
+            self._conn.commit()
+
+    def completed(self) -> Dict[str, Tuple[Optional[str], str, Optional[pd.DataFrame]]]:
+        """
+        다시 실행할 때 건너뛸 기업: 대상 -> (고유번호, 상태, 기록된 결과 DataFrame 또는 None).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT target, corp_code, status, frame FROM companies WHERE job_id = ?"
+                f" AND status IN ({','.join('?' * len(JOURNAL_DONE_STATUSES))})",
+                (self.job_id, *JOURNAL_DONE_STATUSES)
+            ).fetchall()
+        return {target: (corp_code, status, pickle.loads(zlib.decompress(frame)) if frame else None)
+                for target, corp_code, status, frame in rows}
+
+    def progress(self) -> Dict[str, int]:
+        """
+        기록된 보고서 단위 수(결과별)를 반환합니다.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT outcome, COUNT(*) FROM units WHERE job_id = ? GROUP BY outcome",
+                                      (self.job_id,)).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class BatchResultWriter:
+    """
+    여러 기업의 수집 결과를 하나의 파일(CSV 또는 .jsonl)에 완료되는 순서대로 이어서 기록합니다.
+    """
 
-        # 보고서 순서대로 정렬
-        report_order = ['사업보고서', '1분기보고서', '반기보고서', '3분기보고서']
-        pivot_df = pivot_df.reindex(columns=report_order, fill_value=None)
-
-        # 연결 데이터优先 처리
-        if '구분' in df.columns:
-            for item in pivot_df.index:
-                item_data = df[df['항목'] == item]
-                if not item_data.empty:
-                    cfs_data = item_data[item_data['구분'] == '연결']
-                    if not cfs_data.empty:
-                        for report in report_order:
-                            val = cfs_data[cfs_data['보고서명'] == report]['thstrm_amount'].values
-                            if len(val) > 0:
-                                pivot_df.loc[item, report] = val[0]
-
-        def format_cell(x):
-            if pd.isna(x) or x is None:
-                return "-"
-            elif x == 0:
-                return "0"
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.jsonl = output_file.endswith('.jsonl')
+        self._lock = threading.Lock()
+        self._header_written = False
+        # CSV는 엑셀에서 한글이 깨지지 않도록 BOM을 붙입니다
+        self._file = open(output_file, 'w', encoding='utf-8' if self.jsonl else 'utf-8-sig', newline='')
+
+    def write(self, target: str, corp_code: str, df: pd.DataFrame) -> None:
+        out = df.copy()
+        out.insert(0, '입력값', target)
+        out.insert(0, 'corp_code', corp_code)
+        with self._lock:
+            if self.jsonl:
+                out.to_json(self._file, orient='records', lines=True, force_ascii=False)
             else:
-                return f"{int(x):,}"
+                out.to_csv(self._file, index=False, header=not self._header_written)
+                self._header_written = True
+            self._file.flush()
 
-        formatted_df = pivot_df.map(format_cell)
+    def close(self) -> None:
+        self._file.close()
 
-        lines = []
-        lines.append(" " * 25 + "📋 [재무 정보 요약 테이블]")
-        lines.append("=" * 80)
+def batch_status(corp_code: Optional[str], df: Optional[pd.DataFrame]) -> str:
+    """
+    배치에서 기업 하나의 처리 결과를 분류합니다: ok/partial/empty/failed/not_found.
+    """
+    if corp_code is None:
+        return 'not_found'
+    errors = df.attrs.get('fetch_errors', []) if df is not None else []
+    if df is None or (errors and df.empty):
+        return 'failed'
+    if errors:
+        return 'partial'
+    return 'empty' if df.empty else 'ok'
+
+def run_batch(api_key: str, targets: List[str], year: int, year_month: int = None,
+              output_file: Optional[str] = "batch_재무정보.csv", company_workers: int = 4,
+              fetch_workers: Optional[int] = None, parquet_dir: Optional[str] = None,
+              backend: str = 'single', accounts: Optional[List[str]] = None,
+              incremental: bool = False, priority: str = PRIORITY_BACKGROUND,
+              table_file: Optional[str] = None, journal_file: Optional[str] = None,
+              job_id: Optional[str] = None, restart: bool = False) -> Dict[str, object]:
+    """
+    여러 기업의 재무데이터를 한 번에 수집하여 하나의 파일로 저장합니다.
+    기업 단위 작업 풀과 요청 단위 공유 풀을 분리해 사용하며, 모든 요청은 전역 요청 한도(rate_limiter)를 따릅니다.
+    parquet_dir을 주면 결과를 년도/분기 파티션 Parquet 데이터셋에도 추가하며, output_file이 None이면 파일 출력을 생략합니다.
+    backend='multi'이면 기업을 100개씩 묶어 다중회사 주요계정 API로 수집합니다 (빠진 계정만 전체 재무제표로 대체).
+    accounts로 수집 항목을 고를 수 있으며(single 전용), 다중회사 API는 매출액/영업이익만 제공합니다.
+    incremental=True이면 계정 시계열 저장소를 기준으로 새 보고기간과 확정되지 않은 보고기간만 요청하며(single 전용),
+    parquet_dir에 이전 결과가 있으면 변경된 연도만 다시 계산해 합칩니다.
+    요청은 기본적으로 background 우선순위로 보내므로 동시에 들어오는 대화형 조회에 토큰을 양보합니다.
+    table_file을 주면 모든 기업의 요약 테이블을 확장자(.csv/.md/.html, 그 외 text)에 맞는 형식으로 한 파일에 저장합니다.
+    journal_file을 주면 진행 상황을 작업 기록(BatchJournal)에 남깁니다. 같은 작업(job_id, 기본값은 대상·조건으로 만든 ID)을
+    다시 실행하면 끝난 기업은 기록된 결과를 요청 없이 결과 파일/테이블에 다시 쓰고, 나머지 기업은 실패했거나 아직 받지 않은
+    보고서만 요청합니다 (restart=True이면 처음부터).
+    """
+    if backend == 'multi' and accounts is not None:
+        raise ValueError("다중회사 주요계정 API(backend='multi')는 매출액/영업이익만 수집할 수 있습니다.")
+    if backend == 'multi' and incremental:
+        raise ValueError("증분 수집은 backend='single'에서만 사용할 수 있습니다.")
+    if fetch_workers is None:
+        fetch_workers = DEFAULT_FETCH_WORKERS
+
+    # 고유번호 인덱스를 미리 로드해 작업자들이 동시에 로드하지 않도록 합니다
+    if not get_company_codes(api_key):
+        return {'total': len(targets), 'ok': 0, 'partial': 0, 'empty': 0, 'failed': len(targets), 'resumed': 0,
+                'unresolved': {}}
+    # 오래된 캐시는 회사명을 해석하기 전에 DART 원본과 대조합니다 (실패하면 기존 캐시로 계속 진행)
+    if not is_corp_index_fresh():
+        try:
+            refresh_corp_codes(api_key)
+        except (DartApiError, DartQuotaExceeded) as e:
+            print(f"⚠️ 고유번호 갱신 실패 (기존 캐시로 계속 진행): {e}")
+
+    # unresolved: 회사를 하나로 정하지 못한 입력 -> 'ambiguous' 또는 'not_found' (실패로 셈)
+    summary = {'total': len(targets), 'ok': 0, 'partial': 0, 'empty': 0, 'failed': 0, 'resumed': 0, 'unresolved': {}}
+    started = time.monotonic()
+
+    journal = None
+    completed: Dict[str, Tuple[Optional[str], str, Optional[pd.DataFrame]]] = {}
+    if journal_file:
+        params = {'year': year, 'year_month': year_month, 'backend': backend, 'accounts': accounts}
+        journal = BatchJournal(journal_file, job_id or batch_job_id(targets, params), params)
+        if restart:
+            journal.reset()
+        completed = {target: entry for target, entry in journal.completed().items() if target in set(targets)}
+        summary['resumed'] = len(completed)
+    resuming = bool(completed) or bool(journal and journal.progress())
+    pending_targets = [target for target in targets if target not in completed]
+
+    writer = BatchResultWriter(output_file) if output_file else None
+    fetch_pool = ThreadPoolExecutor(max_workers=max(1, fetch_workers))
+    collect_options = CollectOptions(executor=fetch_pool, verbose=False, accounts=accounts,
+                                     incremental=incremental, journal=journal)
+
+    # 요약 테이블용 결과: 고유번호 -> (입력 순서, DataFrame)
+    positions = {target: i for i, target in enumerate(targets)}
+    tables: Dict[str, Tuple[int, pd.DataFrame]] = {}
+
+    def save(target: str, corp_code: str, df: pd.DataFrame, export: bool = True) -> None:
+        if not df.empty:
+            if table_file:
+                tables[corp_code] = (positions[target], df)
+            if writer:
+                writer.write(target, corp_code, df)
+            if parquet_dir and export:
+                export_parquet(df, corp_code, parquet_dir)
+
+    def previous_frame(corp_code: str) -> Optional[pd.DataFrame]:
+        if not (incremental and parquet_dir and os.path.isdir(parquet_dir)):
+            return None
+        try:
+            return read_parquet_dataset(parquet_dir, corp_codes=[corp_code])
+        except Exception:
+            # 아직 이 기업의 파일이 없거나 읽을 수 없으면 저장소 값으로 다시 계산합니다
+            return None
 
-        # 컬럼명에 연월 정보 추가
-        # 보고서별로 연월 정보를 추출하여 컬럼명에 추가
-        report_columns = {}
-        for report in report_order:
-            report_data = df[df['보고서명'] == report]
-            if not report_data.empty:
-                # 가장 최근 연도를 사용
-                latest_year = report_data['년도'].max()
-                # 보고서 유형에 따라 월 결정
-                if report == '사업보고서':
-                    month = 12
-                elif report == '1분기보고서':
-                    month = 3
-                elif report == '반기보고서':
-                    month = 6
-                elif report == '3분기보고서':
-                    month = 9
-                else:
-                    month = 12
-                # 컬럼명을 연월(YYYYMM) 기준으로만 표시
-                report_columns[report] = f"{latest_year}{month:02d}"
-            else:
-                report_columns[report] = report
-
-        # 과거->최신 순으로 컬럼 순서 재배치
-        # 연월(YYYYMM) 기준으로 정렬
-        sorted_columns = sorted(report_columns.items(), key=lambda x: int(x[1]))
-
-        # 헤더 생성
-        header_parts = ['항목']
-        for report, col_name in sorted_columns:
-            header_parts.append(col_name)
-        header_parts.append('단위')
-
-        header = " | ".join([f"{header_parts[0]:<12}" if i == 0 else
-                             f"{col:>12}" if i == len(header_parts)-1 else
-                             f"{col:>10}" for i, col in enumerate(header_parts)])
-        lines.append(header)
-        lines.append("-" * 80)
-
-        # 데이터 행 생성
-        for item in formatted_df.index:
-            row_parts = [f"{item:<12}"]
-            row = formatted_df.loc[item]
-
-            for report, col_name in sorted_columns:
-                val = row.get(report, None)
-                if pd.isna(val) or val is None:
-                    row_parts.append("-")
-                elif val == 0:
-                    row_parts.append("0")
-                else:
-                    row_parts.append(f"{int(str(val).replace(',', '')):,}")
+    def process(job: List[str]) -> List[Tuple[str, Optional[str], Optional[pd.DataFrame], Dict[str, object]]]:
+        with request_priority(priority):
+            return process_job(job)
+
+    def process_job(job: List[str]) -> List[Tuple[str, Optional[str], Optional[pd.DataFrame], Dict[str, object]]]:
+        # 작업자 스레드에서는 검색 로그·후보 목록을 출력하지 않고, 찾지 못한 입력은 결과로 돌려 요약에 남깁니다
+        matches = {target: resolve_target(api_key, target) for target in job}
+        resolved = [(target, matches[target]['corp_code']) for target in job]
+        if backend == 'multi':
+            codes = [corp_code for _, corp_code in resolved if corp_code]
+            frames = collect_key_accounts_multi(api_key, codes, year, year_month,
+                                                executor=fetch_pool, verbose=False) if codes else {}
+        else:
+            frames = {corp_code: collect_quarterly_financials(api_key, corp_code, year, year_month, collect_options,
+                                                              previous=previous_frame(corp_code))
+                      for _, corp_code in resolved if corp_code}
+
+        results = []
+        for target, corp_code in resolved:
+            df = frames.get(corp_code) if corp_code else None
+            if df is not None:
+                save(target, corp_code, df)
+            if journal:
+                journal.finish_company(target, corp_code, batch_status(corp_code, df), df)
+            results.append((target, corp_code, df, matches[target]))
+        return results
+
+    # 단일 기업 API는 기업 하나가, 다중회사 API는 기업 100개 묶음이 작업 단위입니다
+    if backend == 'multi':
+        jobs = [pending_targets[i:i + MULTI_ACCOUNT_CHUNK]
+                for i in range(0, len(pending_targets), MULTI_ACCOUNT_CHUNK)]
+    else:
+        jobs = [[target] for target in pending_targets]
+
+    destinations = [d for d in (output_file, parquet_dir, table_file) if d]
+    print(f"\n📦 배치 수집 시작: {len(targets)}개 기업 → {', '.join(destinations) or '(저장 안 함)'}")
+    if journal and resuming:
+        progress = journal.progress()
+        print(f"♻️ 작업 {journal.job_id} 이어서 진행: 완료된 기업 {len(completed)}개 건너뜀, "
+              f"확인된 보고서 {progress.get('data', 0) + progress.get('no_data', 0)}건 재사용, "
+              f"실패한 보고서 {progress.get('error', 0)}건 재요청")
+        # 결과 파일은 매번 새로 쓰므로 끝난 기업의 결과를 먼저 씁니다 (Parquet 데이터셋에는 이미 있음)
+        for target in targets:
+            if target in completed and completed[target][2] is not None:
+                save(target, completed[target][0], completed[target][2], export=False)
+    remaining = rate_limiter.remaining_today
+    if backend == 'single' and remaining is not None:
+        # 저장소/응답 캐시 적중은 빼지 않은 최대 예상치입니다
+        planned = len(pending_targets) * len(build_collection_plan(year, year_month))
+        if journal:
+            progress = journal.progress()
+            planned -= progress.get('data', 0) + progress.get('no_data', 0)
+        if planned > remaining:
+            print(f"⚠️ 남은 작업의 예상 요청(최대 {planned}건)이 오늘 남은 한도({remaining}건)보다 많습니다. "
+                  f"한도에 도달하면 중단합니다{' (다시 실행하면 이어서 진행)' if journal else ''}.")
+    done = summary['resumed']
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, company_workers)) as company_pool:
+            futures = {company_pool.submit(process, job): job for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except DartQuotaExceeded as e:
+                    print(f"⛔ {e} 남은 작업을 중단합니다.")
+                    if journal:
+                        print(f"   진행 상황은 작업 기록({journal.path}, 작업 ID {journal.job_id})에 남았습니다. "
+                              f"같은 명령을 다시 실행하면 이어서 진행합니다.")
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                except Exception as e:
+                    job = futures[future]
+                    done += len(job)
+                    summary['failed'] += len(job)
+                    if journal:
+                        for target in job:
+                            journal.finish_company(target, None, 'failed')
+                    print(f"  ❌ [{done}/{len(targets)}] {', '.join(job[:3])}{' ...' if len(job) > 3 else ''} 처리 중 오류: {e}")
+                    continue
+
+                for target, corp_code, df, match in results:
+                    done += 1
+                    errors = df.attrs.get('fetch_errors', []) if df is not None else []
+                    if corp_code is None:
+                        summary['failed'] += 1
+                        summary['unresolved'][target] = match['match']
+                        if match['match'] == 'ambiguous':
+                            print(f"  ❌ [{done}/{len(targets)}] {target} - 후보가 {match['total']}개라 회사를 정할 수 없음 "
+                                  f"(정확한 회사명이나 종목코드/고유번호로 입력하세요)")
+                        else:
+                            print(f"  ❌ [{done}/{len(targets)}] {target} - 회사를 찾을 수 없음")
+                    elif errors and df.empty:
+                        summary['failed'] += 1
+                        print(f"  ⚠️ [{done}/{len(targets)}] {target} ({corp_code}) - 요청 실패 {len(errors)}건: {errors[0][3]}")
+                    elif errors:
+                        summary['partial'] += 1
+                        print(f"  ⚠️ [{done}/{len(targets)}] {target} ({corp_code}) - {len(df)}행 (요청 실패 {len(errors)}건)")
+                    elif df.empty:
+                        summary['empty'] += 1
+                        print(f"  ❌ [{done}/{len(targets)}] {target} ({corp_code}) - 데이터 없음")
+                    else:
+                        summary['ok'] += 1
+                        print(f"  ✅ [{done}/{len(targets)}] {target} ({corp_code}) - {len(df)}행")
+    finally:
+        fetch_pool.shutdown()
+        if writer:
+            writer.close()
+        if table_file:
+            # 입력 순서대로 기업을 정렬해 한 표로 저장합니다
+            ordered = {code: df for code, (_, df) in sorted(tables.items(), key=lambda entry: entry[1][0])}
+            with open(table_file, 'w', encoding='utf-8') as f:
+                f.write(format_display_tables(ordered, year_month, table_format_for(table_file)))
+        if journal:
+            journal.close()
+
+    elapsed = time.monotonic() - started
+    remaining = rate_limiter.remaining_today
+    resumed_note = f"/ 이전 실행 완료 {summary['resumed']} " if summary['resumed'] else ''
+    print(f"\n📊 배치 완료: 성공 {summary['ok']} / 일부 실패 {summary['partial']} / 데이터 없음 {summary['empty']} "
+          f"/ 실패 {summary['failed']} {resumed_note}"
+          f"(총 {summary['total']}개, {elapsed:.1f}초)")
+    if summary['unresolved']:
+        labels = {'ambiguous': '후보 여러 개', 'not_found': '없음'}
+        print("   회사를 정하지 못한 입력: " + ", ".join(f"{target}({labels.get(reason, reason)})"
+                                                  for target, reason in summary['unresolved'].items()))
+    if remaining is not None:
+        print(f"   오늘 남은 요청 한도: {remaining}건")
+    print(f"⏱️ 단계별 소요: {metrics.format_stages()}")
+    if destinations:
+        print(f"💾 결과 저장 완료: {', '.join(destinations)}")
+    return summary
 
-            row_parts.append("원")
-            row_str = " | ".join([f"{row_parts[0]:<12}" if i == 0 else
-                                 f"{val:>12}" if i == len(row_parts)-1 else
-                                 f"{val:>10}" for i, val in enumerate(row_parts)])
-            lines.append(row_str)
+# ==========================================
+# 4. 메인 실행 블록
+# ==========================================
 
-        lines.append("-" * 80)
+def batch_main(argv: List[str]) -> None:
+    """
+    배치 모드 실행 함수: 명령행 인자나 파일로 받은 여러 기업을 한 번에 수집합니다.
+    """
+    global TIMESERIES_DB_FILE, SCREENING_DB_FILE
+    parser = argparse.ArgumentParser(prog="dart_api_test.py batch",
+                                     description="여러 기업의 분기별 재무정보를 한 번에 수집합니다.")
+    parser.add_argument('targets', nargs='*', help="회사명 또는 8자리 고유번호")
+    parser.add_argument('-f', '--file', help="회사명/고유번호 목록 파일 (한 줄에 하나)")
+    parser.add_argument('-p', '--period', default="", help="조회 연도(YYYY) 또는 YYYYMM (기본값: 2024)")
+    parser.add_argument('-o', '--output', default="batch_재무정보.csv", help="결과 파일 (.csv 또는 .jsonl, 빈 값이면 생략)")
+    parser.add_argument('--parquet', default=PARQUET_DATASET_DIR or None,
+                        help="결과를 추가할 Parquet 데이터셋 디렉터리 (년도/분기 파티션)")
+    parser.add_argument('--table', help="모든 기업의 요약 테이블을 저장할 파일 (.csv, .md, .html, 그 외에는 text)")
+    parser.add_argument('--workers', type=int, default=4, help="동시에 처리할 기업 수")
+    parser.add_argument('--fetch-workers', type=int, default=None, help="공유 요청 스레드 수")
+    parser.add_argument('--backend', choices=['single', 'multi'], default='single',
+                        help="single: 기업별 전체 재무제표, multi: 다중회사 주요계정 API로 100개 기업씩 수집")
+    parser.add_argument('--accounts', default=','.join(DEFAULT_ACCOUNTS or []),
+                        help=f"수집 항목 (쉼표 구분, 기본값: 매출액,영업이익). 사용 가능: {','.join(ACCOUNT_SPECS)}")
+    parser.add_argument('--store', default=TIMESERIES_DB_FILE or None,
+                        help="계정 시계열 저장소(SQLite) 경로. 이미 확인한 보고서는 다시 요청하지 않습니다")
+    parser.add_argument('--index', default=SCREENING_DB_FILE or None,
+                        help="스크리닝 인덱스(SQLite) 경로. 수집한 기업의 파생 지표를 갱신합니다 (dart_analytics.py screen으로 조회)")
+    parser.add_argument('--priority', choices=[PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE], default=PRIORITY_BACKGROUND,
+                        help="요청 우선순위 (기본값 background: 대화형 조회에 양보하고 DART_INTERACTIVE_RESERVE만큼 남김)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="저장소 기준 새 보고기간과 확정되지 않은 보고기간만 요청 (--store 필요, single 전용)")
+    parser.add_argument('--journal', default=BATCH_JOURNAL_FILE or None,
+                        help="작업 기록(SQLite) 경로. 중단된 같은 작업을 다시 실행하면 끝난 기업·보고서를 건너뜁니다")
+    parser.add_argument('--job', help="작업 ID (기본값: 대상 기업과 조회 조건으로 만든 ID)")
+    parser.add_argument('--restart', action='store_true', help="작업 기록을 지우고 처음부터 다시 수집 (--journal 필요)")
+    parser.add_argument('--metrics', default=METRICS_FILE or None,
+                        help="실행 계측 결과 파일 (.prom이면 Prometheus 텍스트, 그 외에는 JSON)")
+    args = parser.parse_args(argv)
 
-        # 영업이익률 행 추가 (분기별 계산)
-        margin_parts = ['영업이익률']
-        for report, col_name in sorted_columns:
-            try:
-                rev = pivot_df.loc['매출액', report]
-                op = pivot_df.loc['영업이익', report]
-                if pd.notna(rev) and pd.notna(op) and rev != 0:
-                    margin = (op / rev) * 100
-                    margin_parts.append(f"{margin:.2f}")
-                else:
-                    margin_parts.append("-")
-            except KeyError:
-                margin_parts.append("-")
+    load_dotenv()
+    api_key = os.getenv("DART_API_KEY")
+    if not api_key:
+        print("❌ 환경 변수 'DART_API_KEY'에 실제 DART API 키를 입력해주세요.")
+        return
 
-        margin_parts.append("%")
-        margin_str = " | ".join([f"{margin_parts[0]:<12}" if i == 0 else
-                                f"{val:>12}" if i == len(margin_parts)-1 else
-                                f"{val:>10}" for i, val in enumerate(margin_parts)])
-        lines.append(margin_str)
+    try:
+        period = parse_period_input(args.period)
+    except ValueError:
+        period = None
+    if period is None:
+        parser.error("기간은 4자리 연도 또는 6자리 YYYYMM 형식으로 입력해주세요.")
+    target_year, year_month = period
+
+    accounts = [name.strip() for name in args.accounts.split(',') if name.strip()] or None
+    try:
+        if accounts is not None:
+            account_specs(accounts)
+    except ValueError as e:
+        parser.error(str(e))
+    if accounts is not None and args.backend == 'multi':
+        parser.error("--backend multi는 매출액/영업이익만 수집할 수 있습니다 (--accounts 없이 실행하세요).")
+    if args.incremental and not args.store:
+        parser.error("--incremental에는 --store(또는 DART_TIMESERIES_DB)가 필요합니다.")
+    if args.incremental and args.backend == 'multi':
+        parser.error("--incremental은 --backend single에서만 사용할 수 있습니다.")
+    if args.restart and not args.journal:
+        parser.error("--restart에는 --journal(또는 DART_BATCH_JOURNAL)이 필요합니다.")
+    if args.store:
+        TIMESERIES_DB_FILE = args.store
+    if args.index:
+        SCREENING_DB_FILE = args.index
+
+    targets = read_batch_targets(args.targets, args.file)
+    if not targets:
+        parser.error("수집할 회사명 또는 고유번호를 입력해주세요.")
+
+    metrics.reset()
+    try:
+        run_batch(api_key, targets, target_year, year_month, args.output or None,
+                  company_workers=args.workers, fetch_workers=args.fetch_workers, parquet_dir=args.parquet,
+                  backend=args.backend, accounts=accounts, incremental=args.incremental,
+                  priority=args.priority, table_file=args.table, journal_file=args.journal,
+                  job_id=args.job, restart=args.restart)
+    finally:
+        if args.metrics:
+            metrics.write(args.metrics)
+            print(f"📈 계측 결과 저장: {args.metrics}")
+
+def profile_company(api_key: str, target: str, year: int, year_month: int = None,
+                    output: Optional[str] = None, top: int = 25) -> Optional[pd.DataFrame]:
+    """
+    한 기업의 검색 -> 수집 -> 표 출력 과정을 cProfile로 실행하고, 누적 시간 상위 top개 함수를 출력합니다.
+    output을 주면 pstats 파일(snakeviz 등으로 열 수 있음)로도 저장합니다.
+    """
+    import cProfile
+    import pstats
 
-        lines.append("=" * 80)
+    metrics.reset()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        corp_code = resolve_corp_code(api_key, target)
+        df = collect_quarterly_financials(api_key, corp_code, year, year_month) if corp_code else None
+        if df is not None and not df.empty:
+            print("\n" + format_display_table(df, corp_code, year_month))
+    finally:
+        profiler.disable()
+
+    print(f"\n🔬 프로파일 (누적 시간 상위 {top}개)")
+    pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+    print(f"⏱️ 단계별 소요: {metrics.format_stages(limit=10)}")
+    if output:
+        profiler.dump_stats(output)
+        print(f"💾 프로파일 저장 완료: {output}")
+    return df
 
-        return "\n".join(lines)
+def profile_main(argv: List[str]) -> None:
+    """
+    프로파일 모드 실행 함수: 한 기업의 수집 과정을 cProfile로 측정합니다.
+    """
+    parser = argparse.ArgumentParser(prog="dart_api_test.py profile",
+                                     description="한 기업의 재무정보 수집 과정을 cProfile로 측정합니다.")
+    parser.add_argument('target', help="회사명 또는 8자리 고유번호")
+    parser.add_argument('-p', '--period', default="", help="조회 연도(YYYY) 또는 YYYYMM (기본값: 2024)")
+    parser.add_argument('-o', '--output', help="pstats 결과 파일")
+    parser.add_argument('--top', type=int, default=25, help="출력할 함수 수")
+    parser.add_argument('--metrics', default=METRICS_FILE or None,
+                        help="실행 계측 결과 파일 (.prom이면 Prometheus 텍스트, 그 외에는 JSON)")
+    args = parser.parse_args(argv)
 
-# ==========================================
-# 3. 메인 실행 블록
-# ==========================================
+    load_dotenv()
+    api_key = os.getenv("DART_API_KEY")
+    if not api_key:
+        print("❌ 환경 변수 'DART_API_KEY'에 실제 DART API 키를 입력해주세요.")
+        return
+
+    try:
+        period = parse_period_input(args.period)
+    except ValueError:
+        period = None
+    if period is None:
+        parser.error("기간은 4자리 연도 또는 6자리 YYYYMM 형식으로 입력해주세요.")
+
+    profile_company(api_key, args.target, period[0], period[1], args.output, args.top)
+    if args.metrics:
+        metrics.write(args.metrics)
+        print(f"📈 계측 결과 저장: {args.metrics}")
+
+def quota_main(argv: List[str]) -> None:
+    """
+    요청 한도 확인 함수: API 키별 오늘 사용량과 남은 한도를 출력합니다 (DART_QUOTA_DB 원장 기준).
+    """
+    parser = argparse.ArgumentParser(prog="dart_api_test.py quota",
+                                     description="API 키별 오늘 DART 요청 사용량과 남은 한도를 출력합니다.")
+    parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("DART_API_KEY")
+    keys = rate_limiter.key_pool(api_key) if api_key else list(rate_limiter.keys)
+    if not keys:
+        print("❌ 환경 변수 'DART_API_KEY'(또는 DART_API_KEYS)에 실제 DART API 키를 입력해주세요.")
+        return
+    if not rate_limiter.ledger:
+        print("⚠️ DART_QUOTA_DB가 비어 있어 프로세스 간 사용량을 기록하지 않습니다.")
+        return
+
+    usage = rate_limiter.usage_today(api_key)
+    print(f"\n📅 {rate_limiter._day.isoformat()} 요청 사용량 ({rate_limiter.ledger_path})")
+    for key in keys:
+        used = usage.get(key, 0)
+        remaining = f"{max(0, rate_limiter.per_day - used)}건 남음" if rate_limiter.per_day else "한도 없음"
+        print(f"   - {key[:4]}…{key[-2:]}: {used}건 사용, {remaining}")
+    if rate_limiter.per_day and rate_limiter.interactive_reserve:
+        print(f"   (배치 요청은 키마다 {rate_limiter.interactive_reserve}건을 대화형 조회용으로 남깁니다)")
 
 def main():
     """
@@ -557,35 +3384,33 @@ def main():
         year_input = input("📅 조회할 연도 또는 YYYYMM을 입력하세요 (기본값: 2024): ").strip()
 
         try:
-            if not year_input:
-                target_year = 2024
-                year_month = 202412  # 기본값을 202412로 설정
-            elif len(year_input) == 4:  # 4자리 연도
-                target_year = int(year_input)
-                year_month = int(year_input) * 100 + 12  # YYYY를 YYYY12로 변환
-            elif len(year_input) == 6:  # 6자리 YYYYMM
-                year_month = int(year_input)
-                target_year = year_month // 100  # 연도 추출
-            else:
-                print("⚠️ 4자리 연도 또는 6자리 YYYYMM 형식으로 입력해주세요.")
-                continue
+            period = parse_period_input(year_input)
         except ValueError:
             print("⚠️ 유효한 숫자를 입력해주세요.")
             continue
+        if period is None:
+            print("⚠️ 4자리 연도 또는 6자리 YYYYMM 형식으로 입력해주세요.")
+            continue
+        target_year, year_month = period
 
         if year_month:
             print(f"\n🔍 '{company_name}' ({year_month} 기준) 검색 시작...")
         else:
             print(f"\n🔍 '{company_name}' ({target_year}년) 검색 시작...")
 
-        # 회사 코드 검색
-        corp_code = search_company_code(MY_API_KEY, company_name)
-        if not corp_code:
-            print("❌ 회사를 찾을 수 없습니다. 다시 시도해주세요.")
-            continue
+        try:
+            # 회사 코드 검색
+            corp_code = search_company_code(MY_API_KEY, company_name)
+            if not corp_code:
+                print("❌ 회사를 찾을 수 없습니다. 다시 시도해주세요.")
+                continue
 
-        # 재무데이터 수집
-        df = collect_quarterly_financials(MY_API_KEY, corp_code, target_year, year_month)
+            # 재무데이터 수집 (DART_ACCOUNTS로 수집 항목 변경 가능)
+            df = collect_quarterly_financials(MY_API_KEY, corp_code, target_year, year_month, accounts=DEFAULT_ACCOUNTS)
+        except DartQuotaExceeded as e:
+            # 한도 초과는 이 조회만 중단하고 다음 입력을 받습니다
+            print(f"⛔ {e} 잠시 후 다시 시도해주세요.")
+            continue
 
         if df.empty:
             if year_month:
@@ -598,6 +3423,17 @@ def main():
         summary_table = format_display_table(df, corp_code, year_month)
         print("\n" + summary_table)
 
+        # 실행 계측 결과 기록 (DART_METRICS_FILE 설정 시, 프로그램 시작 이후 누적)
+        if METRICS_FILE:
+            metrics.write(METRICS_FILE)
+
+        # Parquet 데이터셋 추가 (DART_PARQUET_DIR 설정 시)
+        if PARQUET_DATASET_DIR and export_parquet(df, corp_code, PARQUET_DATASET_DIR):
+            print(f"\n💾 Parquet 데이터셋 추가 완료: {PARQUET_DATASET_DIR}")
+
+        if not SAVE_EXCEL:
+            continue
+
         # 엑셀 파일 저장
         if year_month:
             excel_filename = f"{corp_code}_{year_month}_4분기_재무정보.xlsx"
@@ -613,4 +3449,16 @@ def main():
             print(f"\n⚠️ 엑셀 저장 실패: {e}")
 
 if __name__ == "__main__":
-    main()
+    # dart_analytics 등 이 모듈을 import하는 모듈이 스크립트로 실행 중인 같은 모듈(설정·요청 한도·계측)을 쓰게 합니다
+    sys.modules.setdefault('dart_api_test', sys.modules[__name__])
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'profile':
+        profile_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'quota':
+        quota_main(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] in ('lookup', 'fetch', 'serve', 'refresh'):
+        import dart_cli
+        sys.exit(dart_cli.main(sys.argv[1:]))
+    else:
+        main()
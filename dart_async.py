@@ -0,0 +1,226 @@
+"""
+웹 백엔드 등 asyncio 이벤트 루프 안에서 쓰기 위한 Open DART 비동기 API입니다.
+
+요청 경로(requests, SQLite 캐시/저장소, 요청 한도)는 dart_api_test와 같으며, 블로킹 호출은 클라이언트 전용
+스레드 풀에서 실행되어 이벤트 루프를 막지 않습니다. 진행 로그를 출력하지 않고 결과를 딕셔너리로 돌려줍니다.
+
+    async with AsyncDartClient(api_key) as client:
+        found = await client.search_company("삼성전자")
+        result = await client.collect_quarterly_financials(found['corp_code'], 2024, 202409, timeout=30)
+
+같은 인자로 동시에 들어온 호출은 진행 중인 한 번의 수집을 함께 기다립니다. timeout이 지나거나 호출이 취소되면
+해당 호출만 asyncio.TimeoutError/CancelledError로 끝나며, 그 수집을 기다리는 호출이 더 없으면 아직 보내지 않은
+보고서 요청은 건너뜁니다.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+import dart_api_test as dart
+
+class _InFlight:
+    """
+    진행 중인 블로킹 호출 하나와 그 결과를 기다리는 호출 수입니다.
+    """
+    __slots__ = ('future', 'cancel_event', 'waiters')
+
+    def __init__(self, future: asyncio.Future, cancel_event: threading.Event):
+        self.future = future
+        self.cancel_event = cancel_event
+        self.waiters = 0
+
+class AsyncDartClient:
+    """
+    API 키 하나에 대한 비동기 클라이언트입니다. max_workers는 동시에 진행할 수집/검색 수,
+    fetch_workers는 수집들이 함께 쓰는 보고서 요청 스레드 수입니다 (모든 요청은 전역 요청 한도를 따릅니다).
+    클라이언트는 스레드 풀 두 개를 가지므로 `async with AsyncDartClient(api_key) as client:`처럼 비동기 컨텍스트
+    관리자로 쓰거나, 다 쓴 뒤 close()를 호출해 정리합니다.
+    """
+
+    def __init__(self, api_key: str, max_workers: int = 8, fetch_workers: Optional[int] = None):
+        self.api_key = api_key
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="dart-async")
+        self._fetch_pool = ThreadPoolExecutor(max_workers=max(1, fetch_workers or dart.DEFAULT_FETCH_WORKERS),
+                                              thread_name_prefix="dart-async-fetch")
+        self._inflight: Dict[tuple, _InFlight] = {}
+
+    async def __aenter__(self) -> "AsyncDartClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        스레드 풀을 정리합니다. 진행 중인 요청은 끝까지 실행되지만 결과를 기다리지 않습니다.
+        """
+        for entry in self._inflight.values():
+            entry.cancel_event.set()
+        self._pool.shutdown(wait=False)
+        self._fetch_pool.shutdown(wait=False)
+
+    async def _shared(self, key: tuple, fn: Callable[[threading.Event], object],
+                      timeout: Optional[float] = None) -> object:
+        """
+        key가 같은 호출이 진행 중이면 그 결과를 함께 기다리고, 없으면 fn(cancel_event)을 스레드 풀에서 시작합니다.
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop),) + key
+        entry = self._inflight.get(key)
+        if entry is None:
+            cancel_event = threading.Event()
+            entry = _InFlight(loop.run_in_executor(self._pool, fn, cancel_event), cancel_event)
+            self._inflight[key] = entry
+
+            def done(future: asyncio.Future, entry: _InFlight = entry) -> None:
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+                # 기다리는 호출이 모두 떠난 뒤 끝난 작업의 예외가 경고로 남지 않도록 읽어 둡니다
+                if not future.cancelled():
+                    future.exception()
+
+            entry.future.add_done_callback(done)
+        else:
+            dart.metrics.incr('async_shared_calls')
+
+        entry.waiters += 1
+        try:
+            # shield: 한 호출의 시간 초과/취소가 같은 수집을 기다리는 다른 호출에 번지지 않게 합니다
+            return await asyncio.wait_for(asyncio.shield(entry.future), timeout)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.future.done():
+                # 더 기다리는 호출이 없으면 남은 요청을 건너뛰게 하고, 다음 호출은 새로 시작합니다
+                entry.cancel_event.set()
+                if self._inflight.get(key) is entry:
+                    del self._inflight[key]
+                dart.metrics.incr('async_cancelled')
+
+    async def get_company_codes(self, timeout: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """
+        고유번호 목록(회사명:고유번호)을 준비합니다. 캐시가 없으면 내려받으며, 실패하면 None을 반환합니다.
+        """
+        return await self._shared(('codes',), lambda _: dart.get_company_codes(self.api_key, verbose=False), timeout)
+
+    async def search_company(self, query: str, limit: int = 5, timeout: Optional[float] = None) -> Dict[str, object]:
+        """
+        회사명(또는 종목코드·영문명)으로 고유번호를 찾습니다. 결과 형식은 dart_api_test.match_company와 같습니다
+        (match: 'exact' | 'alias' | 'partial' | 'ambiguous' | 'not_found' | 'unavailable').
+        """
+        async def run() -> Dict[str, object]:
+            await self.get_company_codes()
+            return await self._shared(('search', query, limit),
+                                      lambda _: dart.match_company(self.api_key, query, limit, verbose=False))
+
+        return await asyncio.wait_for(run(), timeout)
+
+    async def search_candidates(self, query: str, limit: Optional[int] = 10,
+                                timeout: Optional[float] = None) -> List[Dict[str, str]]:
+        """
+        회사명 검색 후보를 순위대로 반환합니다 (각 후보는 corp_code/corp_name/stock_code/modify_date 딕셔너리).
+        """
+        async def run() -> List[Tuple[str, str, str, str]]:
+            await self.get_company_codes()
+            return await self._shared(('candidates', query, limit),
+                                      lambda _: dart.search_company_candidates(self.api_key, query, limit,
+                                                                               verbose=False))
+
+        ranked = await asyncio.wait_for(run(), timeout)
+        return [dict(zip(('corp_code', 'corp_name', 'stock_code', 'modify_date'), record)) for record in ranked]
+
+    async def collect_quarterly_financials(self, corp_code: str, year: int, year_month: int = None,
+                                           accounts: Optional[Iterable[str]] = None,
+                                           timeout: Optional[float] = None) -> Dict[str, object]:
+        """
+        dart_api_test.collect_quarterly_financials를 로그 없이 실행해 다음 딕셔너리로 반환합니다.
+        frame(결과 DataFrame, 호출마다 별도 사본), fetch_errors(재시도 후에도 실패한 요청),
+        q4_incomplete(4분기 보정이 불완전한 항목), empty(공시된 주요 계정이 없는지).
+        """
+        corp_code = str(corp_code).zfill(8)
+        accounts = tuple(accounts) if accounts is not None else None
+
+        def run(cancel_event: threading.Event) -> pd.DataFrame:
+            options = dart.CollectOptions(executor=self._fetch_pool, verbose=False, accounts=accounts,
+                                          cancel_event=cancel_event)
+            return dart.collect_quarterly_financials(self.api_key, corp_code, year, year_month, options)
+
+        df = await self._shared(('collect', corp_code, year, year_month, accounts), run, timeout)
+        return {
+            'corp_code': corp_code,
+            'year': year,
+            'year_month': year_month,
+            'frame': df.copy(),
+            'fetch_errors': list(df.attrs.get('fetch_errors', [])),
+            'q4_incomplete': list(df.attrs.get('q4_incomplete', [])),
+            'empty': df.empty,
+        }
+
+    async def collect_company(self, query: str, year: int, year_month: int = None,
+                              accounts: Optional[Iterable[str]] = None,
+                              timeout: Optional[float] = None) -> Dict[str, object]:
+        """
+        회사명(또는 8자리 고유번호)으로 검색한 뒤 수집합니다. 회사를 하나로 정하지 못하면 frame 없이
+        search 결과만 담아 반환합니다. timeout은 검색과 수집 전체에 적용됩니다.
+        """
+        async def run() -> Dict[str, object]:
+            if len(query) == 8 and query.isdigit():
+                found = {'query': query, 'match': 'exact', 'corp_code': query, 'corp_name': None,
+                         'candidates': [], 'total': 1}
+            else:
+                found = await self.search_company(query)
+            if found['corp_code'] is None:
+                return {'search': found, 'frame': None}
+            result = await self.collect_quarterly_financials(found['corp_code'], year, year_month, accounts)
+            result['search'] = found
+            return result
+
+        return await asyncio.wait_for(run(), timeout)
+
+# 이벤트 루프 -> (API 키 -> 기본 클라이언트). 루프를 약한 참조로 들고 있어 asyncio.run()이 끝나 루프가 사라지면
+# 그 루프의 클라이언트도 함께 정리되고, 나중 루프가 같은 id()를 받아도 죽은 루프의 클라이언트를 받지 않습니다
+_default_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncDartClient]]" = \
+    weakref.WeakKeyDictionary()
+
+def get_async_client(api_key: str) -> AsyncDartClient:
+    """
+    이벤트 루프와 API 키마다 하나의 기본 클라이언트를 재사용합니다 (모듈 수준 함수에서 사용).
+    루프가 닫히거나 사라지면 클라이언트의 스레드 풀을 정리합니다.
+    """
+    loop = asyncio.get_running_loop()
+    clients = _default_clients.get(loop)
+    if clients is None:
+        clients = _default_clients[loop] = {}
+        # 루프 객체가 사라질 때 그 루프의 클라이언트를 모두 닫습니다 (루프를 강하게 참조하지 않도록 딕셔너리만 넘김)
+        weakref.finalize(loop, _close_clients, clients)
+    client = clients.get(api_key)
+    if client is None:
+        client = clients[api_key] = AsyncDartClient(api_key)
+    return client
+
+def _close_clients(clients: Dict[str, AsyncDartClient]) -> None:
+    for client in clients.values():
+        client.close()
+    clients.clear()
+
+async def close_default_clients() -> None:
+    """
+    현재 이벤트 루프의 기본 클라이언트를 닫습니다. asyncio.run()으로 실행하는 main 코루틴 끝에서 호출하면
+    루프가 수거되기를 기다리지 않고 스레드 풀을 바로 정리합니다.
+    """
+    clients = _default_clients.pop(asyncio.get_running_loop(), None)
+    if clients:
+        _close_clients(clients)
+
+async def search_company(api_key: str, query: str, limit: int = 5,
+                         timeout: Optional[float] = None) -> Dict[str, object]:
+    return await get_async_client(api_key).search_company(query, limit, timeout)
+
+async def collect_quarterly_financials_async(api_key: str, corp_code: str, year: int, year_month: int = None,
+                                             accounts: Optional[Iterable[str]] = None,
+                                             timeout: Optional[float] = None) -> Dict[str, object]:
+    return await get_async_client(api_key).collect_quarterly_financials(corp_code, year, year_month,
+                                                                        accounts, timeout)
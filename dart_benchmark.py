@@ -0,0 +1,279 @@
+"""
+로컬 Open DART 대역 서버(dart_fake_server.py)를 상대로 수집 경로를 측정하는 오프라인 벤치마크입니다.
+
+고유번호 다운로드/로드, 회사명 검색, 분기 재무제표 수집(작업자 수별, 응답 캐시 전/후), 다중회사 주요계정 수집,
+4분기 보정, 표 출력, 파생 지표 계산 단계마다 건당 지연(평균/p50/p95), 초당 요청 수, 최대 메모리(tracemalloc)를 보고합니다.
+
+    python dart_benchmark.py --targets 30 --latency 0.03 --workers 1,8 --json bench.json
+    python dart_benchmark.py --targets 30 --latency 0.03 --workers 1,8 --compare bench.json
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+import dart_analytics
+import dart_api_test as dart
+from dart_fake_server import FakeDartServer
+
+BENCH_API_KEY = "benchmark"
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+class Benchmark:
+    """
+    단계별 측정 결과를 모읍니다. 각 단계는 항목마다 fn을 한 번씩 호출하며(batch=True이면 전체를 한 번 호출),
+    그동안 대역 서버가 받은 요청 수와 tracemalloc 최대 메모리를 함께 기록합니다.
+    """
+
+    def __init__(self, server: FakeDartServer, trace_memory: bool = True, verbose: bool = False):
+        self.server = server
+        self.trace_memory = trace_memory
+        self.verbose = verbose
+        self.results: List[Dict[str, object]] = []
+
+    def run(self, name: str, items: List[object], fn: Callable[[object], object], batch: bool = False) -> list:
+        before = self.server.stats()
+        if self.trace_memory:
+            tracemalloc.start()
+        latencies = []
+        outputs = []
+        sink = sys.stdout if self.verbose else io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(sink):
+            if batch:
+                outputs.append(fn(items))
+                latencies.append(time.perf_counter() - start)
+            else:
+                for item in items:
+                    t0 = time.perf_counter()
+                    outputs.append(fn(item))
+                    latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        peak = 0
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        after = self.server.stats()
+
+        requests = after['requests'] - before['requests']
+        per_item = [elapsed / max(1, len(items))] if batch else latencies
+        self.results.append({
+            'stage': name,
+            'items': len(items),
+            'total_s': round(elapsed, 4),
+            'mean_ms': round(statistics.mean(per_item) * 1000, 3) if per_item else 0.0,
+            'p50_ms': round(percentile(per_item, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(per_item, 0.95) * 1000, 3),
+            'requests': requests,
+            'req_per_s': round(requests / elapsed, 1) if elapsed > 0 else 0.0,
+            'bytes': after['bytes_sent'] - before['bytes_sent'],
+            'peak_mib': round(peak / (1 << 20), 2),
+        })
+        return outputs
+
+def ljust_width(text: str, width: int) -> str:
+    """
+    한글 등 전각 문자를 두 칸으로 계산하여 왼쪽 정렬합니다.
+    """
+    used = sum(2 if unicodedata.east_asian_width(ch) in 'WF' else 1 for ch in text)
+    return text + " " * max(0, width - used)
+
+def print_report(results: List[Dict[str, object]], baseline: Optional[Dict[str, Dict[str, object]]] = None) -> None:
+    header = (f"{ljust_width('단계', 52)} {'items':>6} {'total(s)':>9} {'mean(ms)':>9} {'p50(ms)':>9} "
+              f"{'p95(ms)':>9} {'reqs':>6} {'req/s':>8} {'peak(MiB)':>9}")
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    print("-" * (len(header) + 2))
+    for r in results:
+        line = (f"{ljust_width(r['stage'], 52)} {r['items']:>6} {r['total_s']:>9.3f} {r['mean_ms']:>9.2f} "
+                f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['requests']:>6} {r['req_per_s']:>8.1f} {r['peak_mib']:>9.2f}")
+        if baseline:
+            base = baseline.get(r['stage'])
+            line += f" {r['total_s'] / base['total_s']:>7.2f}x" if base and base['total_s'] else f" {'-':>8}"
+        print(line)
+
+def reset_corp_index() -> None:
+    with dart._corp_indexes_lock:
+        dart._corp_indexes.clear()
+
+def reset_response_cache(path: str) -> None:
+    """
+    응답 캐시를 비운 새 파일로 바꿉니다 (빈 문자열이면 캐시 없이 수집).
+    """
+    with dart._response_cache_lock:
+        if dart._response_cache is not None:
+            dart._response_cache._conn.close()
+        dart._response_cache = None
+    for suffix in ('', '-wal', '-shm'):
+        if path and os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    dart.RESPONSE_CACHE_FILE = path
+
+def search_queries(companies: List[Dict[str, str]], count: int, seed: int = 0) -> List[str]:
+    """
+    정확 일치, 접두 일치, 부분 일치(바이그램) 검색어를 고르게 섞어 만듭니다.
+    """
+    rng = random.Random(seed)
+    names = [c['corp_name'] for c in companies]
+    queries = []
+    for i in range(count):
+        name = rng.choice(names)
+        if i % 3 == 0:
+            queries.append(name)
+        elif i % 3 == 1:
+            queries.append(name[:2])
+        else:
+            start = rng.randint(0, max(0, len(name) - 2))
+            queries.append(name[start:start + 2])
+    return queries
+
+def run_benchmarks(server: FakeDartServer, args) -> List[Dict[str, object]]:
+    bench = Benchmark(server, trace_memory=not args.no_memory, verbose=args.verbose)
+    cache_file = "company_codes_cache.json"
+
+    # 고유번호: 다운로드+색인(콜드), 스냅샷 로드(웜)
+    bench.run("get_company_codes (다운로드)", [None], lambda _: dart.get_company_codes(BENCH_API_KEY, cache_file))
+    reset_corp_index()
+    bench.run("get_company_codes (스냅샷 로드)", [None], lambda _: dart.get_company_codes(BENCH_API_KEY, cache_file))
+
+    queries = search_queries(server.companies, args.queries, args.seed)
+    bench.run("search_company_code", queries, lambda q: dart.search_company_code(BENCH_API_KEY, q))
+
+    listed = [c['corp_code'] for c in server.companies if c['stock_code']]
+    targets = listed[:args.targets]
+
+    frames: Dict[str, pd.DataFrame] = {}
+    for workers in args.workers:
+        reset_response_cache(os.path.abspath("bench_response_cache.sqlite3") if not args.no_cache else "")
+        outputs = bench.run(
+            f"collect_quarterly_financials (workers={workers})", targets,
+            lambda code: dart.collect_quarterly_financials(BENCH_API_KEY, code, args.year, args.year_month,
+                                                           max_workers=workers)
+        )
+        frames = dict(zip(targets, outputs))
+
+    if not args.no_cache:
+        bench.run(
+            f"collect_quarterly_financials (캐시 적중, workers={args.workers[-1]})", targets,
+            lambda code: dart.collect_quarterly_financials(BENCH_API_KEY, code, args.year, args.year_month,
+                                                           max_workers=args.workers[-1])
+        )
+
+    reset_response_cache("")
+    bench.run("collect_key_accounts_multi", targets,
+              lambda codes: dart.collect_key_accounts_multi(BENCH_API_KEY, codes, args.year, args.year_month),
+              batch=True)
+
+    collected = [df.assign(corp_code=code) for code, df in frames.items() if not df.empty]
+    if collected:
+        combined = pd.concat(collected, ignore_index=True)
+        rounds = list(range(args.repeat))
+        bench.run(f"adjust_q4_values ({len(combined)}행)", rounds,
+                  lambda _: dart.adjust_q4_values(combined.copy(), args.year_month))
+        tables = [(code, df) for code, df in frames.items() if not df.empty] * args.repeat
+        bench.run("format_display_table", tables,
+                  lambda item: dart.format_display_table(item[1], item[0], args.year_month))
+        bench.run(f"format_display_tables ({len(frames)}개 기업 한 표)", rounds,
+                  lambda _: dart.format_display_tables(frames, args.year_month))
+        bench.run(f"derived_metrics ({len(collected)}개 기업)", rounds,
+                  lambda _: dart_analytics.derived_metrics(combined))
+
+    return bench.results
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Open DART 대역 서버 기반 오프라인 벤치마크")
+    parser.add_argument('--companies', type=int, default=3000, help="대역 서버의 합성 기업 수 (기본값 3000)")
+    parser.add_argument('--accounts', type=int, default=40, help="재무제표 응답에 덧붙일 기타 계정 수 (기본값 40)")
+    parser.add_argument('--targets', type=int, default=20, help="재무제표를 수집할 기업 수 (기본값 20)")
+    parser.add_argument('--queries', type=int, default=300, help="회사명 검색 횟수 (기본값 300)")
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--year-month', type=int, default=202409, help="YYYYMM 기준 수집 (0이면 --year 연도 수집)")
+    parser.add_argument('--workers', default="1,8", help="비교할 작업자 수 목록 (쉼표 구분, 기본값 1,8)")
+    parser.add_argument('--repeat', type=int, default=20, help="4분기 보정/표 출력/파생 지표 계산 반복 횟수 (기본값 20)")
+    parser.add_argument('--latency', type=float, default=0.02, help="대역 서버 응답 지연(초, 기본값 0.02)")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--status-error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--per-minute-limit', type=int, default=0)
+    parser.add_argument('--replay-cache', help="합성 데이터 대신 재생할 응답 캐시(SQLite) 파일")
+    parser.add_argument('--corp-zip', help="합성 목록 대신 제공할 corpCode.zip 파일")
+    parser.add_argument('--client-limit', action='store_true', help="클라이언트 요청 한도(DART_PER_MINUTE_LIMIT 등)를 그대로 적용")
+    parser.add_argument('--no-cache', action='store_true', help="응답 캐시 없이 측정")
+    parser.add_argument('--no-memory', action='store_true', help="tracemalloc 없이 측정 (시간 측정 오차 감소)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="결과를 저장할 JSON 파일")
+    parser.add_argument('--compare', help="비교 기준이 될 이전 결과 JSON 파일")
+    parser.add_argument('--verbose', action='store_true', help="수집 로그를 그대로 출력")
+    args = parser.parse_args(argv)
+    args.workers = [int(w) for w in args.workers.split(',') if w.strip()]
+    args.year_month = args.year_month or None
+    for name in ('json', 'compare', 'replay_cache', 'corp_zip'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = {r['stage']: r for r in json.load(f)['results']}
+
+    if not args.client_limit:
+        dart.rate_limiter = dart.RateLimiter(per_minute=0, per_day=0, ledger_path='')
+
+    workdir = tempfile.mkdtemp(prefix="dart-bench-")
+    cwd = os.getcwd()
+    server = FakeDartServer(companies=args.companies, accounts=args.accounts, latency=args.latency,
+                            jitter=args.jitter, error_rate=args.error_rate,
+                            status_error_rate=args.status_error_rate, rate_limit_rate=args.rate_limit_rate,
+                            per_minute_limit=args.per_minute_limit, corp_zip=args.corp_zip,
+                            replay_cache=args.replay_cache, seed=args.seed)
+    try:
+        os.chdir(workdir)
+        dart.DART_API_BASE = server.base_url
+        dart.metrics.reset()
+        with server:
+            results = run_benchmarks(server, args)
+            totals = server.stats()
+    finally:
+        os.chdir(cwd)
+        reset_response_cache("")
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n📊 Open DART 대역 서버 벤치마크 (지연 {args.latency}s, 기업 {args.targets}개, "
+          f"기준 {args.year_month or args.year}, Python {sys.version.split()[0]}, pandas {pd.__version__})\n")
+    print_report(results, baseline)
+    print(f"\n   서버 요청 {totals['requests']}건, 전송 {totals['bytes_sent'] / (1 << 20):.1f} MiB, "
+          f"주입 오류 {totals['injected']}")
+
+    if args.json:
+        report = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'config': {k: v for k, v in vars(args).items() if k not in ('json', 'compare')},
+            'server': totals,
+            'results': results,
+            'client_metrics': dart.metrics.summary(),
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+셸 스크립트에서 반복 호출하기 위한 비대화형 명령행 진입점입니다.
+
+    python dart_cli.py lookup 삼성전자                 # 고유번호<TAB>회사명<TAB>종목코드
+    python dart_cli.py lookup 삼성 --json --limit 10
+    python dart_cli.py fetch 삼성전자 -p 202409 --format csv
+    python dart_cli.py serve                           # 조회 데몬 (DART_DAEMON_SOCKET 또는 --socket)
+    python dart_cli.py refresh --if-stale              # 고유번호 캐시 대조·갱신
+
+이 모듈은 표준 라이브러리만 import하며, dart_api_test(와 pandas/requests)는 실제로 필요한 경로에서만 import합니다.
+lookup은 고유번호 색인만 사용해 pandas 없이 동작하고, DART_DAEMON_SOCKET(또는 --socket)에 조회 데몬이 떠 있으면
+dart_api_test를 import하지 않고 데몬에 요청을 보냅니다. 데몬에 연결할 수 없으면 같은 프로세스에서 직접 처리합니다.
+
+데몬 프로토콜은 한 줄에 JSON 하나씩 주고받는 방식입니다 (한 연결에서 여러 요청 가능).
+    요청: {"cmd": "lookup", "query": "삼성전자", "limit": 5}
+          {"cmd": "fetch", "target": "삼성전자", "period": "202409", "format": "text", "accounts": null}
+          {"cmd": "ping"}
+    응답: {"ok": true, "result": {...}} 또는 {"ok": false, "error": "..."}
+
+종료 코드: 0 성공, 1 회사/데이터 없음, 2 후보가 여러 개, 3 고유번호 목록·데몬·수집 오류.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# 조회 데몬 주소: 유닉스 소켓 경로 또는 host:port (빈 문자열이면 데몬을 쓰지 않음)
+DAEMON_SOCKET = os.getenv("DART_DAEMON_SOCKET", "")
+
+EXIT_OK = 0
+EXIT_NOT_FOUND = 1
+EXIT_AMBIGUOUS = 2
+EXIT_ERROR = 3
+
+# 데몬에 보낸 요청이 이 시간(초) 안에 연결되지 않으면 직접 처리로 넘어갑니다
+DAEMON_CONNECT_TIMEOUT = 1.0
+# 요청/응답 한 줄의 최대 크기 (표 출력 포함)
+DAEMON_MAX_LINE = 64 * 1024 * 1024
+
+def daemon_address(spec: str) -> Tuple[int, object]:
+    """
+    데몬 주소 문자열을 (소켓 종류, 주소)로 바꿉니다. 'host:port'는 TCP, 그 외에는 유닉스 소켓 경로입니다.
+    유닉스 소켓을 지원하지 않는 플랫폼에서는 host:port 형식을 사용해야 합니다.
+    """
+    host, sep, port = spec.rpartition(':')
+    if sep and port.isdigit() and os.sep not in spec:
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    if not hasattr(socket, 'AF_UNIX'):
+        raise ValueError(f"이 플랫폼은 유닉스 소켓을 지원하지 않습니다. host:port 형식을 사용하세요: {spec}")
+    return socket.AF_UNIX, spec
+
+def daemon_request(spec: str, payload: Dict[str, object], timeout: Optional[float] = None) -> Optional[Dict[str, object]]:
+    """
+    조회 데몬에 요청 하나를 보내고 응답 딕셔너리를 반환합니다. 데몬에 연결할 수 없으면 None을 반환하며,
+    연결된 뒤 응답이 끊기거나 timeout(초)이 지나면 OSError를 발생시킵니다.
+    """
+    family, address = daemon_address(spec)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(DAEMON_CONNECT_TIMEOUT)
+        try:
+            sock.connect(address)
+        except OSError:
+            return None
+        sock.settimeout(timeout)
+        with sock.makefile('rwb') as stream:
+            stream.write(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+            stream.flush()
+            line = stream.readline(DAEMON_MAX_LINE)
+        if not line:
+            raise ConnectionError("조회 데몬이 응답 없이 연결을 닫았습니다.")
+        return json.loads(line)
+    finally:
+        sock.close()
+
+def handle_request(api_key: Optional[str], request: Dict[str, object]) -> Dict[str, object]:
+    """
+    요청 딕셔너리 하나를 처리해 결과를 반환합니다 (데몬과 직접 처리가 같은 함수를 사용).
+    """
+    import dart_api_test as dart
+
+    cmd = request.get('cmd')
+    if cmd == 'ping':
+        return {'pid': os.getpid()}
+    if cmd == 'lookup':
+        return dart.lookup_company(api_key, str(request['query']), int(request.get('limit') or 5))
+    if cmd == 'fetch':
+        if not api_key:
+            raise ValueError("환경 변수 'DART_API_KEY'에 실제 DART API 키를 입력해주세요.")
+        return dart.fetch_company(api_key, str(request['target']), str(request.get('period') or ""),
+                                  str(request.get('format') or 'text'), request.get('accounts'))
+    raise ValueError(f"알 수 없는 요청: {cmd}")
+
+def load_api_key() -> Optional[str]:
+    import dart_api_test as dart
+
+    dart.load_dotenv()
+    return os.getenv("DART_API_KEY")
+
+def run_request(request: Dict[str, object], socket_spec: str, timeout: Optional[float] = None) -> Dict[str, object]:
+    """
+    socket_spec의 데몬에 요청을 보내고, 데몬이 없으면 이 프로세스에서 직접 처리합니다.
+    반환값은 데몬 응답과 같은 {"ok": ..., "result"/"error": ...} 형식입니다.
+    """
+    if socket_spec:
+        try:
+            response = daemon_request(socket_spec, request, timeout)
+        except (OSError, ValueError) as e:
+            return {'ok': False, 'error': f"조회 데몬 오류 ({socket_spec}): {e}"}
+        if response is not None:
+            return response
+    try:
+        return {'ok': True, 'result': handle_request(load_api_key(), request)}
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+
+def report_search(search: Dict[str, object]) -> int:
+    """
+    회사를 하나로 정하지 못한 검색 결과를 표준 오류에 안내하고 종료 코드를 반환합니다.
+    """
+    query = search['query']
+    if search['match'] == 'ambiguous':
+        print(f"⚠️ '{query}' 검색 결과가 너무 많습니다 ({search['total']}건). 상위 후보:", file=sys.stderr)
+        for c in search['candidates']:
+            listed = f", 종목코드 {c['stock_code']}" if c['stock_code'] else ""
+            print(f"   - {c['corp_name']} ({c['corp_code']}{listed})", file=sys.stderr)
+        return EXIT_AMBIGUOUS
+    if search['match'] == 'not_found':
+        print(f"❌ '{query}' 회사를 찾을 수 없습니다.", file=sys.stderr)
+        return EXIT_NOT_FOUND
+    print("❌ 고유번호 목록을 불러오지 못했습니다 (DART_API_KEY 또는 고유번호 캐시 파일을 확인해주세요).", file=sys.stderr)
+    return EXIT_ERROR
+
+def search_exit_code(search: Dict[str, object]) -> int:
+    if search['corp_code']:
+        return EXIT_OK
+    return {'ambiguous': EXIT_AMBIGUOUS, 'not_found': EXIT_NOT_FOUND}.get(search['match'], EXIT_ERROR)
+
+def lookup_main(argv: List[str]) -> int:
+    """
+    회사명(또는 8자리 고유번호)을 고유번호로 바꿔 '고유번호<TAB>회사명<TAB>종목코드' 한 줄로 출력합니다.
+    """
+    parser = argparse.ArgumentParser(prog="dart_cli.py lookup", description="회사명으로 DART 고유번호를 찾습니다.")
+    parser.add_argument('query', help="회사명 또는 8자리 고유번호")
+    parser.add_argument('--limit', type=int, default=5, help="후보 수 (기본값 5)")
+    parser.add_argument('--json', action='store_true', help="검색 결과 전체를 JSON으로 출력")
+    parser.add_argument('--socket', default=DAEMON_SOCKET, help="조회 데몬 주소 (기본값: DART_DAEMON_SOCKET)")
+    args = parser.parse_args(argv)
+
+    response = run_request({'cmd': 'lookup', 'query': args.query, 'limit': args.limit}, args.socket, timeout=60)
+    if not response['ok']:
+        print(f"❌ {response['error']}", file=sys.stderr)
+        return EXIT_ERROR
+    search = response['result']
+    if args.json:
+        print(json.dumps(search, ensure_ascii=False))
+        return search_exit_code(search)
+    if not search['corp_code']:
+        return report_search(search)
+    stock_code = next((c['stock_code'] for c in search['candidates'] if c['corp_code'] == search['corp_code']), "")
+    print(f"{search['corp_code']}\t{search['corp_name'] or ''}\t{stock_code}")
+    return EXIT_OK
+
+def fetch_main(argv: List[str]) -> int:
+    """
+    한 기업의 분기별 재무정보를 수집해 요약 표(text/csv/markdown/html) 또는 수집 행(JSON)을 출력합니다.
+    """
+    parser = argparse.ArgumentParser(prog="dart_cli.py fetch",
+                                     description="한 기업의 분기별 재무정보를 대화 없이 수집해 출력합니다.")
+    parser.add_argument('target', help="회사명 또는 8자리 고유번호")
+    parser.add_argument('-p', '--period', default="", help="조회 연도(YYYY) 또는 YYYYMM (기본값: 2024)")
+    parser.add_argument('--format', choices=['text', 'csv', 'markdown', 'html', 'json'], default='text',
+                        help="출력 형식 (기본값 text, json은 수집 행 목록)")
+    parser.add_argument('--accounts', default="", help="수집 항목 (쉼표 구분, 기본값: DART_ACCOUNTS 또는 매출액,영업이익)")
+    parser.add_argument('-o', '--output', help="출력을 저장할 파일 (기본값: 표준 출력)")
+    parser.add_argument('--socket', default=DAEMON_SOCKET, help="조회 데몬 주소 (기본값: DART_DAEMON_SOCKET)")
+    args = parser.parse_args(argv)
+
+    accounts = [name.strip() for name in args.accounts.split(',') if name.strip()] or None
+    request = {'cmd': 'fetch', 'target': args.target, 'period': args.period, 'format': args.format,
+               'accounts': accounts}
+    response = run_request(request, args.socket)
+    if not response['ok']:
+        print(f"❌ {response['error']}", file=sys.stderr)
+        return EXIT_ERROR
+    result = response['result']
+    if result['corp_code'] is None:
+        return report_search(result['search'])
+    for year, report_name, fs_name, error in result['fetch_errors']:
+        print(f"⚠️ {year}년 {report_name}({fs_name}) 요청 실패: {error}", file=sys.stderr)
+    if result['empty']:
+        print(f"❌ {result['year_month']} 기준 데이터를 찾을 수 없습니다.", file=sys.stderr)
+        return EXIT_ERROR if result['fetch_errors'] else EXIT_NOT_FOUND
+
+    text = json.dumps(result['records'], ensure_ascii=False) if args.format == 'json' else result['table']
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"💾 저장 완료: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return EXIT_OK
+
+def serve(spec: str, api_key: Optional[str]) -> None:
+    """
+    spec 주소에서 조회 데몬을 실행합니다. 연결마다 스레드 하나가 요청 줄을 차례로 처리하며, 고유번호 색인·HTTP 세션·
+    응답 캐시·요청 한도는 dart_api_test의 프로세스 전역 객체를 그대로 공유합니다. Ctrl+C로 종료합니다.
+    """
+    import socketserver
+    import dart_api_test as dart
+
+    family, address = daemon_address(spec)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for line in iter(lambda: self.rfile.readline(DAEMON_MAX_LINE), b''):
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    response = {'ok': True, 'result': handle_request(api_key, request)}
+                    dart.metrics.incr(f"daemon_{request.get('cmd')}")
+                except Exception as e:
+                    response = {'ok': False, 'error': str(e)}
+                    dart.metrics.incr('daemon_errors')
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                self.wfile.flush()
+
+    if family == socket.AF_INET:
+        base = socketserver.ThreadingTCPServer
+    else:
+        base = socketserver.ThreadingUnixStreamServer
+        if os.path.exists(address):
+            # 이전 데몬이 남긴 소켓 파일은 지우고, 실행 중인 데몬이 있으면 중복 실행하지 않습니다
+            if daemon_request(spec, {'cmd': 'ping'}, timeout=DAEMON_CONNECT_TIMEOUT) is not None:
+                raise OSError(f"이미 조회 데몬이 실행 중입니다: {spec}")
+            os.remove(address)
+
+    class Server(base):
+        daemon_threads = True
+        allow_reuse_address = True
+
+    with Server(address, Handler) as server:
+        if family != socket.AF_INET:
+            os.chmod(address, 0o600)
+        # 첫 요청이 기다리지 않도록 고유번호 색인과 pandas를 미리 불러 둡니다
+        dart.get_company_codes(api_key or "", verbose=False)
+        dart.pd.DataFrame
+        # 오래된 고유번호 캐시는 요청 처리와 별도로 백그라운드에서 대조·갱신합니다
+        if api_key:
+            dart.refresh_corp_codes_in_background(api_key)
+        print(f"🛰️ 조회 데몬 실행 중: {spec} (pid {os.getpid()}, 종료: Ctrl+C)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("👋 조회 데몬을 종료합니다.")
+        finally:
+            if family != socket.AF_INET and os.path.exists(address):
+                os.remove(address)
+
+def serve_main(argv: List[str]) -> int:
+    """
+    조회 데몬 실행 함수: 고유번호 색인과 pandas를 메모리에 유지한 채 lookup/fetch 요청을 처리합니다.
+    """
+    parser = argparse.ArgumentParser(prog="dart_cli.py serve",
+                                     description="고유번호 조회/재무정보 수집 요청을 로컬 소켓으로 처리하는 데몬을 실행합니다.")
+    parser.add_argument('--socket', default=DAEMON_SOCKET or "dart_daemon.sock",
+                        help="유닉스 소켓 경로 또는 127.0.0.1:포트 (기본값: DART_DAEMON_SOCKET 또는 dart_daemon.sock)")
+    args = parser.parse_args(argv)
+
+    api_key = load_api_key()
+    if not api_key:
+        print("⚠️ DART_API_KEY가 없어 고유번호 캐시 파일로만 조회합니다 (fetch 요청은 실패합니다).")
+    try:
+        serve(args.socket, api_key)
+    except (OSError, ValueError) as e:
+        print(f"❌ 조회 데몬을 시작하지 못했습니다: {e}")
+        return EXIT_ERROR
+    return EXIT_OK
+
+def refresh_main(argv: List[str]) -> int:
+    """
+    고유번호 캐시를 DART 원본과 대조해 갱신합니다. 캐시가 없으면 새로 내려받습니다.
+    """
+    parser = argparse.ArgumentParser(prog="dart_cli.py refresh",
+                                     description="고유번호 캐시를 최신 corpCode.xml과 대조해 갱신합니다.")
+    parser.add_argument('--if-stale', action='store_true',
+                        help="DART_CORP_CODES_MAX_AGE 이내에 대조한 캐시면 건너뜀")
+    args = parser.parse_args(argv)
+
+    import dart_api_test as dart
+
+    api_key = load_api_key()
+    if not api_key:
+        print("❌ DART_API_KEY가 필요합니다.", file=sys.stderr)
+        return EXIT_ERROR
+    if args.if_stale and dart.is_corp_index_fresh():
+        print("✅ 고유번호 캐시가 최신입니다.", file=sys.stderr)
+        return EXIT_OK
+    if dart.corp_codes_age() is None:
+        ok = dart.get_company_codes(api_key) is not None
+    else:
+        try:
+            ok = dart.refresh_corp_codes(api_key) is not None
+        except (dart.DartApiError, dart.DartQuotaExceeded) as e:
+            print(f"❌ 고유번호 갱신 실패: {e}", file=sys.stderr)
+            return EXIT_ERROR
+    if not ok:
+        print("❌ 고유번호 목록을 받지 못했습니다.", file=sys.stderr)
+        return EXIT_ERROR
+    return EXIT_OK
+
+COMMANDS = {'lookup': lookup_main, 'fetch': fetch_main, 'serve': serve_main, 'refresh': refresh_main}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(f"사용법: python dart_cli.py {{{','.join(COMMANDS)}}} ... (명령별 도움말: -h)", file=sys.stderr)
+        return EXIT_ERROR
+    return COMMANDS[argv[0]](argv[1:])
+
+if __name__ == "__main__":
+    sys.exit(main())
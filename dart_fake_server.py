@@ -0,0 +1,428 @@
+"""
+Open DART API를 흉내 내는 로컬 대역 서버입니다 (API 키와 네트워크 없이 수집 경로를 측정/점검할 때 사용).
+
+corpCode.xml, fnlttSinglAcntAll.json, fnlttMultiAcnt.json을 합성 데이터 또는 기록된 응답으로 제공하며,
+응답 지연, HTTP 오류, DART 오류 상태(800), 요청 제한(020)을 비율이나 분당 한도로 주입할 수 있습니다.
+
+    python dart_fake_server.py --port 8765 --companies 3000 --latency 0.05 --error-rate 0.01
+    DART_API_BASE=http://127.0.0.1:8765/api DART_API_KEY=test python dart_api_test.py
+"""
+import argparse
+import io
+import json
+import random
+import sqlite3
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+# 보고서코드 -> (보고기간 종료 월, 일, 법정 제출기한 일수) - dart_api_test.REPORT_PERIODS와 동일
+REPORT_PERIODS = {
+    '11013': (3, 31, 45),
+    '11012': (6, 30, 45),
+    '11014': (9, 30, 45),
+    '11011': (12, 31, 90),
+}
+FS_NAMES = {'CFS': '연결재무제표', 'OFS': '재무제표'}
+
+# 합성 재무제표의 표준 계정 (재무제표구분, account_id, account_nm) - 손익 계정은 분기 금액, 사업보고서는 연간 누적
+STATEMENT_ACCOUNTS = [
+    ('BS', 'ifrs-full_CurrentAssets', '유동자산'),
+    ('BS', 'ifrs-full_CashAndCashEquivalents', '현금및현금성자산'),
+    ('BS', 'ifrs-full_NoncurrentAssets', '비유동자산'),
+    ('BS', 'ifrs-full_Assets', '자산총계'),
+    ('BS', 'ifrs-full_CurrentLiabilities', '유동부채'),
+    ('BS', 'ifrs-full_Liabilities', '부채총계'),
+    ('BS', 'ifrs-full_IssuedCapital', '자본금'),
+    ('BS', 'ifrs-full_RetainedEarnings', '이익잉여금'),
+    ('BS', 'ifrs-full_Equity', '자본총계'),
+    ('IS', 'ifrs-full_Revenue', '매출액'),
+    ('IS', 'ifrs-full_CostOfSales', '매출원가'),
+    ('IS', 'ifrs-full_GrossProfit', '매출총이익'),
+    ('IS', 'dart_TotalSellingGeneralAdministrativeExpenses', '판매비와관리비'),
+    ('IS', 'dart_OperatingIncomeLoss', '영업이익'),
+    ('IS', 'ifrs-full_ProfitLossBeforeTax', '법인세차감전 순이익'),
+    ('IS', 'ifrs-full_ProfitLoss', '당기순이익'),
+]
+# 다중회사 주요계정 API가 돌려주는 계정
+MULTI_ACCOUNT_NAMES = {'유동자산', '비유동자산', '자산총계', '유동부채', '부채총계', '자본금', '이익잉여금',
+                       '자본총계', '매출액', '영업이익', '법인세차감전 순이익', '당기순이익'}
+
+NAME_PREFIXES = ['삼성', '현대', '엘지', '에스케이', '한화', '롯데', '포스코', '대한', '한국', '동아',
+                 '신세계', '코리아', '제일', '대우', '미래', '한솔', '동원', '태광', '세아', '효성']
+NAME_SUFFIXES = ['전자', '화학', '건설', '제약', '바이오', '중공업', '금융지주', '에너지', '물산', '통신',
+                 '반도체', '소재', '식품', '해운', '증권', '생명', '테크', '로직스', '엔지니어링', '홀딩스']
+
+def period_filed(year: int, report_code: str, today: Optional[date] = None) -> bool:
+    """
+    보고기간 종료일 + 제출기한이 지나 해당 보고서가 공시되었다고 볼 수 있는지 확인합니다.
+    """
+    month, day, deadline_days = REPORT_PERIODS[report_code]
+    return (today or datetime.now().date()) > date(int(year), month, day) + timedelta(days=deadline_days)
+
+def synthetic_companies(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    corpCode.xml 항목과 같은 형태의 합성 기업 목록을 만듭니다 (약 40%는 상장사로 종목코드 보유).
+    검색 경로를 확인할 수 있도록 '삼성전자'(00126380)가 항상 포함됩니다.
+    """
+    rng = random.Random(seed)
+    companies = [{'corp_code': '00126380', 'corp_name': '삼성전자', 'corp_eng_name': 'SAMSUNG ELECTRONICS CO,.LTD',
+                  'stock_code': '005930', 'modify_date': '20240101'}]
+    used_names = {'삼성전자'}
+    used_codes = {'00126380'}
+    while len(companies) < count:
+        name = rng.choice(NAME_PREFIXES) + rng.choice(NAME_SUFFIXES)
+        if name in used_names:
+            name += str(rng.randint(1, 999))
+        code = f"{rng.randint(100000, 1999999):08d}"
+        if name in used_names or code in used_codes:
+            continue
+        used_names.add(name)
+        used_codes.add(code)
+        listed = rng.random() < 0.4
+        companies.append({
+            'corp_code': code,
+            'corp_name': name,
+            'corp_eng_name': f"FAKE CORP {len(companies)}",
+            'stock_code': f"{rng.randint(0, 999999):06d}" if listed else '',
+            'modify_date': f"20{rng.randint(15, 24):02d}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+        })
+    return companies
+
+def build_corp_code_zip(companies: List[Dict[str, str]]) -> bytes:
+    """
+    기업 목록으로 DART와 같은 구조의 CORPCODE.xml 압축 파일을 만듭니다.
+    """
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<result>']
+    for company in companies:
+        lines.append('<list>' + ''.join(
+            f"<{field}>{escape(company.get(field, ''))}</{field}>"
+            for field in ('corp_code', 'corp_name', 'corp_eng_name', 'stock_code', 'modify_date')
+        ) + '</list>')
+    lines.append('</result>')
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr('CORPCODE.xml', '\n'.join(lines))
+    return buf.getvalue()
+
+def _format_amount(value: int) -> str:
+    return f"{value:,}"
+
+def synthetic_statement(corp_code: str, year: int, report_code: str, fs_div: str,
+                        extra_accounts: int = 40, seed: int = 0, has_cfs: bool = True) -> dict:
+    """
+    (고유번호, 사업연도, 보고서코드, 구분) 단위의 fnlttSinglAcntAll 응답을 결정적으로 합성합니다.
+    같은 인자에는 항상 같은 금액을 돌려주며, 사업보고서의 손익 계정은 1~4분기 합계(연간 누적)입니다.
+    연결재무제표가 없는 기업의 CFS 요청과 약 3%의 보고서는 '데이터 없음'(013)입니다.
+    """
+    if (fs_div == 'CFS' and not has_cfs) or not period_filed(year, report_code):
+        return {'status': '013', 'message': '조회된 데이타가 없습니다.'}
+    if random.Random(f"{seed}:{corp_code}:{year}:{report_code}:{fs_div}:missing").random() < 0.03:
+        return {'status': '013', 'message': '조회된 데이타가 없습니다.'}
+
+    quarter = {'11013': 0, '11012': 1, '11014': 2, '11011': 3}[report_code]
+    quarter_revenue: Dict[int, List[int]] = {}
+    for target_year in (year, year - 1, year - 2):
+        rng = random.Random(f"{seed}:{corp_code}:{target_year}:{fs_div}")
+        base = rng.randint(10 ** 9, 10 ** 12)
+        quarter_revenue[target_year] = [int(base * rng.uniform(0.85, 1.15)) for _ in range(4)]
+
+    def amount(target_year: int, sj_div: str, ratio: float) -> int:
+        revenue = quarter_revenue[target_year]
+        if sj_div == 'IS':
+            value = sum(revenue) if report_code == '11011' else revenue[quarter]
+        else:
+            value = sum(revenue[:quarter + 1]) * 2
+        return int(value * ratio)
+
+    rng = random.Random(f"{seed}:{corp_code}:{fs_div}:ratios")
+    margin = rng.uniform(-0.05, 0.25)
+    ratios = {
+        '매출액': 1.0, '매출원가': 0.7, '매출총이익': 0.3, '판매비와관리비': 0.3 - margin, '영업이익': margin,
+        '법인세차감전 순이익': margin * 0.95, '당기순이익': margin * 0.75,
+    }
+
+    rcept_no = f"{year + (report_code == '11011')}{rng.randint(10 ** 9, 10 ** 10 - 1)}"
+    rows = []
+    accounts = STATEMENT_ACCOUNTS + [('IS', '-표준계정코드 미사용-', f"기타손익항목{i}") for i in range(extra_accounts)]
+    for order, (sj_div, account_id, account_nm) in enumerate(accounts, start=1):
+        ratio = ratios.get(account_nm, rng.uniform(0.01, 0.5))
+        rows.append({
+            'rcept_no': rcept_no,
+            'reprt_code': report_code,
+            'bsns_year': str(year),
+            'corp_code': corp_code,
+            'sj_div': sj_div,
+            'sj_nm': '재무상태표' if sj_div == 'BS' else '손익계산서',
+            'account_id': account_id,
+            'account_nm': account_nm,
+            'account_detail': '-',
+            'thstrm_nm': f"제 {year - 1968} 기",
+            'thstrm_amount': _format_amount(amount(year, sj_div, ratio)),
+            'frmtrm_nm': f"제 {year - 1969} 기",
+            'frmtrm_amount': _format_amount(amount(year - 1, sj_div, ratio)),
+            'bfefrmtrm_nm': f"제 {year - 1970} 기",
+            'bfefrmtrm_amount': _format_amount(amount(year - 2, sj_div, ratio)),
+            'ord': str(order),
+            'currency': 'KRW',
+        })
+    return {'status': '000', 'message': '정상', 'list': rows}
+
+class FakeDartServer:
+    """
+    ThreadingHTTPServer 기반의 Open DART 대역 서버입니다.
+    start()로 백그라운드 스레드에서 실행하거나 with 문으로 사용하며, base_url을 DART_API_BASE로 지정하면 됩니다.
+    corp_zip을 주면 기록된 corpCode.zip을, replay_cache를 주면 dart_api_test의 응답 캐시(SQLite)에 기록된
+    실제 응답을 제공합니다 (캐시에 없는 요청은 '데이터 없음'). 둘 다 없으면 합성 데이터를 사용합니다.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, companies: int = 3000, accounts: int = 40,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 status_error_rate: float = 0.0, rate_limit_rate: float = 0.0, per_minute_limit: int = 0,
+                 corp_zip: Optional[str] = None, replay_cache: Optional[str] = None, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.status_error_rate = status_error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.per_minute_limit = per_minute_limit
+        self.accounts = accounts
+        self.seed = seed
+
+        self.companies = synthetic_companies(companies, seed)
+        self.has_cfs = {c['corp_code']: random.Random(f"{seed}:{c['corp_code']}:cfs").random() < 0.6
+                        for c in self.companies}
+        self.stock_codes = {c['corp_code']: c['stock_code'] for c in self.companies}
+        if corp_zip:
+            with open(corp_zip, 'rb') as f:
+                self.corp_zip = f.read()
+        else:
+            self.corp_zip = build_corp_code_zip(self.companies)
+
+        self._replay = None
+        if replay_cache:
+            self._replay = sqlite3.connect(f"file:{replay_cache}?mode=ro", uri=True, check_same_thread=False)
+        self._replay_lock = threading.Lock()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent: deque = deque()
+        self.reset_stats()
+
+        self._httpd = ThreadingHTTPServer((host, port), _FakeDartHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {'requests': 0, 'bytes_sent': 0, 'by_endpoint': {},
+                           'injected': {'http_error': 0, 'status_error': 0, 'rate_limited': 0}}
+
+    def stats(self) -> dict:
+        """
+        지금까지 받은 요청 수(엔드포인트별), 보낸 바이트 수, 주입한 오류 수를 반환합니다.
+        """
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def start(self) -> 'FakeDartServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-dart", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._replay is not None:
+            self._replay.close()
+
+    def serve_forever(self) -> None:
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self) -> 'FakeDartServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def statement(self, corp_code: str, year: int, report_code: str, fs_div: str) -> dict:
+        if self._replay is not None:
+            with self._replay_lock:
+                row = self._replay.execute(
+                    "SELECT payload FROM responses"
+                    " WHERE corp_code = ? AND bsns_year = ? AND reprt_code = ? AND fs_div = ?",
+                    (corp_code, int(year), report_code, fs_div)
+                ).fetchone()
+            if row is None:
+                return {'status': '013', 'message': '조회된 데이타가 없습니다.'}
+            return json.loads(zlib.decompress(row[0]))
+        return synthetic_statement(corp_code, year, report_code, fs_div, self.accounts, self.seed,
+                                   self.has_cfs.get(corp_code, True))
+
+    def multi_accounts(self, corp_codes: List[str], year: int, report_code: str) -> dict:
+        rows = []
+        for corp_code in corp_codes:
+            for fs_div in ('CFS', 'OFS'):
+                data = self.statement(corp_code, year, report_code, fs_div)
+                for row in data.get('list') or []:
+                    if row.get('account_nm') not in MULTI_ACCOUNT_NAMES:
+                        continue
+                    rows.append({
+                        'rcept_no': row.get('rcept_no', ''), 'bsns_year': str(year), 'corp_code': corp_code,
+                        'stock_code': self.stock_codes.get(corp_code, ''), 'reprt_code': report_code,
+                        'account_nm': row['account_nm'], 'fs_div': fs_div, 'fs_nm': FS_NAMES[fs_div],
+                        'sj_div': row.get('sj_div', ''), 'sj_nm': row.get('sj_nm', ''),
+                        'thstrm_amount': row.get('thstrm_amount', ''),
+                        'frmtrm_amount': row.get('frmtrm_amount', ''),
+                        'bfefrmtrm_amount': row.get('bfefrmtrm_amount', ''),
+                        'ord': row.get('ord', ''), 'currency': row.get('currency', 'KRW'),
+                    })
+        if not rows:
+            return {'status': '013', 'message': '조회된 데이타가 없습니다.'}
+        return {'status': '000', 'message': '정상', 'list': rows}
+
+    def inject_fault(self) -> Optional[str]:
+        """
+        이번 요청에 주입할 오류 종류('http_error', 'rate_limited', 'status_error')를 정하고 요청 수를 기록합니다.
+        """
+        with self._lock:
+            now = time.monotonic()
+            fault = None
+            if self.per_minute_limit:
+                while self._recent and now - self._recent[0] > 60:
+                    self._recent.popleft()
+                if len(self._recent) >= self.per_minute_limit:
+                    fault = 'rate_limited'
+                else:
+                    self._recent.append(now)
+            if fault is None:
+                roll = self._random.random()
+                if roll < self.error_rate:
+                    fault = 'http_error'
+                elif roll < self.error_rate + self.rate_limit_rate:
+                    fault = 'rate_limited'
+                elif roll < self.error_rate + self.rate_limit_rate + self.status_error_rate:
+                    fault = 'status_error'
+            if fault is not None:
+                self._stats['injected'][fault] += 1
+            return fault
+
+    def record(self, endpoint: str, size: int) -> None:
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['bytes_sent'] += size
+            self._stats['by_endpoint'][endpoint] = self._stats['by_endpoint'].get(endpoint, 0) + 1
+
+    def delay(self) -> None:
+        wait = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if wait > 0:
+            time.sleep(wait)
+
+FAULT_STATUSES = {
+    'rate_limited': ('020', '요청 제한을 초과하였습니다.'),
+    'status_error': ('800', '시스템 점검으로 인한 서비스가 중지 중입니다.'),
+}
+
+class _FakeDartHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 헤더와 본문을 따로 쓰므로 Nagle 알고리즘을 끄지 않으면 keep-alive 요청마다 지연 ACK만큼 늦어집니다
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, endpoint: str) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.fake.record(endpoint, len(body))
+
+    def _send_json(self, data: dict, endpoint: str) -> None:
+        self._send(200, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8', endpoint)
+
+    def do_GET(self) -> None:
+        fake: FakeDartServer = self.server.fake
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        endpoint = url.path.rsplit('/', 1)[-1]
+
+        if endpoint == 'stats':
+            self._send_json(fake.stats(), endpoint)
+            return
+        if endpoint not in ('corpCode.xml', 'fnlttSinglAcntAll.json', 'fnlttMultiAcnt.json'):
+            self._send(404, b'', 'text/plain', endpoint)
+            return
+
+        fake.delay()
+        fault = fake.inject_fault()
+        if fault == 'http_error':
+            self._send(500, b'', 'text/plain', endpoint)
+            return
+        if fault is not None:
+            status, message = FAULT_STATUSES[fault]
+            if endpoint == 'corpCode.xml':
+                body = f"<result><status>{status}</status><message>{message}</message></result>".encode('utf-8')
+                self._send(200, body, 'application/xml; charset=utf-8', endpoint)
+            else:
+                self._send_json({'status': status, 'message': message}, endpoint)
+            return
+
+        if endpoint == 'corpCode.xml':
+            self._send(200, fake.corp_zip, 'application/x-msdownload', endpoint)
+        elif endpoint == 'fnlttSinglAcntAll.json':
+            data = fake.statement(params.get('corp_code', ''), int(params.get('bsns_year', 0)),
+                                  params.get('reprt_code', ''), params.get('fs_div', ''))
+            self._send_json(data, endpoint)
+        else:
+            corp_codes = [code for code in params.get('corp_code', '').split(',') if code]
+            data = fake.multi_accounts(corp_codes, int(params.get('bsns_year', 0)), params.get('reprt_code', ''))
+            self._send_json(data, endpoint)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Open DART 로컬 대역 서버")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--companies', type=int, default=3000, help="합성 기업 수 (기본값 3000)")
+    parser.add_argument('--accounts', type=int, default=40, help="재무제표 응답에 덧붙일 기타 계정 수 (기본값 40)")
+    parser.add_argument('--latency', type=float, default=0.0, help="응답 지연(초)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="응답 지연에 더할 무작위 지연의 최대값(초)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="HTTP 500 응답 비율")
+    parser.add_argument('--status-error-rate', type=float, default=0.0, help="DART 오류(800) 응답 비율")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="요청 제한(020) 응답 비율")
+    parser.add_argument('--per-minute-limit', type=int, default=0, help="분당 허용 요청 수 (초과 시 020, 0이면 제한 없음)")
+    parser.add_argument('--corp-zip', help="제공할 corpCode.zip 파일 (기록된 원본)")
+    parser.add_argument('--replay-cache', help="응답을 재생할 dart_api_test 응답 캐시(SQLite) 파일")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FakeDartServer(args.host, args.port, args.companies, args.accounts, args.latency, args.jitter,
+                            args.error_rate, args.status_error_rate, args.rate_limit_rate, args.per_minute_limit,
+                            args.corp_zip, args.replay_cache, args.seed)
+    print(f"🧪 Open DART 대역 서버 실행 중: {server.base_url} (종료: Ctrl+C)")
+    print(f"   DART_API_BASE={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 요청 통계: {json.dumps(server.stats(), ensure_ascii=False)}")
+
+if __name__ == "__main__":
+    main()
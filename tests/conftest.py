@@ -0,0 +1,48 @@
+"""
+dart_api_test 테스트 공통 설정: API 키와 네트워크 없이 dart_fake_server의 로컬 대역 서버로 요청을 보냅니다.
+"""
+import os
+import sys
+
+import pytest
+
+# 모듈 import 시점에 읽는 경로 설정은 import 전에 비워 둡니다 (요청 원장/응답 캐시를 만들지 않음)
+os.environ['DART_QUOTA_DB'] = ''
+os.environ['DART_RESPONSE_CACHE'] = ''
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dart_api_test as dart  # noqa: E402
+from dart_fake_server import FakeDartServer  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def fake_server():
+    with FakeDartServer(latency=0, companies=300, seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def dart_env(fake_server, tmp_path, monkeypatch):
+    """
+    임시 작업 디렉터리에서 대역 서버를 바라보도록 dart_api_test의 전역 설정과 공유 객체를 초기화합니다.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dart, 'DART_API_BASE', fake_server.base_url)
+    monkeypatch.setattr(dart, 'RESPONSE_CACHE_FILE', '')
+    monkeypatch.setattr(dart, 'TIMESERIES_DB_FILE', '')
+    monkeypatch.setattr(dart, 'SCREENING_DB_FILE', '')
+    monkeypatch.setattr(dart, 'rate_limiter', dart.RateLimiter(0, 0, ledger_path=''))
+    monkeypatch.setattr(dart, '_corp_indexes', {})
+    monkeypatch.setattr(dart, '_response_cache', None)
+    monkeypatch.setattr(dart, '_timeseries_store', None)
+    monkeypatch.setattr(dart, '_screening_index', None)
+    fake_server.reset_stats()
+    return dart
+
+
+@pytest.fixture
+def listed_codes(fake_server):
+    """
+    대역 서버의 상장사 고유번호 (삼성전자 포함).
+    """
+    return [c['corp_code'] for c in fake_server.companies if c['stock_code']][:4]
@@ -0,0 +1,127 @@
+"""
+derived_metrics의 증감률·TTM·이익률을 손으로 계산한 작은 표와 비교하고, 여러 프로세스로 나눠 계산해도 결과가 같은지 확인합니다.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import dart_analytics
+
+# 고유번호 -> 구분 -> 항목 -> {(년도, 분기): 금액} (4분기는 보정 후 값)
+FILINGS = {
+    '00000001': {
+        '연결': {'매출액': {(2023, 1): 100, (2023, 2): 120, (2023, 3): 90, (2023, 4): 110, (2024, 1): 150},
+                 '영업이익': {(2023, 1): 10, (2023, 2): 12, (2023, 3): 9, (2023, 4): -11, (2024, 1): 30},
+                 '자산총계': {(2023, 1): 1000, (2023, 2): 1100, (2023, 3): 1200, (2023, 4): 1300, (2024, 1): 1400}},
+        # 연결이 있는 기업의 별도 값은 쓰지 않습니다
+        '별도': {'매출액': {(2023, 1): 1, (2024, 1): 2}},
+    },
+    # 별도만 있는 기업: 2023년 반기가 없어 4분기 보정이 불완전하고, 4분기 매출액이 0입니다
+    '00000002': {
+        '별도': {'매출액': {(2023, 1): 50, (2023, 3): 60, (2023, 4): 0, (2024, 1): 40},
+                 '영업이익': {(2023, 1): 5, (2023, 3): 6, (2023, 4): 1, (2024, 1): 4}},
+    },
+}
+
+
+def collected_frame(filings=FILINGS) -> pd.DataFrame:
+    rows = [{'corp_code': corp_code, '구분': fs_div, '년도': year, '분기': quarter, '항목': item,
+             'thstrm_amount': amount}
+            for corp_code, divs in filings.items() for fs_div, items in divs.items()
+            for item, amounts in items.items() for (year, quarter), amount in amounts.items()]
+    # 결측 금액 행은 없는 값으로 취급합니다
+    rows.append({'corp_code': '00000001', '구분': '연결', '년도': 2022, '분기': 4, '항목': '매출액',
+                 'thstrm_amount': None})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(scope='module')
+def result():
+    metrics = dart_analytics.derived_metrics(collected_frame())
+    return metrics.set_index(['corp_code', '년도', '분기'])
+
+
+def test_rows_are_sorted_and_consolidated_first(result):
+    assert result.index.tolist() == [('00000001', 2023, 1), ('00000001', 2023, 2), ('00000001', 2023, 3),
+                                     ('00000001', 2023, 4), ('00000001', 2024, 1), ('00000002', 2023, 1),
+                                     ('00000002', 2023, 3), ('00000002', 2023, 4), ('00000002', 2024, 1)]
+    assert result.loc['00000001', '구분'].unique().tolist() == ['연결']
+    assert result.loc['00000002', '구분'].unique().tolist() == ['별도']
+
+
+def test_growth_ttm_and_margins(result):
+    row = result.loc[('00000001', 2024, 1)]
+    assert row['매출액_QoQ'] == pytest.approx((150 - 110) / 110 * 100)
+    assert row['매출액_YoY'] == pytest.approx(50.0)
+    # 이전 값이 적자여도 개선되면 양수입니다 (절댓값으로 나눔)
+    assert row['영업이익_QoQ'] == pytest.approx((30 + 11) / 11 * 100)
+    assert row['매출액_TTM'] == 120 + 90 + 110 + 150
+    assert row['영업이익_TTM'] == 12 + 9 - 11 + 30
+    assert row['영업이익률'] == pytest.approx(20.0)
+    # 이익률 변화는 %p 차이입니다
+    assert row['영업이익률_QoQ'] == pytest.approx(20.0 - (-10.0))
+    assert row['영업이익률_YoY'] == pytest.approx(20.0 - 10.0)
+    assert row['영업이익률_TTM'] == pytest.approx(40 / 470 * 100)
+    assert result.loc[('00000001', 2023, 4), '매출액_TTM'] == 420
+    # 1년 전 TTM은 2022년 분기가 없어 계산할 수 없습니다
+    assert np.isnan(row['매출액_TTM_YoY']) and np.isnan(row['영업이익률_TTM_YoY'])
+
+
+def test_stock_items_have_growth_but_no_ttm(result):
+    assert result.loc[('00000001', 2024, 1), '자산총계_YoY'] == pytest.approx(40.0)
+    assert '자산총계_TTM' not in result.columns
+    # 순이익률은 당기순이익이 없으므로 컬럼이 없습니다
+    assert '순이익률' not in result.columns
+
+
+def test_missing_quarters_and_zero_base_are_nan(result):
+    company = result.loc['00000002']
+    # 반기가 없으므로 3분기 QoQ를 1분기와 비교하지 않고, 반기를 포함하는 TTM은 모두 결측입니다
+    assert np.isnan(company.loc[(2023, 3), '매출액_QoQ'])
+    assert company[['매출액_TTM', '영업이익_TTM', '영업이익률_TTM']].isna().all().all()
+    # 이전 값이 0이면 증감률, 매출액이 0이면 이익률이 결측입니다
+    assert np.isnan(company.loc[(2024, 1), '매출액_QoQ'])
+    assert np.isnan(company.loc[(2023, 4), '영업이익률'])
+    assert np.isnan(company.loc[(2024, 1), '영업이익률_QoQ'])
+    assert company.loc[(2024, 1), '매출액_YoY'] == pytest.approx(-20.0)
+    assert company.loc[(2024, 1), '영업이익률_YoY'] == pytest.approx(0.0)
+
+
+def test_incomplete_q4_keys():
+    keys = dart_analytics._incomplete_q4_keys(collected_frame().dropna(subset=['thstrm_amount']))
+    assert keys == {('00000002', 2023, '매출액', '별도'), ('00000002', 2023, '영업이익', '별도')}
+
+
+def random_filings(companies: int, seed: int) -> pd.DataFrame:
+    """
+    기업마다 항목 구성·구분·빠진 분기가 다른 수집 결과.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in range(companies):
+        corp_code = f"{n * 7919 % 10**8:08d}"
+        items = ['매출액', '영업이익'] + (['당기순이익'] if n % 3 == 0 else []) + (['자산총계'] if n % 4 == 0 else [])
+        for fs_div in (('연결', '별도') if n % 2 else ('별도',)):
+            for year in (2022, 2023, 2024):
+                for quarter in (1, 2, 3, 4):
+                    if rng.random() < 0.1:
+                        continue
+                    for item in items:
+                        rows.append({'corp_code': corp_code, '구분': fs_div, '년도': year, '분기': quarter,
+                                     '항목': item, 'thstrm_amount': float(rng.integers(-10**6, 10**8))})
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('consolidated_first', [True, False])
+def test_workers_match_single_process(consolidated_first):
+    df = random_filings(24, seed=5)
+    single = dart_analytics.derived_metrics(df, workers=1, consolidated_first=consolidated_first)
+    parallel = dart_analytics.derived_metrics(df, workers=3, consolidated_first=consolidated_first)
+    pd.testing.assert_frame_equal(parallel, single)
+
+
+def test_single_company_needs_corp_code():
+    frame = collected_frame({'00000001': FILINGS['00000001']}).drop(columns='corp_code')
+    with pytest.raises(ValueError):
+        dart_analytics.derived_metrics(frame)
+    assert dart_analytics.derived_metrics(frame, corp_code='1')['corp_code'].unique().tolist() == ['00000001']
@@ -0,0 +1,74 @@
+"""
+AsyncDartClient가 같은 수집을 함께 기다리는지, 한 호출의 시간 초과가 다른 호출에 번지지 않는지,
+기다리는 호출이 모두 떠나면 남은 요청을 건너뛰는지 대역 서버로 확인합니다.
+"""
+import asyncio
+
+import pytest
+
+import dart_api_test as dart
+from dart_async import AsyncDartClient
+
+STATEMENT_ENDPOINT = 'fnlttSinglAcntAll.json'
+SAMSUNG = '00126380'
+
+
+def statement_requests(fake_server) -> int:
+    return fake_server.stats()['by_endpoint'].get(STATEMENT_ENDPOINT, 0)
+
+
+def test_concurrent_collects_share_requests(dart_env, fake_server, monkeypatch):
+    expected = dart.collect_quarterly_financials('k', SAMSUNG, 2024, 202412, verbose=False)
+    single = statement_requests(fake_server)
+    fake_server.reset_stats()
+    dart.metrics.reset()
+    monkeypatch.setattr(fake_server, 'latency', 0.02)
+
+    async def run():
+        async with AsyncDartClient('k') as client:
+            return await asyncio.gather(*(client.collect_quarterly_financials(SAMSUNG, 2024, 202412)
+                                          for _ in range(3)))
+
+    results = asyncio.run(run())
+    # 세 호출이 한 번의 수집을 함께 기다리므로 요청 수는 한 번 수집한 것과 같습니다
+    assert statement_requests(fake_server) == single
+    assert dart.metrics.summary()['counters']['async_shared_calls'] == 2
+    for result in results:
+        assert result['frame'].equals(expected) and result['fetch_errors'] == []
+    # 호출마다 별도 사본을 받습니다
+    assert results[0]['frame'] is not results[1]['frame']
+
+
+def test_timeout_does_not_cancel_other_waiter(dart_env, fake_server, monkeypatch):
+    expected = dart.collect_quarterly_financials('k', SAMSUNG, 2024, 202412, verbose=False)
+    monkeypatch.setattr(fake_server, 'latency', 0.05)
+
+    async def run():
+        async with AsyncDartClient('k', fetch_workers=2) as client:
+            patient = asyncio.ensure_future(client.collect_quarterly_financials(SAMSUNG, 2024, 202412))
+            with pytest.raises(asyncio.TimeoutError):
+                await client.collect_quarterly_financials(SAMSUNG, 2024, 202412, timeout=0.01)
+            return await patient
+
+    result = asyncio.run(run())
+    assert result['frame'].equals(expected)
+
+
+def test_last_waiter_leaving_skips_unsent_requests(dart_env, fake_server, monkeypatch):
+    dart.collect_quarterly_financials('k', SAMSUNG, 2024, 202412, verbose=False)
+    single = statement_requests(fake_server)
+    fake_server.reset_stats()
+    dart.metrics.reset()
+    monkeypatch.setattr(fake_server, 'latency', 0.05)
+    client = AsyncDartClient('k', fetch_workers=1)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await client.collect_quarterly_financials(SAMSUNG, 2024, 202412, timeout=0.08)
+
+    asyncio.run(run())
+    # 수집 스레드가 끝날 때까지 기다린 뒤 보낸 요청 수를 셉니다 (남은 보고서는 요청하지 않고 취소로 끝남)
+    client._pool.shutdown(wait=True)
+    client.close()
+    assert 0 < statement_requests(fake_server) < single
+    assert dart.metrics.summary()['counters']['async_cancelled'] == 1
@@ -0,0 +1,65 @@
+"""
+배치 수집(run_batch)이 기업별 단독 수집과 같은 결과를 쓰고, 모든 요청이 전역 요청 한도(토큰 버킷, 일일 한도)를 거치는지 확인합니다.
+"""
+import time
+
+import pandas as pd
+
+import dart_api_test as dart
+
+STATEMENT_ENDPOINT = 'fnlttSinglAcntAll.json'
+
+
+def counting_limiter(per_minute=0, per_day=10 ** 6):
+    return dart.RateLimiter(per_minute, per_day, ledger_path='', keys=[], interactive_reserve=0)
+
+
+def test_batch_matches_single_collects(dart_env, fake_server, listed_codes, tmp_path, monkeypatch):
+    expected = {corp_code: dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False)
+                for corp_code in listed_codes}
+    limiter = counting_limiter(per_minute=60000)
+    monkeypatch.setattr(dart, 'rate_limiter', limiter)
+    fake_server.reset_stats()
+
+    output = tmp_path / 'batch.csv'
+    summary = dart.run_batch('k', listed_codes, 2024, 202412, str(output), company_workers=3, fetch_workers=4)
+    assert summary['ok'] == len(listed_codes) and summary['failed'] == 0
+
+    written = pd.read_csv(output, dtype={'corp_code': str, '입력값': str}, encoding='utf-8-sig')
+    # 결과는 끝나는 순서대로 쓰이지만 기업별 행은 단독 수집과 같습니다
+    assert sorted(written['corp_code'].unique()) == sorted(listed_codes)
+    for corp_code, df in expected.items():
+        rows = written[written['corp_code'] == corp_code].drop(columns=['corp_code', '입력값'])
+        pd.testing.assert_frame_equal(rows.reset_index(drop=True), df.reset_index(drop=True), check_dtype=False)
+    # 고유번호 목록을 포함한 모든 요청이 요청 한도를 거칩니다
+    assert limiter.usage_today('k') == {'k': fake_server.stats()['requests']}
+
+
+def test_batch_stops_at_daily_cap(dart_env, fake_server, listed_codes, tmp_path, monkeypatch, capsys):
+    assert dart.get_company_codes('k', verbose=False)
+    dart.collect_quarterly_financials('k', listed_codes[0], 2024, 202412, verbose=False)
+    per_company = fake_server.stats()['by_endpoint'][STATEMENT_ENDPOINT]
+    # 첫 기업은 끝까지, 두 번째 기업은 일부만 요청할 수 있는 한도
+    cap = per_company + 3
+    monkeypatch.setattr(dart, 'rate_limiter', counting_limiter(per_day=cap))
+    fake_server.reset_stats()
+
+    summary = dart.run_batch('k', listed_codes, 2024, 202412, str(tmp_path / 'batch.csv'), company_workers=1)
+    out = capsys.readouterr().out
+    assert '일일 요청 한도' in out and '남은 작업을 중단합니다' in out
+    assert summary['ok'] == 1
+    assert fake_server.stats()['requests'] == cap
+
+
+def test_token_bucket_refills_at_per_minute_rate():
+    # 분당 1200건 = 0.05초마다 토큰 1개. 처음에는 버킷이 가득 차 있어 기다리지 않습니다
+    limiter = counting_limiter(per_minute=1200)
+    start = time.monotonic()
+    for _ in range(1200):
+        limiter.acquire('k')
+    assert time.monotonic() - start < 0.5
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire('k')
+    assert time.monotonic() - start >= 0.25
+    assert limiter.usage_today('k') == {'k': 1206}
@@ -0,0 +1,59 @@
+"""
+collect_quarterly_financials(KeyAccountRows 누적)가 응답마다 DataFrame을 만들어 이어 붙이던 방식과 같은 결과를 내는지
+대역 서버로 확인합니다.
+"""
+import pandas as pd
+import pytest
+
+import dart_api_test as dart
+
+
+def collect_with_frames(corp_code: str, year: int, year_month: int = None) -> pd.DataFrame:
+    """
+    기준 구현: 보고서마다 전체 재무제표를 DataFrame으로 만들어 이어 붙인 뒤 주요 계정만 남깁니다.
+    """
+    frames = []
+    for target_year, _, report_name, report_code, fs_name, fs_code in dart.build_collection_plan(year, year_month):
+        df = dart.get_financial_data('k', corp_code, target_year, report_code, fs_code)
+        if df is None:
+            continue
+        # 원본 행의 corp_code는 예전 결과에도 없었으므로 뺍니다 (기업 구분 컬럼은 다중회사 수집에서만 붙음)
+        df = df.drop(columns='corp_code', errors='ignore')
+        df['보고서명'] = report_name
+        df['구분'] = fs_name
+        df['년도'] = target_year
+        frames.append(df)
+    combined = pd.concat(frames, ignore_index=True)
+    filtered, _ = dart.build_key_account_frame(combined, year_month, log=lambda *args, **kwargs: None)
+    return filtered
+
+
+@pytest.mark.parametrize('year, year_month', [(2024, 202409), (2024, 202412), (2023, None)])
+def test_matches_frame_based_collection(dart_env, listed_codes, year, year_month):
+    for corp_code in listed_codes:
+        expected = collect_with_frames(corp_code, year, year_month)
+        actual = dart.collect_quarterly_financials('k', corp_code, year, year_month, verbose=False)
+        # 금액은 모두 정수이면 int64로 바뀌었을 뿐 값은 같아야 합니다
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False)
+        assert actual.attrs['fetch_errors'] == []
+        assert (dart.format_display_table(actual, corp_code, year_month)
+                == dart.format_display_table(expected, corp_code, year_month))
+
+
+def test_key_account_rows_frame():
+    rows = [
+        {'account_id': 'ifrs-full_Revenue', 'account_nm': '매출액', 'thstrm_amount': '1,234,567'},
+        {'account_id': 'dart_OperatingIncomeLoss', 'account_nm': '영업이익', 'thstrm_amount': '-5,000'},
+    ]
+    collected = dart.KeyAccountRows()
+    collected.extend(rows, '1분기보고서', '연결', 2024)
+    df = collected.to_frame()
+    assert list(df.columns) == list(dart.KEY_ACCOUNT_COLUMNS)
+    assert df['thstrm_amount'].dtype == 'int64'
+    assert df['thstrm_amount'].tolist() == [1234567, -5000]
+
+    collected.extend([dict(rows[0], thstrm_amount='')], '반기보고서', '연결', 2024)
+    df = collected.to_frame()
+    assert df['thstrm_amount'].dtype == 'float64'
+    assert df['thstrm_amount'].isna().tolist() == [False, False, True]
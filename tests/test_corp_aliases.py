@@ -0,0 +1,50 @@
+"""
+법인 형태 표기·공백·전각 문자·영문명·종목코드로 입력한 회사명이 같은 고유번호로 해석되는지 확인합니다.
+"""
+import pytest
+
+import dart_api_test as dart
+
+SAMSUNG = '00126380'
+
+
+@pytest.mark.parametrize('query', [
+    '삼성전자',
+    '(주)삼성전자',
+    '㈜삼성전자',
+    '삼성전자(주)',
+    '삼성전자 주식회사',
+    '주식회사 삼성전자',
+    '  삼성 전자  ',
+    '（주）삼성전자',
+    'ＳＡＭＳＵＮＧ ＥＬＥＣＴＲＯＮＩＣＳ',
+    'SAMSUNG ELECTRONICS CO,.LTD',
+    'Samsung Electronics Co., Ltd.',
+    'samsung electronics',
+    '005930',
+    SAMSUNG,
+])
+def test_alias_resolves(dart_env, query):
+    result = dart.match_company('k', query, verbose=False)
+    assert result['corp_code'] == SAMSUNG
+    assert result['match'] in ('exact', 'alias')
+
+
+def test_normalization():
+    assert dart.normalize_corp_name('（주） 삼성 전자') == dart.normalize_corp_name('삼성전자')
+    assert dart.strip_legal_form('㈜ 삼성전자 주식회사').strip() == '삼성전자'
+    assert dart.normalize_corp_name('SAMSUNG ELECTRONICS CO,.LTD') == dart.normalize_corp_name('Samsung Electronics')
+
+
+def test_unknown_and_partial_queries(dart_env):
+    assert dart.match_company('k', '없는회사xyz', verbose=False)['match'] == 'not_found'
+    assert dart.match_company('k', '삼성전', verbose=False)['match'] in ('partial', 'ambiguous')
+
+
+def test_aliases_survive_snapshot_reload(dart_env, monkeypatch):
+    assert dart.match_company('k', '(주)삼성전자', verbose=False)['corp_code'] == SAMSUNG
+    # 메모리 색인을 비우면 스냅샷(.idx.pkl)에서 별칭 색인을 다시 읽습니다
+    monkeypatch.setattr(dart, '_corp_indexes', {})
+    index = dart.get_corp_index(verbose=False)
+    assert index.resolve('samsung electronics') and index.stock_codes.get('005930')
+    assert dart.match_company('k', '005930', verbose=False)['corp_code'] == SAMSUNG
@@ -0,0 +1,154 @@
+"""
+고유번호 갱신분만 반영한 인덱스(apply_delta)가 같은 목록으로 처음부터 만든 인덱스와 같은 검색 결과를 내는지 확인합니다.
+"""
+import os
+import random
+import time
+
+import dart_api_test as dart
+from dart_fake_server import build_corp_code_zip, synthetic_companies
+
+SAMSUNG = '00126380'
+
+
+def modified_companies(companies, seed=0):
+    """
+    기업 일부를 삭제·개명·상장하고 신규 기업을 더한 목록 (삭제한 기업의 회사명을 신규 기업이 다시 씁니다).
+    """
+    rng = random.Random(seed)
+    others = companies[1:]
+    removed = rng.sample(others, 15)
+    renamed = rng.sample([c for c in others if c not in removed], 15)
+    result = []
+    for company in companies:
+        if company in removed:
+            continue
+        if company in renamed:
+            company = dict(company, corp_name=company['corp_name'] + '홀딩스', stock_code=company['stock_code'] or '123456',
+                           corp_eng_name='RENAMED ' + company['corp_eng_name'], modify_date='20991231')
+        result.append(company)
+    for n, company in enumerate(removed[:5] + [{'corp_name': '신규테크', 'corp_eng_name': 'NEW TECH'}] * 10):
+        result.append({'corp_code': f"{9000000 + n:08d}", 'corp_name': company['corp_name'] + ('' if n < 5 else str(n)),
+                       'corp_eng_name': company['corp_eng_name'], 'stock_code': '', 'modify_date': '20991231'})
+    return result
+
+
+def index_from(companies, cache_file):
+    records = [dart.corp_record(c) for c in companies]
+    eng_names = {c['corp_code']: c['corp_eng_name'] for c in companies if c.get('corp_eng_name')}
+    index = dart.CorpCodeIndex(str(cache_file))
+    index.replace_records(records, eng_names=eng_names)
+    return index, {r[0]: r for r in records}, eng_names
+
+
+def assert_same_results(actual, expected, companies):
+    assert len(actual) == len(expected)
+    assert actual.names == expected.names
+    assert actual.codes == expected.codes
+    assert set(actual.by_code) == set(expected.by_code)
+    for company in companies:
+        name = company['corp_name']
+        for query in (name, name[:2], name[1:3], company['corp_eng_name'], company['stock_code'], company['corp_code']):
+            if not query:
+                continue
+            assert sorted(actual.search(query, limit=None)) == sorted(expected.search(query, limit=None))
+            assert sorted(actual.resolve(query)) == sorted(expected.resolve(query))
+
+
+def test_apply_delta_matches_full_rebuild(tmp_path):
+    before = synthetic_companies(300, seed=3)
+    after = modified_companies(before)
+    index, old, _ = index_from(before, tmp_path / 'delta.json')
+    expected, new, eng_names = index_from(after, tmp_path / 'full.json')
+
+    added = [record for code, record in new.items() if code not in old]
+    changed = [record for code, record in new.items() if code in old and old[code] != record]
+    removed = [code for code in old if code not in new]
+    index.apply_delta(added, changed, removed, eng_names=eng_names)
+
+    assert_same_results(index, expected, before + after)
+    # 삭제된 자리는 신규 기업이 다시 쓰므로 레코드 목록이 늘지 않습니다
+    assert len(index.records) == len(before)
+
+
+def test_refresh_patches_index_and_snapshot(dart_env, fake_server, monkeypatch):
+    assert dart.get_company_codes('k', verbose=False)
+    index = dart.get_corp_index(verbose=False)
+    after = modified_companies(fake_server.companies, seed=1)
+    monkeypatch.setattr(fake_server, 'corp_zip', build_corp_code_zip(after))
+
+    summary = dart.refresh_corp_codes('k')
+    assert summary == {'added': 15, 'changed': 15, 'removed': 15, 'unchanged': len(after) - 30}
+    # 인덱스를 새로 만들지 않고 기존 인덱스를 고칩니다
+    assert dart.get_corp_index(verbose=False) is index
+    assert not index.is_stale()
+
+    expected, _, _ = index_from(after, 'unused.json')
+    assert_same_results(index, expected, fake_server.companies + after)
+    assert dart.match_company('k', 'samsung electronics', verbose=False)['corp_code'] == SAMSUNG
+
+    # 갱신한 스냅샷(.idx.pkl)에서 다시 읽어도 같은 결과입니다
+    monkeypatch.setattr(dart, '_corp_indexes', {})
+    reloaded = dart.get_corp_index(verbose=False)
+    assert reloaded is not index and reloaded.records == index.records
+    assert_same_results(reloaded, expected, after)
+
+
+def test_refresh_without_changes_keeps_index(dart_env):
+    assert dart.get_company_codes('k', verbose=False)
+    index = dart.get_corp_index(verbose=False)
+    records = list(index.records)
+    assert dart.refresh_corp_codes('k') == {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': len(records)}
+    assert dart.get_corp_index(verbose=False) is index and index.records == records
+
+
+
+def age_corp_cache(seconds):
+    """
+    고유번호 캐시와 대조 표시 파일의 mtime을 seconds초 전으로 돌려 오래된 캐시로 만듭니다.
+    """
+    stamp = time.time() - seconds
+    for path in ('company_codes_cache.json', dart._corp_codes_marker('company_codes_cache.json')):
+        os.utime(path, (stamp, stamp))
+
+
+def test_batch_continues_when_refresh_fails(dart_env, fake_server, listed_codes, tmp_path, monkeypatch, capsys):
+    assert dart.get_company_codes('k', verbose=False)
+    age_corp_cache(dart.CORP_CODES_MAX_AGE + 60)
+    assert not dart.is_corp_index_fresh()
+
+    monkeypatch.setattr(dart, 'HTTP_MAX_RETRIES', 0)
+    monkeypatch.setattr(fake_server, 'error_rate', 1.0)
+    summary = dart.run_batch('k', listed_codes, 2024, 202412, str(tmp_path / 'out.csv'))
+    # 갱신은 실패했지만 기존 캐시로 모든 대상을 해석하고 수집을 시도합니다 (수집 요청도 실패)
+    assert '고유번호 갱신 실패' in capsys.readouterr().out
+    assert summary['unresolved'] == {} and summary['total'] == len(listed_codes)
+    assert not dart.is_corp_index_fresh()
+
+
+def test_cli_refresh_reports_errors(dart_env, fake_server, monkeypatch, capsys):
+    import dart_cli
+
+    assert dart.get_company_codes('k', verbose=False)
+    age_corp_cache(dart.CORP_CODES_MAX_AGE + 60)
+    monkeypatch.setenv('DART_API_KEY', 'k')
+    monkeypatch.setattr(dart, 'HTTP_MAX_RETRIES', 0)
+    monkeypatch.setattr(fake_server, 'error_rate', 1.0)
+    assert dart_cli.main(['refresh', '--if-stale']) == dart_cli.EXIT_ERROR
+    assert '고유번호 갱신 실패' in capsys.readouterr().err
+
+    monkeypatch.setattr(fake_server, 'error_rate', 0.0)
+    assert dart_cli.main(['refresh', '--if-stale']) == dart_cli.EXIT_OK
+    assert dart.is_corp_index_fresh()
+
+
+def test_refresh_detects_english_name_changes(dart_env, fake_server, monkeypatch):
+    assert dart.get_company_codes('k', verbose=False)
+    after = [dict(c, corp_eng_name='SAMSUNG ELEC RENAMED') if c['corp_code'] == SAMSUNG else c
+             for c in fake_server.companies]
+    monkeypatch.setattr(fake_server, 'corp_zip', build_corp_code_zip(after))
+
+    assert dart.refresh_corp_codes('k')['changed'] == 1
+    index = dart.get_corp_index(verbose=False)
+    assert [r[0] for r in index.resolve('samsung elec renamed')] == [SAMSUNG]
+    assert index.resolve('samsung electronics') == []
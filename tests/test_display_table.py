@@ -0,0 +1,157 @@
+"""
+format_display_table(피벗·서식 일괄 계산)이 예전 셀 단위 반복 구현과 같은 콘솔 표를 내는지,
+markdown/html/csv 출력과 여러 기업 표가 같은 값을 담는지 확인합니다.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dart_api_test as dart
+
+REPORT_ORDER = ['사업보고서', '1분기보고서', '반기보고서', '3분기보고서']
+REPORT_MONTHS = {'사업보고서': 12, '1분기보고서': 3, '반기보고서': 6, '3분기보고서': 9}
+
+
+def legacy_row(parts) -> str:
+    return " | ".join([f"{parts[0]:<12}" if i == 0 else f"{part:>12}" if i == len(parts) - 1 else f"{part:>10}"
+                       for i, part in enumerate(parts)])
+
+
+def legacy_cell(value) -> str:
+    if value is None or pd.isna(value):
+        return "-"
+    if value == 0:
+        return "0"
+    return f"{int(value):,}"
+
+
+def legacy_margin(revenue, operating) -> str:
+    if revenue is not None and operating is not None and pd.notna(revenue) and pd.notna(operating) and revenue != 0:
+        return f"{(operating / revenue) * 100:.2f}"
+    return "-"
+
+
+def format_display_table_loop(df: pd.DataFrame) -> str:
+    """
+    벡터화 이전의 기준 구현 (pivot_table 후 기간/항목마다 셀을 찾아 서식 적용).
+    """
+    lines = [" " * 25 + "📋 [재무 정보 요약 테이블]", "=" * 80]
+    if '분기' in df.columns:
+        pivot_df = df.pivot_table(index=['년도', '분기'], columns='항목', values='thstrm_amount', aggfunc='first')
+        periods = sorted(df[['년도', '분기']].drop_duplicates().values.tolist())
+        lines += [legacy_row(['기간', '매출액', '영업이익', '영업이익률', '단위']), "-" * 80]
+        for year, quarter in periods:
+            cells = {}
+            for item in ('매출액', '영업이익'):
+                found = (year, quarter) in pivot_df.index and item in pivot_df.columns
+                cells[item] = pivot_df.loc[(year, quarter), item] if found else None
+            lines.append(legacy_row([f"{year}년 {quarter}분기", legacy_cell(cells['매출액']),
+                                     legacy_cell(cells['영업이익']),
+                                     legacy_margin(cells['매출액'], cells['영업이익']), "원"]))
+        lines.append("=" * 80)
+        return "\n".join(lines)
+
+    pivot_df = df.pivot_table(index='항목', columns='보고서명', values='thstrm_amount', aggfunc='first')
+    pivot_df = pivot_df.reindex(columns=REPORT_ORDER)
+    if '구분' in df.columns:
+        for item in pivot_df.index:
+            cfs_data = df[(df['항목'] == item) & (df['구분'] == '연결')]
+            for report in REPORT_ORDER:
+                values = cfs_data[cfs_data['보고서명'] == report]['thstrm_amount'].values
+                if len(values) > 0:
+                    pivot_df.loc[item, report] = values[0]
+    columns = {report: f"{df[df['보고서명'] == report]['년도'].max()}{REPORT_MONTHS[report]:02d}"
+               for report in REPORT_ORDER}
+    ordered = sorted(columns.items(), key=lambda column: int(column[1]))
+    lines += [legacy_row(['항목'] + [name for _, name in ordered] + ['단위']), "-" * 80]
+    for item in pivot_df.index:
+        lines.append(legacy_row([item] + [legacy_cell(pivot_df.loc[item, report]) for report, _ in ordered] + ["원"]))
+    lines.append("-" * 80)
+    margins = []
+    for report, _ in ordered:
+        try:
+            margins.append(legacy_margin(pivot_df.loc['매출액', report], pivot_df.loc['영업이익', report]))
+        except KeyError:
+            margins.append("-")
+    lines += [legacy_row(['영업이익률'] + margins + ["%"]), "=" * 80]
+    return "\n".join(lines)
+
+
+def quarterly_frame(seed: int) -> pd.DataFrame:
+    """
+    여러 해·분기·구분에 걸친 매출액/영업이익 행 (일부 칸은 빠지거나 결측이고, 같은 칸에 값이 여럿인 경우 포함).
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for year in (2023, 2024):
+        for quarter in (1, 2, 3, 4):
+            for fs_div in ('연결', '별도'):
+                for item in ('매출액', '영업이익', '당기순이익'):
+                    if rng.random() < 0.2:
+                        continue
+                    amount = float(rng.integers(-10**9, 10**12)) if rng.random() > 0.1 else np.nan
+                    if rng.random() < 0.05:
+                        amount = 0.0
+                    rows.append({'년도': year, '분기': quarter, '항목': item, '구분': fs_div, 'thstrm_amount': amount})
+    return pd.DataFrame(rows)
+
+
+def annual_frame(seed: int) -> pd.DataFrame:
+    """
+    보고서 네 종류가 모두 있는 보고서별 결과 (예전 구현은 빠진 보고서나 결측 칸이 있으면 오류를 냈습니다).
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for report in REPORT_ORDER:
+        year = 2024 if report != '사업보고서' else 2023
+        for fs_div in ('별도', '연결'):
+            for item in ('영업이익', '매출액'):
+                rows.append({'보고서명': report, '구분': fs_div, '항목': item, '년도': year,
+                             'thstrm_amount': int(rng.integers(-10**9, 10**12))})
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_matches_legacy_text(seed):
+    for df in (quarterly_frame(seed), annual_frame(seed)):
+        assert dart.format_display_table(df, '00126380') == format_display_table_loop(df)
+
+
+def text_cells(text: str):
+    """
+    콘솔 표에서 헤더와 데이터 행의 셀 목록을 꺼냅니다 (제목·구분선 제외).
+    """
+    return [[cell.strip() for cell in line.split(" | ")] for line in text.split("\n")[2:]
+            if not set(line) <= {'=', '-'}]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('kind', ['quarterly', 'annual'])
+def test_formats_hold_same_cells(seed, kind):
+    df = quarterly_frame(seed) if kind == 'quarterly' else annual_frame(seed)
+    cells = text_cells(dart.format_display_table(df, '00126380'))
+
+    markdown = dart.format_display_table(df, '00126380', fmt='markdown').split("\n")
+    assert [[cell.strip() for cell in line.strip('|').split(" | ")] for line in markdown[:1] + markdown[2:]] == cells
+
+    html_table = dart.format_display_table(df, '00126380', fmt='html')
+    assert html_table.count("<tr>") == len(cells)
+    assert all(f"<td>{cell}</td>" in html_table for row in cells[1:] for cell in row)
+
+    csv = pd.read_csv(io.StringIO(dart.format_display_table(df, '00126380', fmt='csv')))
+    if kind == 'quarterly':
+        amounts = csv['매출액'].tolist()
+        assert dart.format_amounts(pd.Series(amounts, dtype='float64')).tolist() == [row[1] for row in cells[1:]]
+    else:
+        assert csv['항목'].tolist() == [row[0] for row in cells[1:]]
+
+
+def test_multi_company_table_matches_single_tables():
+    frames = {'00000001': quarterly_frame(1), '00000002': quarterly_frame(2)}
+    combined = text_cells(dart.format_display_tables(frames))
+    assert combined[0] == ['고유번호', '기간', '매출액', '영업이익', '영업이익률', '단위']
+    expected = [[code] + row for code, df in frames.items()
+                for row in text_cells(dart.format_display_table(df, code))[1:]]
+    assert combined[1:] == expected
@@ -0,0 +1,69 @@
+"""
+대역 서버로 수집 경로 전체(고유번호, 재무제표 요청, 재시도, 4분기 보정)를 API 키 없이 실행할 수 있는지 확인합니다.
+"""
+import dart_api_test as dart
+
+STATEMENT_ENDPOINT = 'fnlttSinglAcntAll.json'
+
+
+def collect(corp_code):
+    return dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False)
+
+
+def test_corp_codes_from_fake_server(dart_env, fake_server):
+    codes = dart.get_company_codes('k')
+    assert codes['삼성전자'] == '00126380'
+    assert len(codes) == len(fake_server.companies)
+
+
+def test_collect_is_deterministic(dart_env, fake_server, listed_codes):
+    for corp_code in listed_codes:
+        first = collect(corp_code)
+        requests = fake_server.stats()['by_endpoint'][STATEMENT_ENDPOINT]
+        assert not first.empty and first.attrs['fetch_errors'] == []
+        # 응답 캐시가 없으므로 같은 요청을 다시 보내고 같은 결과를 받습니다
+        assert collect(corp_code).equals(first)
+        assert fake_server.stats()['by_endpoint'][STATEMENT_ENDPOINT] == 2 * requests
+        fake_server.reset_stats()
+
+
+def test_injected_errors_are_retried(dart_env, fake_server, listed_codes, monkeypatch):
+    expected = {corp_code: collect(corp_code) for corp_code in listed_codes}
+    monkeypatch.setattr(dart, 'HTTP_BACKOFF_BASE', 0)
+    monkeypatch.setattr(dart, 'HTTP_MAX_RETRIES', 20)
+    monkeypatch.setattr(fake_server, 'error_rate', 0.2)
+    monkeypatch.setattr(fake_server, 'status_error_rate', 0.2)
+    fake_server.reset_stats()
+    for corp_code, df in expected.items():
+        retried = collect(corp_code)
+        assert retried.equals(df)
+        assert retried.attrs['fetch_errors'] == []
+    injected = fake_server.stats()['injected']
+    assert injected['http_error'] and injected['status_error']
+
+
+def test_interactive_loop_survives_quota_errors(dart_env, fake_server, monkeypatch, capsys):
+    assert dart.get_company_codes('k', verbose=False)
+    answers = iter(['삼성전자', '2024', 'q'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    monkeypatch.setenv('DART_API_KEY', 'k')
+    monkeypatch.setattr(dart, 'HTTP_MAX_RETRIES', 0)
+    monkeypatch.setattr(fake_server, 'rate_limit_rate', 1.0)
+    dart.main()
+    out = capsys.readouterr().out
+    # 요청 제한(020)은 그 조회만 중단하고 다음 입력을 받은 뒤 정상 종료합니다
+    assert '요청 제한 초과(020)' in out and '프로그램을 종료합니다' in out
+
+
+def test_concurrent_fetch_matches_sequential(dart_env, fake_server, listed_codes, monkeypatch, capsys):
+    # 응답 지연을 들쭉날쭉하게 해 동시 요청이 요청 순서와 다르게 끝나도록 합니다
+    monkeypatch.setattr(fake_server, 'latency', 0.001)
+    monkeypatch.setattr(fake_server, 'jitter', 0.01)
+    for corp_code in listed_codes[:2]:
+        sequential = dart.collect_quarterly_financials('k', corp_code, 2024, 202412, max_workers=1)
+        sequential_log = capsys.readouterr().out
+        concurrent = dart.collect_quarterly_financials('k', corp_code, 2024, 202412, max_workers=8)
+        # 결과 행과 ✅/❌ 로그가 순차 실행과 같은 순서입니다
+        assert concurrent.equals(sequential)
+        assert concurrent.attrs == sequential.attrs
+        assert capsys.readouterr().out == sequential_log
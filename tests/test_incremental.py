@@ -0,0 +1,49 @@
+"""
+증분 수집(계정 시계열 저장소 + 확정 보고기간 재사용) 결과가 저장소 없이 전부 다시 수집한 결과와 같은지 확인합니다.
+"""
+from datetime import date
+
+import pytest
+
+import dart_api_test as dart
+
+
+def latest_year_month() -> int:
+    """
+    오늘 기준 가장 최근 분기말(YYYYMM). 이 분기는 아직 확정되지 않아 증분 수집에서 다시 요청됩니다.
+    """
+    today = date.today()
+    month = (today.month - 1) // 3 * 3
+    return today.year * 100 + month if month else (today.year - 1) * 100 + 12
+
+
+@pytest.mark.parametrize('with_previous', [True, False])
+def test_incremental_equals_full_recollect(dart_env, fake_server, listed_codes, tmp_path, monkeypatch, with_previous):
+    year_month = latest_year_month()
+    year = year_month // 100
+    monkeypatch.setattr(dart, 'TIMESERIES_DB_FILE', str(tmp_path / 'timeseries.sqlite3'))
+
+    for corp_code in listed_codes:
+        fake_server.reset_stats()
+        first = dart.collect_quarterly_financials('k', corp_code, year, year_month, verbose=False)
+        full_requests = fake_server.stats()['requests']
+
+        fake_server.reset_stats()
+        incremental = dart.collect_quarterly_financials('k', corp_code, year, year_month, verbose=False,
+                                                        incremental=True,
+                                                        previous=first if with_previous else None)
+        incremental_requests = fake_server.stats()['requests']
+
+        monkeypatch.setattr(dart, 'TIMESERIES_DB_FILE', '')
+        full = dart.collect_quarterly_financials('k', corp_code, year, year_month, verbose=False)
+        monkeypatch.setattr(dart, 'TIMESERIES_DB_FILE', str(tmp_path / 'timeseries.sqlite3'))
+
+        assert incremental.equals(full)
+        assert incremental.attrs == full.attrs
+        # 확정된 보고기간은 저장소에서 읽고, 아직 확정되지 않은 보고기간만 다시 요청합니다
+        assert 0 < incremental_requests < full_requests
+
+
+def test_incremental_requires_store(dart_env):
+    with pytest.raises(ValueError):
+        dart.collect_quarterly_financials('k', '00126380', 2024, 202412, verbose=False, incremental=True)
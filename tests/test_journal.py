@@ -0,0 +1,73 @@
+"""
+작업 기록(BatchJournal)으로 다시 실행하면 끝난 보고서는 요청 없이 재사용하고 실패한 보고서만 다시 요청하는지 확인합니다.
+"""
+import dart_api_test as dart
+
+STATEMENT_ENDPOINT = 'fnlttSinglAcntAll.json'
+
+
+def statement_requests(server) -> int:
+    return server.stats()['by_endpoint'].get(STATEMENT_ENDPOINT, 0)
+
+
+def collect(corp_code, journal=None):
+    return dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False, journal=journal)
+
+
+def test_resume_requests_only_failed_units(dart_env, fake_server, listed_codes, tmp_path):
+    corp_code = listed_codes[0]
+    journal = dart.BatchJournal(str(tmp_path / 'journal.sqlite3'), 'job')
+    first = collect(corp_code, journal)
+    assert statement_requests(fake_server) > 0
+
+    # 보고서 두 건을 요청 실패로 기록해 둡니다 (재시도 후에도 실패한 요청이 남기는 상태와 같음)
+    finished = journal.lookup(corp_code, [(year, quarter, fs_div)
+                                          for year in range(2019, 2025) for quarter in (1, 2, 3, 4)
+                                          for fs_div in ('CFS', 'OFS')])
+    failed = [unit for unit, rows in finished.items() if rows][:2]
+    assert len(failed) == 2
+    for unit in failed:
+        journal.record(corp_code, unit, None, error='요청 오류: 테스트')
+
+    fake_server.reset_stats()
+    resumed = collect(corp_code, dart.BatchJournal(str(tmp_path / 'journal.sqlite3'), 'job'))
+    assert statement_requests(fake_server) == len(failed)
+    assert resumed.equals(first)
+    assert resumed.attrs == first.attrs
+
+
+def test_resume_after_request_failures(dart_env, fake_server, listed_codes, tmp_path, monkeypatch):
+    corp_code = listed_codes[1]
+    journal_file = str(tmp_path / 'journal.sqlite3')
+    monkeypatch.setattr(dart, 'HTTP_MAX_RETRIES', 0)
+    monkeypatch.setattr(fake_server, 'error_rate', 1.0)
+    failed = collect(corp_code, dart.BatchJournal(journal_file, 'job'))
+    assert failed.empty and failed.attrs['fetch_errors']
+    failed_requests = statement_requests(fake_server)
+
+    monkeypatch.setattr(fake_server, 'error_rate', 0.0)
+    fake_server.reset_stats()
+    resumed = collect(corp_code, dart.BatchJournal(journal_file, 'job'))
+    assert statement_requests(fake_server) == failed_requests
+    assert resumed.equals(collect(corp_code))
+
+    # 모두 기록된 뒤에는 다시 실행해도 요청하지 않습니다
+    fake_server.reset_stats()
+    again = collect(corp_code, dart.BatchJournal(journal_file, 'job'))
+    assert statement_requests(fake_server) == 0
+    assert again.equals(resumed)
+
+
+def test_batch_resume_skips_finished_companies(dart_env, fake_server, listed_codes, tmp_path):
+    journal_file = str(tmp_path / 'journal.sqlite3')
+    summary = dart.run_batch('k', listed_codes, 2024, 202412, str(tmp_path / 'out.csv'), journal_file=journal_file)
+    assert summary['ok'] + summary['partial'] + summary['empty'] == len(listed_codes)
+
+    fake_server.reset_stats()
+    resumed = dart.run_batch('k', listed_codes, 2024, 202412, str(tmp_path / 'resumed.csv'), journal_file=journal_file)
+    assert statement_requests(fake_server) == 0
+    assert resumed['resumed'] == len(listed_codes)
+    # 기업은 끝난 순서대로 기록되므로 행 순서만 다를 수 있습니다
+    def read_rows(name):
+        return sorted((tmp_path / name).read_text(encoding='utf-8-sig').splitlines())
+    assert read_rows('resumed.csv') == read_rows('out.csv')
@@ -0,0 +1,94 @@
+"""
+다중회사 주요계정 API 경로(collect_key_accounts_multi)가 주요 계정이 빠진 보고서만 전체 재무제표로 대체하고,
+기업별 단독 수집과 같은 결과를 내는지 대역 서버로 확인합니다.
+"""
+import pandas as pd
+
+import dart_api_test as dart
+
+STATEMENT_ENDPOINT = 'fnlttSinglAcntAll.json'
+MULTI_ENDPOINT = 'fnlttMultiAcnt.json'
+
+
+def endpoint_requests(server, endpoint) -> int:
+    return server.stats()['by_endpoint'].get(endpoint, 0)
+
+
+def single_frames(corp_codes):
+    return {corp_code: dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False)
+            for corp_code in corp_codes}
+
+
+def filed(server, corp_code, task) -> dict:
+    """
+    대역 서버에서 보고서 단위의 구분코드별 공시 여부.
+    """
+    return {fs_div: server.statement(corp_code, task[0], task[3], fs_div)['status'] == '000'
+            for fs_div in ('CFS', 'OFS')}
+
+
+def fallback_count(server, corp_codes, plan) -> int:
+    """
+    주요계정 API 결과가 온전할 때 전체 재무제표로 확인하는 단위 수: 보고서를 냈지만 그 구분(연결/별도)의 행이 없는 단위.
+    """
+    count = 0
+    for corp_code in corp_codes:
+        for task in plan:
+            status = filed(server, corp_code, task)
+            count += any(status.values()) and not status[task[5]]
+    return count
+
+
+def assert_same_frames(actual, expected):
+    assert list(actual) == list(expected)
+    for corp_code, df in expected.items():
+        pd.testing.assert_frame_equal(actual[corp_code], df)
+        assert actual[corp_code].attrs == df.attrs
+
+
+def test_multi_matches_single_without_fallback(dart_env, fake_server, listed_codes):
+    expected = single_frames(listed_codes)
+    plan = dart.build_collection_plan(2024, 202412)
+    periods = len({(task[0], task[3]) for task in plan})
+    fake_server.reset_stats()
+
+    frames = dart.collect_key_accounts_multi('k', listed_codes, 2024, 202412, verbose=False)
+    assert_same_frames(frames, expected)
+    # 보고서마다 한 번에 모든 기업을 요청하고, 전체 재무제표는 한쪽 구분만 낸 보고서의 나머지 구분만 확인합니다
+    assert endpoint_requests(fake_server, MULTI_ENDPOINT) == periods
+    assert endpoint_requests(fake_server, STATEMENT_ENDPOINT) == fallback_count(fake_server, listed_codes, plan)
+
+
+def test_missing_accounts_fall_back_to_full_statement(dart_env, fake_server, listed_codes, monkeypatch):
+    expected = single_frames(listed_codes)
+    partial, absent = listed_codes[0], listed_codes[1]
+    plan = dart.build_collection_plan(2024, 202412)
+    original = fake_server.multi_accounts
+
+    def multi_accounts(corp_codes, year, report_code):
+        # partial 기업은 영업이익 행이 없고, absent 기업은 주요계정 API 결과에 아예 없습니다
+        data = original(corp_codes, year, report_code)
+        rows = [row for row in data.get('list') or []
+                if row['corp_code'] != absent and not (row['corp_code'] == partial and row['account_nm'] == '영업이익')]
+        return dict(data, list=rows) if rows else {'status': '013', 'message': '조회된 데이타가 없습니다.'}
+
+    monkeypatch.setattr(fake_server, 'multi_accounts', multi_accounts)
+    fake_server.reset_stats()
+    frames = dart.collect_key_accounts_multi('k', listed_codes, 2024, 202412, verbose=False)
+    assert_same_frames(frames, expected)
+
+    # absent 기업은 모든 단위를, partial 기업은 보고서를 낸 모든 단위를 전체 재무제표로 다시 요청합니다
+    partial_units = sum(any(filed(fake_server, partial, task).values()) for task in plan)
+    others = fallback_count(fake_server, listed_codes[2:], plan)
+    assert endpoint_requests(fake_server, STATEMENT_ENDPOINT) == len(plan) + partial_units + others
+
+
+def test_batch_multi_backend_matches_single(dart_env, fake_server, listed_codes, tmp_path):
+    outputs = {}
+    for backend in ('single', 'multi'):
+        output = tmp_path / f'{backend}.csv'
+        summary = dart.run_batch('k', listed_codes, 2024, 202412, str(output), backend=backend)
+        assert summary['ok'] == len(listed_codes)
+        written = pd.read_csv(output, dtype={'corp_code': str, '입력값': str}, encoding='utf-8-sig')
+        outputs[backend] = written.sort_values('corp_code', kind='stable').reset_index(drop=True)
+    pd.testing.assert_frame_equal(outputs['multi'], outputs['single'])
@@ -0,0 +1,71 @@
+"""
+Parquet 데이터셋 내보내기(export_parquet)의 년도/분기 파티션·타입과, 같은 기업을 다시 내보내거나 증분 배치로 합쳐도
+행이 중복되지 않는지 확인합니다 (pyarrow가 없으면 건너뜁니다).
+"""
+import os
+
+import pandas as pd
+import pytest
+
+import dart_api_test as dart
+
+pytest.importorskip('pyarrow')
+
+
+def collect(corp_code):
+    return dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False)
+
+
+def sort_rows(df: pd.DataFrame) -> pd.DataFrame:
+    columns = ['corp_code', '년도', '분기', '구분', '항목']
+    return df.sort_values(columns, kind='stable').reset_index(drop=True)
+
+
+def test_append_twice_and_read_back(dart_env, listed_codes, tmp_path):
+    dataset = str(tmp_path / 'dataset')
+    frames = {corp_code: collect(corp_code) for corp_code in listed_codes[:2]}
+    for corp_code, df in frames.items():
+        assert dart.export_parquet(df, corp_code, dataset)
+
+    # 년도=YYYY/분기=Q 디렉터리 아래에 기업별 파일을 씁니다
+    first = listed_codes[0]
+    periods = frames[first][['년도', '분기']].drop_duplicates().itertuples(index=False)
+    for year, quarter in periods:
+        assert os.path.isfile(os.path.join(dataset, f"년도={year}", f"분기={quarter}", f"{first}-0.parquet"))
+
+    read = dart.read_parquet_dataset(dataset)
+    assert read['thstrm_amount'].dtype == 'Int64'
+    assert read['년도'].dtype == 'int64' and read['분기'].dtype == 'int64'
+    for col in dart.PARQUET_CATEGORY_COLS:
+        assert isinstance(read[col].dtype, pd.CategoricalDtype)
+
+    expected = pd.concat([dart.to_parquet_frame(df, corp_code) for corp_code, df in frames.items()])
+    actual = sort_rows(read)[list(expected.columns)]
+    expected = sort_rows(expected)
+    for col in dart.PARQUET_CATEGORY_COLS:
+        actual[col] = actual[col].astype(str)
+        expected[col] = expected[col].astype(str)
+    pd.testing.assert_frame_equal(actual, expected)
+
+    # 같은 기업을 다시 내보내면 그 기업의 파일만 교체되어 행이 늘지 않습니다
+    assert dart.export_parquet(frames[first], first, dataset)
+    again = dart.read_parquet_dataset(dataset)
+    assert len(again) == len(read)
+    assert len(dart.read_parquet_dataset(dataset, corp_codes=[first])) == len(frames[first])
+    assert set(dart.read_parquet_dataset(dataset, years=[2024])['년도']) == {2024}
+
+
+def test_incremental_batch_does_not_duplicate_rows(dart_env, listed_codes, tmp_path, monkeypatch):
+    monkeypatch.setattr(dart, 'TIMESERIES_DB_FILE', str(tmp_path / 'timeseries.sqlite3'))
+    dataset = str(tmp_path / 'dataset')
+    targets = listed_codes[:2]
+
+    dart.run_batch('k', targets, 2024, 202412, None, parquet_dir=dataset)
+    first = sort_rows(dart.read_parquet_dataset(dataset))
+    # 증분 배치는 저장소와 이전 데이터셋을 재사용해 같은 기업의 행을 교체합니다
+    summary = dart.run_batch('k', targets, 2024, 202412, None, parquet_dir=dataset, incremental=True)
+    assert summary['ok'] == len(targets)
+    merged = sort_rows(dart.read_parquet_dataset(dataset))
+
+    assert not merged.duplicated(['corp_code', '년도', '분기', '구분', '항목']).any()
+    pd.testing.assert_frame_equal(merged, first)
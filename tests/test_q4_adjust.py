@@ -0,0 +1,109 @@
+"""
+adjust_q4_values(groupby 일괄 차감)가 예전 행 단위 반복 구현과 같은 값을 내는지 확인합니다.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import dart_api_test as dart
+
+
+def adjust_q4_values_loop(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    벡터화 이전의 기준 구현 (년도별로 항목/구분 합계를 구해 4분기 행마다 차감).
+    """
+    if df.empty or '분기' not in df.columns:
+        return df
+    q4_data = df[df['분기'] == 4].copy()
+    if q4_data.empty:
+        return df
+    for year in q4_data['년도'].unique():
+        q1_q3_data = df[(df['년도'] == year) & df['분기'].isin([1, 2, 3])]
+        if q1_q3_data.empty:
+            continue
+        q1_q2_q3_sum = {}
+        for item in q1_q3_data['항목'].unique():
+            for fs_div in q1_q3_data['구분'].unique():
+                item_sum = q1_q3_data[(q1_q3_data['항목'] == item) & (q1_q3_data['구분'] == fs_div)]['thstrm_amount'].sum()
+                q1_q2_q3_sum[(year, item, fs_div)] = item_sum
+        year_q4_data = df[(df['년도'] == year) & (df['분기'] == 4)]
+        for idx, row in year_q4_data.iterrows():
+            key = (year, row['항목'], row['구분'])
+            if key in q1_q2_q3_sum:
+                df.at[idx, 'thstrm_amount'] = row['thstrm_amount'] - q1_q2_q3_sum[key]
+    return df
+
+
+def quarterly_frame(seed: int, dtype: str) -> pd.DataFrame:
+    """
+    여러 해·항목·구분에 걸친 분기 행을 만들고, 일부 분기를 빼거나 같은 행을 중복시킵니다.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for year in (2022, 2023, 2024):
+        for item in ('매출액', '영업이익', '당기순이익'):
+            for fs_div in ('연결', '별도'):
+                for quarter in (4, 1, 2, 3):
+                    if rng.random() < 0.15:
+                        continue
+                    amount = int(rng.integers(-10**9, 10**12))
+                    rows.append({'년도': year, '분기': quarter, '항목': item, '구분': fs_div, 'thstrm_amount': amount})
+                    if rng.random() < 0.1:
+                        rows.append(dict(rows[-1]))
+    df = pd.DataFrame(rows)
+    if dtype == 'float64':
+        amounts = df['thstrm_amount'].astype('float64')
+        amounts[rng.random(len(df)) < 0.1] = np.nan
+        df['thstrm_amount'] = amounts
+    else:
+        df['thstrm_amount'] = df['thstrm_amount'].astype(dtype)
+    return df
+
+
+@pytest.mark.parametrize('dtype', ['int64', 'float64'])
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_loop_implementation(seed, dtype):
+    df = quarterly_frame(seed, dtype)
+    expected = adjust_q4_values_loop(df.copy())
+    actual = dart.adjust_q4_values(df.copy())
+    pd.testing.assert_frame_equal(actual, expected)
+    assert actual['thstrm_amount'].dtype == dtype
+
+
+def test_nan_and_duplicate_rows():
+    df = pd.DataFrame({
+        '년도': [2024] * 7,
+        '분기': [1, 1, 2, 3, 4, 4, 4],
+        '항목': ['매출액', '매출액', '매출액', '매출액', '매출액', '매출액', '영업이익'],
+        '구분': ['연결'] * 7,
+        'thstrm_amount': [10.0, 10.0, np.nan, 30.0, 100.0, np.nan, 50.0],
+    })
+    expected = adjust_q4_values_loop(df.copy())
+    actual = dart.adjust_q4_values(df.copy())
+    pd.testing.assert_frame_equal(actual, expected)
+    # 중복된 1분기 행은 두 번 차감되고, NaN은 합계에서 빠지며, 1~3분기가 없는 항목은 그대로입니다
+    assert actual['thstrm_amount'].tolist()[4:] == [50.0, pytest.approx(np.nan, nan_ok=True), 50.0]
+
+
+def test_reports_incomplete_q4_rows():
+    df = pd.DataFrame({
+        '년도': [2024, 2024, 2024, 2024, 2024],
+        '분기': [1, 2, 4, 1, 4],
+        '항목': ['매출액', '매출액', '매출액', '영업이익', '영업이익'],
+        '구분': ['연결'] * 5,
+        'thstrm_amount': [1, 2, 10, 1, 5],
+    })
+    _, incomplete = dart.adjust_q4_values(df.copy(), return_incomplete=True)
+    assert list(incomplete.itertuples(index=False, name=None)) == [(2024, '매출액', '연결', 2),
+                                                                    (2024, '영업이익', '연결', 1)]
+
+
+def test_multiple_companies_are_adjusted_separately():
+    single = quarterly_frame(7, 'int64')
+    other = quarterly_frame(8, 'int64')
+    combined = pd.concat([single.assign(corp_code='00000001'), other.assign(corp_code='00000002')],
+                         ignore_index=True)
+    actual = dart.adjust_q4_values(combined.copy())
+    expected = pd.concat([adjust_q4_values_loop(single.copy()).assign(corp_code='00000001'),
+                          adjust_q4_values_loop(other.copy()).assign(corp_code='00000002')], ignore_index=True)
+    pd.testing.assert_frame_equal(actual, expected)
@@ -0,0 +1,121 @@
+"""
+요청 원장(QuotaLedger)의 프로세스 간 한도 공유, 일일 한도, 우선순위 양보, 진행 중 요청 공유(RequestCoalescer)를 확인합니다.
+"""
+import threading
+import time
+
+import pytest
+
+import dart_api_test as dart
+
+DAY = '2024-01-02'
+
+
+def test_ledger_shares_quota_between_connections(tmp_path):
+    path = str(tmp_path / 'quota.sqlite3')
+    # 같은 파일을 연 두 원장은 각자 다른 프로세스의 연결과 같습니다
+    ledgers = [dart.QuotaLedger(path), dart.QuotaLedger(path)]
+    granted = []
+
+    def reserve(ledger):
+        for _ in range(40):
+            granted.append(ledger.reserve('key', DAY, 50)[0])
+
+    threads = [threading.Thread(target=reserve, args=(ledger,)) for ledger in ledgers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert granted.count(True) == 50
+    assert all(ledger.used('key', DAY) == 50 for ledger in ledgers)
+    assert ledgers[0].reserve('key', DAY, 50) == (False, 50)
+    assert ledgers[1].reserve('other', DAY, 50) == (True, 1)
+    # limit 0은 제한 없음입니다
+    assert ledgers[1].reserve('key', DAY, 0) == (True, 51)
+
+
+def test_rate_limiters_share_daily_cap(tmp_path):
+    path = str(tmp_path / 'quota.sqlite3')
+    limiters = [dart.RateLimiter(0, 5, ledger_path=path, keys=[]) for _ in range(2)]
+    for i in range(5):
+        limiters[i % 2].acquire('k')
+    for limiter in limiters:
+        with pytest.raises(dart.DartQuotaExceeded):
+            limiter.acquire('k')
+        assert limiter.remaining_today == 0
+
+
+def test_daily_cap_keeps_interactive_reserve():
+    limiter = dart.RateLimiter(0, 5, ledger_path='', keys=[], interactive_reserve=2)
+    for _ in range(3):
+        limiter.acquire('k', dart.PRIORITY_BACKGROUND)
+    with pytest.raises(dart.DartQuotaExceeded, match='배치용'):
+        limiter.acquire('k', dart.PRIORITY_BACKGROUND)
+    limiter.acquire('k', dart.PRIORITY_INTERACTIVE)
+    limiter.acquire('k', dart.PRIORITY_INTERACTIVE)
+    with pytest.raises(dart.DartQuotaExceeded):
+        limiter.acquire('k', dart.PRIORITY_INTERACTIVE)
+
+
+def test_interactive_requests_go_first():
+    # 분당 600건 = 0.1초마다 토큰 1개. 버킷을 비운 뒤 background 요청이 먼저 기다리게 합니다
+    limiter = dart.RateLimiter(600, 0, ledger_path='', keys=[])
+    for _ in range(600):
+        limiter.acquire('k')
+    order = []
+
+    def acquire(priority):
+        limiter.acquire('k', priority)
+        order.append(priority)
+
+    threads = [threading.Thread(target=acquire, args=(dart.PRIORITY_BACKGROUND,)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.03)
+    interactive = threading.Thread(target=acquire, args=(dart.PRIORITY_INTERACTIVE,))
+    interactive.start()
+    for thread in threads + [interactive]:
+        thread.join()
+    assert order[0] == dart.PRIORITY_INTERACTIVE
+    assert order.count(dart.PRIORITY_BACKGROUND) == 3
+
+
+def test_coalescer_shares_result_and_errors():
+    coalescer = dart.RequestCoalescer()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow(value):
+        def fn():
+            calls.append(value)
+            started.set()
+            release.wait(5)
+            if isinstance(value, Exception):
+                raise value
+            return value
+        return fn
+
+    for value in ('result', ValueError('실패')):
+        started.clear()
+        release.clear()
+        calls.clear()
+        results = []
+
+        def run(fn):
+            try:
+                results.append(coalescer.run(('key',), fn))
+            except ValueError as e:
+                results.append(e)
+
+        owner = threading.Thread(target=run, args=(slow(value),))
+        owner.start()
+        started.wait(5)
+        waiter = threading.Thread(target=run, args=(slow('다른 호출'),))
+        waiter.start()
+        time.sleep(0.05)
+        release.set()
+        owner.join()
+        waiter.join()
+        # 진행 중인 요청이 있으면 두 번째 호출은 함수를 실행하지 않고 같은 결과(또는 예외)를 받습니다
+        assert calls == [value]
+        assert results == [value, value]
@@ -0,0 +1,87 @@
+"""
+응답 캐시(ResponseCache)가 같은 요청을 다시 보내지 않고, 확정되지 않은 보고기간과 '데이터 없음'(013) 응답은
+보관 기간이 지나면 다시 요청하는지 대역 서버로 확인합니다.
+"""
+import sqlite3
+
+import pytest
+
+import dart_api_test as dart
+
+STATEMENT_ENDPOINT = 'fnlttSinglAcntAll.json'
+NO_DATA = {'status': '013', 'message': '조회된 데이타가 없습니다.'}
+
+
+def statement_requests(server) -> int:
+    return server.stats()['by_endpoint'].get(STATEMENT_ENDPOINT, 0)
+
+
+@pytest.fixture
+def cache_env(dart_env, tmp_path, monkeypatch):
+    monkeypatch.setattr(dart, 'RESPONSE_CACHE_FILE', str(tmp_path / 'responses.sqlite3'))
+    return dart
+
+
+def test_cache_hit_skips_requests(cache_env, fake_server, listed_codes):
+    corp_code = listed_codes[0]
+    first = dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False)
+    requests = statement_requests(fake_server)
+    assert requests > 0
+
+    dart.metrics.reset()
+    again = dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False)
+    assert again.equals(first)
+    assert statement_requests(fake_server) == requests
+    assert dart.metrics.summary()['counters']['cache_hits'] == requests
+
+
+def test_no_data_responses_are_cached(cache_env, fake_server):
+    # 연결재무제표가 없는 기업의 CFS 요청은 '데이터 없음'(013)입니다
+    corp_code = next(code for code, has_cfs in fake_server.has_cfs.items() if not has_cfs)
+    assert dart.fetch_financial_statement('k', corp_code, 2023, '11011', 'CFS') is None
+    assert dart.fetch_financial_statement('k', corp_code, 2023, '11011', 'CFS') is None
+    assert statement_requests(fake_server) == 1
+
+    with sqlite3.connect(dart.RESPONSE_CACHE_FILE) as conn:
+        status, fetched_at, expires_at = conn.execute(
+            "SELECT status, fetched_at, expires_at FROM responses WHERE corp_code = ?", (corp_code,)).fetchone()
+    # 확정된 보고기간의 013 응답도 만료 없이 두지 않고 NO_DATA_TTL_FINAL 뒤에 다시 확인합니다
+    assert status == '013'
+    assert expires_at == pytest.approx(fetched_at + dart.NO_DATA_TTL_FINAL)
+
+
+def test_final_periods_never_expire(tmp_path):
+    cache = dart.ResponseCache(str(tmp_path / 'responses.sqlite3'))
+    data = {'status': '000', 'message': '정상', 'list': [{'account_id': 'ifrs-full_Revenue', 'thstrm_amount': '1'}]}
+    cache.put('00000001', 2000, '11011', 'CFS', data)
+    # 오류 상태는 저장하지 않습니다
+    cache.put('00000001', 2000, '11013', 'CFS', {'status': '800', 'message': '점검'})
+    assert cache.get('00000001', 2000, '11011', 'CFS') == data
+    assert cache.get('00000001', 2000, '11013', 'CFS') is None
+    assert cache.purge_expired() == 0
+    assert cache.get('00000001', 2000, '11011', 'CFS') == data
+
+
+@pytest.mark.parametrize('status', ['000', '013'])
+def test_open_period_responses_expire(tmp_path, monkeypatch, status):
+    # 아직 확정되지 않은 보고기간은 보관 기간이 지나면 캐시에서 읽지 않고, purge_expired로 지웁니다
+    monkeypatch.setattr(dart, 'OPEN_PERIOD_TTL', -1)
+    monkeypatch.setattr(dart, 'NO_DATA_TTL_OPEN', -1)
+    cache = dart.ResponseCache(str(tmp_path / 'responses.sqlite3'))
+    data = NO_DATA if status == '013' else {'status': '000', 'message': '정상', 'list': []}
+    cache.put('00000001', 2999, '11011', 'CFS', data)
+    assert cache.get('00000001', 2999, '11011', 'CFS') is None
+    assert cache.purge_expired() == 1
+
+
+def test_expired_responses_are_requested_again(cache_env, fake_server, listed_codes, monkeypatch):
+    # 모든 보고기간을 확정되지 않은 것으로 보고 보관 기간을 없애면 매번 다시 요청합니다
+    monkeypatch.setattr(dart, 'is_period_final', lambda year, report_code, today=None: False)
+    monkeypatch.setattr(dart, 'OPEN_PERIOD_TTL', -1)
+    monkeypatch.setattr(dart, 'NO_DATA_TTL_OPEN', -1)
+    corp_code = listed_codes[0]
+    first = dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False)
+    requests = statement_requests(fake_server)
+    again = dart.collect_quarterly_financials('k', corp_code, 2024, 202412, verbose=False)
+    assert again.equals(first)
+    assert statement_requests(fake_server) == 2 * requests
@@ -0,0 +1,103 @@
+"""
+스크리닝 인덱스를 저장소/배치 결과 파일로 새로 만든 결과(rebuild)가 기업별로 갱신한 결과(update)와 같은지 확인합니다.
+"""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import dart_analytics
+import dart_api_test as dart
+
+REVENUE, OPERATING = 'ifrs-full_Revenue', 'dart_OperatingIncomeLoss'
+
+# 고유번호 -> {(년도, 분기): (매출액, 영업이익)} (사업보고서는 연간 누적값)
+FILINGS = {
+    '00000001': {(2023, 1): (100, 10), (2023, 2): (110, 11), (2023, 3): (120, 12), (2023, 4): (480, 48),
+                 (2024, 1): (130, 13), (2024, 2): (140, 14), (2024, 3): (150, 15), (2024, 4): (600, 60)},
+    # 2024년 반기보고서가 없어 4분기 보정이 불완전합니다 (1분기 10, 3분기 30, 사업보고서 100)
+    '00000002': {(2023, 1): (5, 1), (2023, 2): (6, 1), (2023, 3): (7, 1), (2023, 4): (28, 4),
+                 (2024, 1): (10, 2), (2024, 3): (30, 3), (2024, 4): (100, 9)},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = dart.TimeSeriesStore(str(tmp_path / 'timeseries.sqlite3'))
+    wanted = dart.account_filter(dart.account_specs().values())
+    for corp_code, filings in FILINGS.items():
+        for (year, quarter), (revenue, operating) in filings.items():
+            store.save(corp_code, year, quarter, 'CFS',
+                       [{'account_id': REVENUE, 'sj_div': 'IS', 'account_nm': '매출액', 'thstrm_amount': str(revenue)},
+                        {'account_id': OPERATING, 'sj_div': 'IS', 'account_nm': '영업이익',
+                         'thstrm_amount': str(operating)}], wanted)
+    return store
+
+
+def index_tables(path) -> dict:
+    with sqlite3.connect(path) as conn:
+        values = pd.read_sql("SELECT * FROM quarterly_values ORDER BY corp_code, 구분, 년도, 분기, 항목", conn)
+        metrics = pd.read_sql("SELECT * FROM metrics ORDER BY corp_code, 구분, 년도, 분기", conn)
+    return {'quarterly_values': values, 'metrics': metrics.drop(columns='updated_at')}
+
+
+@pytest.fixture
+def updated(store, tmp_path):
+    path = tmp_path / 'updated.sqlite3'
+    index = dart_analytics.ScreeningIndex(str(path))
+    for corp_code in FILINGS:
+        index.update(corp_code, store.frame(corp_codes=[corp_code]))
+    index.close()
+    return index_tables(path)
+
+
+def test_update_skips_incomplete_q4(updated):
+    values = updated['quarterly_values']
+    incomplete = values[(values['corp_code'] == '00000002') & (values['년도'] == 2024)]
+    assert sorted(incomplete['분기'].unique()) == [1, 3]
+
+
+@pytest.mark.parametrize('source', ['store', 'csv', 'jsonl'])
+def test_rebuild_matches_update(store, updated, tmp_path, source):
+    if source == 'store':
+        collected = dart_analytics.load_collected(store=store.path)
+    else:
+        path = str(tmp_path / f'collected.{source}')
+        frame = store.frame()
+        if source == 'csv':
+            frame.to_csv(path, index=False, encoding='utf-8-sig')
+        else:
+            frame.to_json(path, orient='records', lines=True, force_ascii=False)
+        collected = dart_analytics.load_collected(input_file=path)
+
+    path = tmp_path / 'rebuilt.sqlite3'
+    index = dart_analytics.ScreeningIndex(str(path))
+    # main()처럼 입력 전체로 미리 계산한 지표를 넘겨도 불완전한 4분기를 뺀 값으로 다시 계산해야 합니다
+    index.rebuild(collected, dart_analytics.derived_metrics(collected))
+    index.close()
+    rebuilt = index_tables(path)
+
+    for table in ('quarterly_values', 'metrics'):
+        pd.testing.assert_frame_equal(rebuilt[table], updated[table])
+
+
+def test_attrs_keyed_by_corp_code():
+    # corp_code 컬럼이 있으면 attrs['q4_incomplete'] 항목도 고유번호로 시작합니다
+    frame = pd.DataFrame({'corp_code': ['00000003'] * 4, '구분': '연결', '년도': 2024, '분기': [1, 2, 3, 4],
+                          '항목': '매출액', 'thstrm_amount': [1.0, 2.0, 3.0, 4.0]})
+    frame.attrs['q4_incomplete'] = [('00000003', 2024, '매출액', '연결', 2)]
+    values, excluded = dart_analytics.ScreeningIndex._values_frame(frame)
+    assert excluded == 1
+    assert sorted(values['분기']) == [1, 2, 3]
+
+
+@pytest.mark.parametrize('ascending', [False, True])
+def test_screen_orders_missing_values_last(tmp_path, store, ascending):
+    index = dart_analytics.ScreeningIndex(str(tmp_path / 'order.sqlite3'))
+    for corp_code in FILINGS:
+        index.update(corp_code, store.frame(corp_codes=[corp_code]))
+    # 00000002의 최근 분기(2024년 3분기)는 2분기가 없어 QoQ가 결측입니다
+    result = index.screen([], order_by='매출액_QoQ', ascending=ascending)
+    index.close()
+    assert result['corp_code'].tolist() == ['00000001', '00000002']
+    assert result['매출액_QoQ'].isna().tolist() == [False, True]